@@ -52,6 +52,14 @@ try:
 except Exception:
     pass
 
+try:
+    import Adafruit_GPIO as GPIO
+    import Adafruit_GPIO.SPI as SPI
+    import Adafruit_GPIO.MCP3xxx as MCP3xxx
+    import Adafruit_GPIO.GateCounter as GateCounter
+except Exception:
+    pass
+
 # Constants
 try:
     CONFIG_FILE = sys.argv[1]
@@ -91,8 +99,28 @@ class HiveNode:
             self.CAMERA_ENABLED = False
             self.CAMERA_INDEX = 0
             self.BMP_ENABLED = True
+            self.BMP_CALIBRATION_FILE = "data/bmp085.json"
+            self.BMP_FILTER_ENABLED = True
+            self.BMP_FILTER_ALPHA = 0.05
             self.DHT_ENABLED = True
             self.DHT_PIN = 4
+            self.DHT_INTERVAL = 2.0
+            self.ADC_ENABLED = False
+            self.ADC_MODEL = "MCP3008"
+            self.ADC_SPI_PORT = 0
+            self.ADC_SPI_DEVICE = 0
+            self.ADC_SPI_HZ = 1000000
+            self.ADC_RATE = 1000 # scans per second
+            self.ADC_WINDOW = 1.0 # seconds
+            self.ADC_VREF = 3.3
+            self.ADC_CHANNELS = [0, 1]
+            self.ADC_NAMES = ["adc_v", "adc_a"]
+            self.ADC_OFFSET = [0.0, 0.0] # volts
+            self.ADC_SCALE = [1.0, 1.0] # units per volt
+            self.BEES_ENABLED = False
+            self.BEES_GATES = [[17, 27], [22, 23]] # outer, inner pins
+            self.BEES_MAX_GAP = 0.5 # seconds
+            self.BEES_HOLDOFF = 0.02 # seconds
             self.CHERRYPY_PORT = 8081
             self.CHERRYPY_ADDR = "0.0.0.0"
             self.PING_INTERVAL = 1
@@ -124,6 +152,10 @@ class HiveNode:
             self.init_BMP()
         if self.DHT_ENABLED:
             self.init_DHT()        
+        if self.ADC_ENABLED:
+            self.init_ADC()
+        if self.BEES_ENABLED:
+            self.init_bees()
         if self.MICROPHONE_ENABLED:
             self.init_mic()
         if self.CAMERA_ENABLED: 
@@ -200,7 +232,10 @@ class HiveNode:
     def init_BMP(self):
         self.log_msg('BMP', 'Initializing BMP sensor ...')
         try:
-            self.BMP085 = BMP085.BMP085()
+            calibration_file = os.path.join(self.NODE_DIR, self.BMP_CALIBRATION_FILE)
+            self.BMP085 = BMP085.BMP085(calibration_file=calibration_file)
+            if self.BMP_FILTER_ENABLED:
+                self.BMP085.start_sampling(alpha=self.BMP_FILTER_ALPHA)
         except Exception as error:
             self.log_msg('BMP', 'Error: %s' % str(error))
 
@@ -208,10 +243,35 @@ class HiveNode:
     def init_DHT(self):
         self.log_msg('DHT', 'Initializing DHT Sensor')
         try:
-            pass
+            self.dht_monitor = Adafruit_DHT.Monitor(Adafruit_DHT.DHT22, self.DHT_PIN, interval=self.DHT_INTERVAL)
+            self.dht_monitor.start()
         except Exception as error:
             self.log_msg('DHT', 'Error: %s' % str(error))
-    
+
+    ## Initialize ADC
+    def init_ADC(self):
+        self.log_msg('ADC', 'Initializing ADC')
+        try:
+            spi = SPI.SpiDev(self.ADC_SPI_PORT, self.ADC_SPI_DEVICE, max_speed_hz=self.ADC_SPI_HZ)
+            adc = getattr(MCP3xxx, self.ADC_MODEL)(spi=spi, max_speed_hz=self.ADC_SPI_HZ)
+            self.adc_sampler = MCP3xxx.Sampler(adc, self.ADC_CHANNELS, rate=self.ADC_RATE,
+                                               seconds=self.ADC_WINDOW, vref=self.ADC_VREF,
+                                               offset=self.ADC_OFFSET, scale=self.ADC_SCALE)
+            self.adc_sampler.start()
+        except Exception as error:
+            self.log_msg('ADC', 'Error: %s' % str(error))
+
+    ## Initialize Bee Counter
+    def init_bees(self):
+        self.log_msg('BEES', 'Initializing bee counter')
+        try:
+            self.bee_counter = GateCounter.GateCounter(GPIO.get_platform_gpio(), self.BEES_GATES,
+                                                       max_gap=self.BEES_MAX_GAP,
+                                                       holdoff=self.BEES_HOLDOFF)
+            self.bee_counter.start()
+        except Exception as error:
+            self.log_msg('BEES', 'Error: %s' % str(error))
+
     ## Initialize camera
     def init_cam(self):
         self.log_msg('CAM', 'Initializing camera ...')
@@ -312,14 +372,15 @@ class HiveNode:
         return result
     
     ## Read DHT (if available)
-    def read_DHT(self, pin=4):
+    def read_DHT(self):
         self.log_msg('DHT', 'Reading from DHT ...')
         try:
-            sensor=Adafruit_DHT.DHT22
-            humidity, temperature = Adafruit_DHT.read_retry(sensor, pin, retries=5, delay_seconds=1)
+            humidity, temperature, age = self.dht_monitor.read()
             result = {
                 "dht_t" : temperature,
-                "dht_h" : humidity
+                "dht_h" : humidity,
+                "dht_age" : age,
+                "dht_rate" : self.dht_monitor.success_rate()
             }
             self.log_msg('DHT', 'OK: %s' % str(result))
         except Exception as error:
@@ -327,18 +388,58 @@ class HiveNode:
             self.log_msg('DHT', 'Error: %s' % str(error))
         return result
         
+    ## Read ADC (if available)
+    def read_ADC(self):
+        self.log_msg('ADC', 'Reading from ADC ...')
+        try:
+            stats = self.adc_sampler.stats(self.ADC_WINDOW)
+            result = {}
+            if stats is not None:
+                for i, name in enumerate(self.ADC_NAMES):
+                    for stat in ('mean', 'rms', 'min', 'max'):
+                        result['%s_%s' % (name, stat)] = round(float(stats[stat][i]), 4)
+                result['adc_n'] = stats['count']
+            self.log_msg('ADC', 'OK: %s' % str(result))
+        except Exception as error:
+            result = {}
+            self.log_msg('ADC', 'Error: %s' % str(error))
+        return result
+
+    ## Read Bee Counter (if available)
+    def read_bees(self):
+        self.log_msg('BEES', 'Reading bee counter ...')
+        try:
+            counts = self.bee_counter.read()
+            result = {
+                "bees_in" : counts['in'],
+                "bees_out" : counts['out'],
+                "bees_unpaired" : counts['unpaired'],
+                "bees_dropped" : counts['dropped']
+            }
+            self.log_msg('BEES', 'OK: %s' % str(result))
+        except Exception as error:
+            result = {}
+            self.log_msg('BEES', 'Error: %s' % str(error))
+        return result
+
     ## Read BMP (if available)
     def read_BMP(self):
         try:
-            temperature = self.BMP085.read_temperature()
-            pressure = self.BMP085.read_pressure()
-            altitude = self.BMP085.read_altitude()
-            sealevel_pressure = self.BMP085.read_read_sealevel_pressure()
+            if self.BMP_FILTER_ENABLED:
+                temperature, pressure, age = self.BMP085.read_filtered()
+            else:
+                temperature = self.BMP085.read_temperature()
+                pressure = self.BMP085.read_pressure()
+                age = 0.0
+            # Derive these from the same pressure instead of new readings.
+            altitude = self.BMP085.read_altitude(pressure=pressure)
+            sealevel_pressure = self.BMP085.read_sealevel_pressure(pressure=pressure)
             result = {
                 "bmp_t" : temperature,
                 "bmp_a" : altitude,
                 "bmp_p" : pressure,
-                "bmp_s" : sealevel_pressure
+                "bmp_s" : sealevel_pressure,
+                "bmp_age" : age
             }
             self.log_msg('BMP', 'OK: %s' % str(result))
         except Exception as error:
@@ -415,6 +516,18 @@ class HiveNode:
             self.camera.release()
         except Exception as e:
             self.log_msg('CAM', str(e))
+        try:
+            self.dht_monitor.stop()
+        except Exception as e:
+            self.log_msg('DHT', str(e))
+        try:
+            self.adc_sampler.stop()
+        except Exception as e:
+            self.log_msg('ADC', str(e))
+        try:
+            self.bee_counter.stop()
+        except Exception as e:
+            self.log_msg('BEES', str(e))
         os.system("sudo reboot")
             
     ## Update to Aggregator
@@ -448,6 +561,16 @@ class HiveNode:
             DHT_result = self.read_DHT()
             sample.update(DHT_result)
 
+        # ADC
+        if self.ADC_ENABLED:
+            ADC_result = self.read_ADC()
+            sample.update(ADC_result)
+
+        # Bees
+        if self.BEES_ENABLED:
+            bees_result = self.read_bees()
+            sample.update(bees_result)
+
         # CSV
         if self.CSV_ENABLED:
             self.csv_sample(sample)
@@ -18,9 +18,14 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+import json
 import logging
+import struct
+import threading
 import time
 
+import Adafruit_GPIO.Clock as Clock
+
 
 # BMP085 default address.
 BMP085_I2CADDR           = 0x77
@@ -43,53 +48,118 @@ BMP085_CAL_B2            = 0xB8  # R   Calibration data (16 bits)
 BMP085_CAL_MB            = 0xBA  # R   Calibration data (16 bits)
 BMP085_CAL_MC            = 0xBC  # R   Calibration data (16 bits)
 BMP085_CAL_MD            = 0xBE  # R   Calibration data (16 bits)
+BMP085_CAL_LENGTH        = 22    # Calibration EEPROM spans 0xAA to 0xBF
 BMP085_CONTROL           = 0xF4
 BMP085_TEMPDATA          = 0xF6
 BMP085_PRESSUREDATA      = 0xF6
 
+# Maximum conversion time in seconds for each operating mode.
+BMP085_CONVERSION_TIME   = { BMP085_ULTRALOWPOWER: 0.005,
+                             BMP085_STANDARD:      0.008,
+                             BMP085_HIGHRES:       0.014,
+                             BMP085_ULTRAHIGHRES:  0.026 }
+
+# Filtered readings from background sampling which are older than this many
+# sample periods are stale (the sampler is stopped or failing), and a direct
+# reading is taken instead.
+BMP085_STALE_PERIODS     = 4
+
 # Commands
 BMP085_READTEMPCMD       = 0x2E
 BMP085_READPRESSURECMD   = 0x34
 
+# Layout of the calibration EEPROM, AC1-AC3 are INT16, AC4-AC6 are UINT16 and
+# B1-MD are INT16, all big endian.
+BMP085_CAL_FORMAT        = '>hhhHHHhhhhh'
+
+# Clock for the age of filtered readings.
+_clock = Clock.monotonic
+
 
 class BMP085(object):
-	def __init__(self, mode=BMP085_STANDARD, address=BMP085_I2CADDR, i2c=None, **kwargs):
+	def __init__(self, mode=BMP085_STANDARD, address=BMP085_I2CADDR, i2c=None,
+				 calibration_file=None, **kwargs):
 		self._logger = logging.getLogger('Adafruit_BMP.BMP085')
 		# Check that mode is valid.
 		if mode not in [BMP085_ULTRALOWPOWER, BMP085_STANDARD, BMP085_HIGHRES, BMP085_ULTRAHIGHRES]:
 			raise ValueError('Unexpected mode value {0}.  Set mode to one of BMP085_ULTRALOWPOWER, BMP085_STANDARD, BMP085_HIGHRES, or BMP085_ULTRAHIGHRES'.format(mode))
 		self._mode = mode
+		# Serializes conversions between callers and the background sampler.
+		self._lock = threading.Lock()
+		self._sampler = None
+		self._sampler_stop = threading.Event()
+		# Filtered values as tuples of (value, clock time of the last sample),
+		# and how old each can get before it's stale.
+		self._filtered_pressure = None
+		self._filtered_temperature = None
+		self._pressure_max_age = None
+		self._temperature_max_age = None
 		# Create I2C device.
 		if i2c is None:
 			import Adafruit_GPIO.I2C as I2C
 			i2c = I2C
 		self._device = i2c.get_i2c_device(address, **kwargs)
+		# Calibration values can be persisted to a JSON file, keyed by bus and
+		# address so several sensors can share one file.
+		self._calibration_file = calibration_file
+		self._calibration_key = '{0}:{1:#04x}'.format(kwargs.get('busnum', 'default'), address)
 		# Load calibration values.
 		self._load_calibration()
 
 	def _load_calibration(self):
-		self.cal_AC1 = self._device.readS16BE(BMP085_CAL_AC1)   # INT16
-		self.cal_AC2 = self._device.readS16BE(BMP085_CAL_AC2)   # INT16
-		self.cal_AC3 = self._device.readS16BE(BMP085_CAL_AC3)   # INT16
-		self.cal_AC4 = self._device.readU16BE(BMP085_CAL_AC4)   # UINT16
-		self.cal_AC5 = self._device.readU16BE(BMP085_CAL_AC5)   # UINT16
-		self.cal_AC6 = self._device.readU16BE(BMP085_CAL_AC6)   # UINT16
-		self.cal_B1 = self._device.readS16BE(BMP085_CAL_B1)     # INT16
-		self.cal_B2 = self._device.readS16BE(BMP085_CAL_B2)     # INT16
-		self.cal_MB = self._device.readS16BE(BMP085_CAL_MB)     # INT16
-		self.cal_MC = self._device.readS16BE(BMP085_CAL_MC)     # INT16
-		self.cal_MD = self._device.readS16BE(BMP085_CAL_MD)     # INT16
-		self._logger.debug('AC1 = {0:6d}'.format(self.cal_AC1))
-		self._logger.debug('AC2 = {0:6d}'.format(self.cal_AC2))
-		self._logger.debug('AC3 = {0:6d}'.format(self.cal_AC3))
-		self._logger.debug('AC4 = {0:6d}'.format(self.cal_AC4))
-		self._logger.debug('AC5 = {0:6d}'.format(self.cal_AC5))
-		self._logger.debug('AC6 = {0:6d}'.format(self.cal_AC6))
-		self._logger.debug('B1 = {0:6d}'.format(self.cal_B1))
-		self._logger.debug('B2 = {0:6d}'.format(self.cal_B2))
-		self._logger.debug('MB = {0:6d}'.format(self.cal_MB))
-		self._logger.debug('MC = {0:6d}'.format(self.cal_MC))
-		self._logger.debug('MD = {0:6d}'.format(self.cal_MD))
+		cal = self._read_calibration_file()
+		if cal is None:
+			# Read the whole calibration EEPROM in one block transfer instead of
+			# eleven separate 16-bit register reads.
+			data = self._device.readList(BMP085_CAL_AC1, BMP085_CAL_LENGTH)
+			cal = struct.unpack(BMP085_CAL_FORMAT, bytes(bytearray(data)))
+			self._write_calibration_file(cal)
+		(self.cal_AC1, self.cal_AC2, self.cal_AC3, self.cal_AC4, self.cal_AC5,
+		 self.cal_AC6, self.cal_B1, self.cal_B2, self.cal_MB, self.cal_MC,
+		 self.cal_MD) = cal
+		if self._logger.isEnabledFor(logging.DEBUG):
+			for name in ('AC1', 'AC2', 'AC3', 'AC4', 'AC5', 'AC6', 'B1', 'B2', 'MB', 'MC', 'MD'):
+				self._logger.debug('%s = %6d', name, getattr(self, 'cal_' + name))
+
+	def get_calibration(self):
+		"""Return the calibration values as a tuple of (AC1, AC2, AC3, AC4, AC5,
+		AC6, B1, B2, MB, MC, MD).  Useful to compensate logged raw readings in
+		bulk with the Adafruit_BMP.compensation module."""
+		return (self.cal_AC1, self.cal_AC2, self.cal_AC3, self.cal_AC4, self.cal_AC5,
+				self.cal_AC6, self.cal_B1, self.cal_B2, self.cal_MB, self.cal_MC,
+				self.cal_MD)
+
+	def _read_calibration_file(self):
+		# Return the calibration tuple stored for this device, or None if there
+		# is no calibration file or it doesn't have an entry for this device.
+		if self._calibration_file is None:
+			return None
+		try:
+			with open(self._calibration_file, 'r') as infile:
+				cal = json.load(infile).get(self._calibration_key)
+		except (IOError, ValueError) as error:
+			self._logger.debug('Could not read calibration file: %s', error)
+			return None
+		if cal is None or len(cal) != 11:
+			return None
+		return tuple(cal)
+
+	def _write_calibration_file(self, cal):
+		# Save the calibration tuple for this device, keeping entries for any
+		# other devices already in the file.
+		if self._calibration_file is None:
+			return
+		try:
+			with open(self._calibration_file, 'r') as infile:
+				calibrations = json.load(infile)
+		except (IOError, ValueError):
+			calibrations = {}
+		calibrations[self._calibration_key] = list(cal)
+		try:
+			with open(self._calibration_file, 'w') as outfile:
+				json.dump(calibrations, outfile)
+		except IOError as error:
+			self._logger.warning('Could not write calibration file: %s', error)
 
 	def _load_datasheet_calibration(self):
 		# Set calibration from values in the datasheet example.  Useful for debugging the
@@ -108,94 +178,202 @@ class BMP085(object):
 
 	def read_raw_temp(self):
 		"""Reads the raw (uncompensated) temperature from the sensor."""
-		self._device.write8(BMP085_CONTROL, BMP085_READTEMPCMD)
-		time.sleep(0.005)  # Wait 5ms
-		raw = self._device.readU16BE(BMP085_TEMPDATA)
-		self._logger.debug('Raw temp 0x{0:X} ({1})'.format(raw & 0xFFFF, raw))
+		with self._lock:
+			self._device.write8(BMP085_CONTROL, BMP085_READTEMPCMD)
+			time.sleep(0.005)  # Wait 5ms
+			raw = self._device.readU16BE(BMP085_TEMPDATA)
+		self._logger.debug('Raw temp 0x%X (%d)', raw & 0xFFFF, raw)
 		return raw
 
-	def read_raw_pressure(self):
-		"""Reads the raw (uncompensated) pressure level from the sensor."""
-		self._device.write8(BMP085_CONTROL, BMP085_READPRESSURECMD + (self._mode << 6))
-		if self._mode == BMP085_ULTRALOWPOWER:
-			time.sleep(0.005)
-		elif self._mode == BMP085_HIGHRES:
-			time.sleep(0.014)
-		elif self._mode == BMP085_ULTRAHIGHRES:
-			time.sleep(0.026)
-		else:
-			time.sleep(0.008)
-		msb = self._device.readU8(BMP085_PRESSUREDATA)
-		lsb = self._device.readU8(BMP085_PRESSUREDATA+1)
-		xlsb = self._device.readU8(BMP085_PRESSUREDATA+2)
-		raw = ((msb << 16) + (lsb << 8) + xlsb) >> (8 - self._mode)
-		self._logger.debug('Raw pressure 0x{0:04X} ({1})'.format(raw & 0xFFFF, raw))
+	def read_raw_pressure(self, mode=None):
+		"""Reads the raw (uncompensated) pressure level from the sensor.  The
+		oversampling mode defaults to the mode the sensor was created with."""
+		if mode is None:
+			mode = self._mode
+		with self._lock:
+			self._device.write8(BMP085_CONTROL, BMP085_READPRESSURECMD + (mode << 6))
+			time.sleep(BMP085_CONVERSION_TIME[mode])
+			# Read MSB, LSB and XLSB in a single block transfer.
+			msb, lsb, xlsb = bytearray(self._device.readList(BMP085_PRESSUREDATA, 3))
+		raw = ((msb << 16) + (lsb << 8) + xlsb) >> (8 - mode)
+		self._logger.debug('Raw pressure 0x%04X (%d)', raw & 0xFFFF, raw)
 		return raw
 
-	def read_temperature(self):
-		"""Gets the compensated temperature in degrees celsius."""
-		UT = self.read_raw_temp()
-		# Datasheet value for debugging:
-		#UT = 27898
-		# Calculations below are taken straight from section 3.5 of the datasheet.
+	def _compute_B5(self, UT):
+		# Calculate true temperature coefficient B5 (section 3.5 of the datasheet).
 		X1 = ((UT - self.cal_AC6) * self.cal_AC5) >> 15
-		X2 = (self.cal_MC << 11) / (X1 + self.cal_MD)
-		B5 = X1 + X2
-		temp = ((B5 + 8) >> 4) / 10.0
-		self._logger.debug('Calibrated temperature {0} C'.format(temp))
-		return temp
+		X2 = (self.cal_MC << 11) // (X1 + self.cal_MD)
+		return X1 + X2
 
-	def read_pressure(self):
-		"""Gets the compensated pressure in Pascals."""
-		UT = self.read_raw_temp()
-		UP = self.read_raw_pressure()
-		# Datasheet values for debugging:
-		#UT = 27898
-		#UP = 23843
+	def _compensate_temperature(self, UT):
+		# Return the temperature in degrees celsius for a raw temperature value.
+		return ((self._compute_B5(UT) + 8) >> 4) / 10.0
+
+	def _compensate_pressure(self, UT, UP, mode):
+		# Return the pressure in Pascals for raw temperature and pressure values
+		# taken with the specified oversampling mode.
 		# Calculations below are taken straight from section 3.5 of the datasheet.
-		# Calculate true temperature coefficient B5.
-		X1 = ((UT - self.cal_AC6) * self.cal_AC5) >> 15
-		X2 = (self.cal_MC << 11) / (X1 + self.cal_MD)
-		B5 = X1 + X2
-		self._logger.debug('B5 = {0}'.format(B5))
+		B5 = self._compute_B5(UT)
 		# Pressure Calculations
 		B6 = B5 - 4000
-		self._logger.debug('B6 = {0}'.format(B6))
 		X1 = (self.cal_B2 * (B6 * B6) >> 12) >> 11
 		X2 = (self.cal_AC2 * B6) >> 11
 		X3 = X1 + X2
-		B3 = (((self.cal_AC1 * 4 + X3) << self._mode) + 2) / 4
-		self._logger.debug('B3 = {0}'.format(B3))
+		B3 = (((self.cal_AC1 * 4 + X3) << mode) + 2) // 4
 		X1 = (self.cal_AC3 * B6) >> 13
 		X2 = (self.cal_B1 * ((B6 * B6) >> 12)) >> 16
 		X3 = ((X1 + X2) + 2) >> 2
 		B4 = (self.cal_AC4 * (X3 + 32768)) >> 15
-		self._logger.debug('B4 = {0}'.format(B4))
-		B7 = (UP - B3) * (50000 >> self._mode)
-		self._logger.debug('B7 = {0}'.format(B7))
+		B7 = (UP - B3) * (50000 >> mode)
 		if B7 < 0x80000000:
-			p = (B7 * 2) / B4
+			p = (B7 * 2) // B4
 		else:
-			p = (B7 / B4) * 2
+			p = (B7 // B4) * 2
 		X1 = (p >> 8) * (p >> 8)
 		X1 = (X1 * 3038) >> 16
 		X2 = (-7357 * p) >> 16
 		p = p + ((X1 + X2 + 3791) >> 4)
-		self._logger.debug('Pressure {0} Pa'.format(p))
+		if self._logger.isEnabledFor(logging.DEBUG):
+			self._logger.debug('B3 = %d, B4 = %d, B5 = %d, B6 = %d, B7 = %d', B3, B4, B5, B6, B7)
+			self._logger.debug('Pressure %d Pa', p)
 		return p
 
-	def read_altitude(self, sealevel_pa=101325.0):
-		"""Calculates the altitude in meters."""
+	def read_temperature(self):
+		"""Gets the compensated temperature in degrees celsius."""
+		UT = self.read_raw_temp()
+		# Datasheet value for debugging:
+		#UT = 27898
+		temp = self._compensate_temperature(UT)
+		self._logger.debug('Calibrated temperature %s C', temp)
+		return temp
+
+	def read_pressure(self):
+		"""Gets the compensated pressure in Pascals."""
+		UT = self.read_raw_temp()
+		UP = self.read_raw_pressure()
+		# Datasheet values for debugging:
+		#UT = 27898
+		#UP = 23843
+		return self._compensate_pressure(UT, UP, self._mode)
+
+	def start_sampling(self, alpha=0.05, mode=BMP085_ULTRAHIGHRES, temp_interval=1.0):
+		"""Start taking pressure readings continuously in a background thread.
+		Conversions are run back to back with only the datasheet conversion
+		delay between them, and each result is folded into an exponential
+		moving average with weight alpha (smaller values filter more heavily).
+		The temperature used for compensation is refreshed every temp_interval
+		seconds.  Read the filtered values with read_filtered_pressure,
+		read_filtered_temperature or read_filtered.
+		"""
+		if mode not in BMP085_CONVERSION_TIME:
+			raise ValueError('Unexpected mode value {0}.'.format(mode))
+		if not 0.0 < alpha <= 1.0:
+			raise ValueError('Alpha must be greater than 0 and at most 1.')
+		self.stop_sampling()
+		self._filtered_pressure = None
+		self._filtered_temperature = None
+		# A sample takes a pressure conversion and sometimes a temperature
+		# conversion, which takes as long as an ultra low power one.
+		period = BMP085_CONVERSION_TIME[BMP085_ULTRALOWPOWER] + BMP085_CONVERSION_TIME[mode]
+		self._pressure_max_age = BMP085_STALE_PERIODS * period
+		self._temperature_max_age = temp_interval + BMP085_STALE_PERIODS * period
+		self._sampler_stop.clear()
+		self._sampler = threading.Thread(target=self._sample_loop,
+										 args=(alpha, mode, temp_interval))
+		self._sampler.daemon = True
+		self._sampler.start()
+
+	def stop_sampling(self):
+		"""Stop the background sampling thread if it is running."""
+		self._sampler_stop.set()
+		if self._sampler is not None:
+			self._sampler.join()
+			self._sampler = None
+
+	def _sample_loop(self, alpha, mode, temp_interval):
+		UT = None
+		temp_time = 0
+		while not self._sampler_stop.is_set():
+			try:
+				if UT is None or _clock() - temp_time >= temp_interval:
+					UT = self.read_raw_temp()
+					temp_time = _clock()
+					temp = self._compensate_temperature(UT)
+					if self._filtered_temperature is not None:
+						temp = self._filtered_temperature[0] + alpha * (temp - self._filtered_temperature[0])
+					self._filtered_temperature = (temp, temp_time)
+				p = self._compensate_pressure(UT, self.read_raw_pressure(mode), mode)
+				if self._filtered_pressure is not None:
+					p = self._filtered_pressure[0] + alpha * (p - self._filtered_pressure[0])
+				self._filtered_pressure = (float(p), _clock())
+			except Exception as error:
+				# Keep sampling through transient bus errors, but wait on the
+				# stop event so stop_sampling doesn't have to wait out the delay.
+				self._logger.warning('Background sample failed: %s', error)
+				self._sampler_stop.wait(temp_interval)
+
+	def _fresh(self, filtered, max_age):
+		# Return a tuple of (value, age in seconds) for a (value, time) filtered
+		# reading, or None if there isn't one or it's stale.
+		if filtered is None:
+			return None
+		value, taken = filtered
+		age = _clock() - taken
+		if age > max_age:
+			self._logger.debug('Filtered value is %.3f seconds old, reading directly', age)
+			return None
+		return (value, age)
+
+	def read_filtered_pressure(self):
+		"""Gets the filtered pressure in Pascals from background sampling.  A
+		direct reading is taken if sampling hasn't produced a value yet, or its
+		value is stale because sampling was stopped or is failing."""
+		p = self._fresh(self._filtered_pressure, self._pressure_max_age)
+		if p is None:
+			return self.read_pressure()
+		return p[0]
+
+	def read_filtered_temperature(self):
+		"""Gets the filtered temperature in degrees celsius from background
+		sampling.  A direct reading is taken if sampling hasn't produced a value
+		yet, or its value is stale because sampling was stopped or is failing."""
+		temp = self._fresh(self._filtered_temperature, self._temperature_max_age)
+		if temp is None:
+			return self.read_temperature()
+		return temp[0]
+
+	def read_filtered(self):
+		"""Gets a tuple of (temperature, pressure, age) from background sampling,
+		where age is the number of seconds since the pressure was sampled.  When
+		the filtered values are missing or stale they're read directly and the
+		age is 0."""
+		temp = self._fresh(self._filtered_temperature, self._temperature_max_age)
+		p = self._fresh(self._filtered_pressure, self._pressure_max_age)
+		if temp is None or p is None:
+			UT = self.read_raw_temp()
+			UP = self.read_raw_pressure()
+			return (self._compensate_temperature(UT),
+					self._compensate_pressure(UT, UP, self._mode), 0.0)
+		return (temp[0], p[0], p[1])
+
+	def read_altitude(self, sealevel_pa=101325.0, pressure=None):
+		"""Calculates the altitude in meters.  Pass pressure in Pascals (like a
+		filtered reading) to use it instead of taking a new reading."""
 		# Calculation taken straight from section 3.6 of the datasheet.
-		pressure = float(self.read_pressure())
+		if pressure is None:
+			pressure = self.read_pressure()
+		pressure = float(pressure)
 		altitude = 44330.0 * (1.0 - pow(pressure / sealevel_pa, (1.0/5.255)))
-		self._logger.debug('Altitude {0} m'.format(altitude))
+		self._logger.debug('Altitude %s m', altitude)
 		return altitude
 
-	def read_sealevel_pressure(self, altitude_m=0.0):
+	def read_sealevel_pressure(self, altitude_m=0.0, pressure=None):
 		"""Calculates the pressure at sealevel when given a known altitude in
-		meters. Returns a value in Pascals."""
-		pressure = float(self.read_pressure())
+		meters. Returns a value in Pascals.  Pass pressure in Pascals to use it
+		instead of taking a new reading."""
+		if pressure is None:
+			pressure = self.read_pressure()
+		pressure = float(pressure)
 		p0 = pressure / pow(1.0 - altitude_m/44330.0, 5.255)
-		self._logger.debug('Sealevel pressure {0} Pa'.format(p0))
+		self._logger.debug('Sealevel pressure %s Pa', p0)
 		return p0
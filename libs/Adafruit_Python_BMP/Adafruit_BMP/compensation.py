@@ -0,0 +1,67 @@
+# Vectorized BMP085 temperature and pressure compensation.
+#
+# These functions apply the same integer math as BMP085.read_temperature and
+# BMP085.read_pressure (section 3.5 of the datasheet) to whole arrays of raw
+# UT/UP values at once, so raw readings logged at a high rate can be stored
+# compactly and compensated in bulk later, e.g. on the aggregator.  Results are
+# bit-exact with the scalar driver code.
+#
+# Calibration is passed as the 11 value tuple returned by
+# BMP085.get_calibration() (AC1, AC2, AC3, AC4, AC5, AC6, B1, B2, MB, MC, MD),
+# which is also the format persisted in the driver's calibration file.
+import numpy as np
+
+from Adafruit_BMP.BMP085 import BMP085_STANDARD
+
+
+# Compact record for a logged raw reading, 6 bytes per reading.
+RAW_DTYPE = np.dtype([('ut', '<u2'), ('up', '<u4')])
+
+
+def _unpack_calibration(cal):
+	if len(cal) != 11:
+		raise ValueError('Expected 11 calibration values but got {0}.'.format(len(cal)))
+	return [np.int64(value) for value in cal]
+
+def _compute_B5(cal, UT):
+	AC1, AC2, AC3, AC4, AC5, AC6, B1, B2, MB, MC, MD = cal
+	X1 = ((UT - AC6) * AC5) >> 15
+	X2 = (MC << 11) // (X1 + MD)
+	return X1 + X2
+
+def compensate_temperature(cal, UT):
+	"""Return an array of temperatures in degrees celsius for an array of raw
+	temperature values."""
+	cal = _unpack_calibration(cal)
+	UT = np.asarray(UT, dtype=np.int64)
+	return ((_compute_B5(cal, UT) + 8) >> 4) / 10.0
+
+def compensate_pressure(cal, UT, UP, mode=BMP085_STANDARD):
+	"""Return an array of pressures in Pascals for arrays of raw temperature
+	and pressure values taken with the specified oversampling mode."""
+	cal = _unpack_calibration(cal)
+	AC1, AC2, AC3, AC4, AC5, AC6, B1, B2, MB, MC, MD = cal
+	UT = np.asarray(UT, dtype=np.int64)
+	UP = np.asarray(UP, dtype=np.int64)
+	B6 = _compute_B5(cal, UT) - 4000
+	X1 = (B2 * (B6 * B6) >> 12) >> 11
+	X2 = (AC2 * B6) >> 11
+	X3 = X1 + X2
+	B3 = (((AC1 * 4 + X3) << mode) + 2) // 4
+	X1 = (AC3 * B6) >> 13
+	X2 = (B1 * ((B6 * B6) >> 12)) >> 16
+	X3 = ((X1 + X2) + 2) >> 2
+	B4 = (AC4 * (X3 + 32768)) >> 15
+	B7 = (UP - B3) * (50000 >> mode)
+	p = np.where(B7 < 0x80000000, (B7 * 2) // B4, (B7 // B4) * 2)
+	X1 = (p >> 8) * (p >> 8)
+	X1 = (X1 * 3038) >> 16
+	X2 = (-7357 * p) >> 16
+	return p + ((X1 + X2 + 3791) >> 4)
+
+def compensate(cal, raw, mode=BMP085_STANDARD):
+	"""Compensate an array of RAW_DTYPE records and return a tuple of
+	(temperature, pressure) arrays."""
+	raw = np.asarray(raw, dtype=RAW_DTYPE)
+	return (compensate_temperature(cal, raw['ut']),
+			compensate_pressure(cal, raw['ut'], raw['up'], mode))
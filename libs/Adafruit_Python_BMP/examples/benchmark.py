@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# Count the I2C transactions the BMP085 driver makes to initialize and to take
+# a reading, and time the driver's per-reading compensation overhead with debug
+# logging off and on.  Runs against the simulated I2C bus so no sensor or smbus
+# is required.
+import logging
+import os
+import tempfile
+import timeit
+
+import Adafruit_BMP.BMP085 as BMP085
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+
+
+def new_bus():
+    # Return a simulated bus with a BMP085 model at its default address.
+    bus = SimulatedI2C.Bus()
+    bus.attach(BMP085.BMP085_I2CADDR, SimulatedI2C.BMP085Model())
+    return bus
+
+def count(func):
+    # Return the number of transactions made by calling func.
+    start = bus.transactions
+    func()
+    return bus.transactions - start
+
+
+cal_file = os.path.join(tempfile.mkdtemp(), 'bmp085.json')
+
+bus = new_bus()
+sensor = BMP085.BMP085(i2c=bus, calibration_file=cal_file)
+print('Initialize (no calibration file):   {0} transactions'.format(bus.transactions))
+print('read_temperature:                   {0} transactions'.format(count(sensor.read_temperature)))
+print('read_pressure:                      {0} transactions'.format(count(sensor.read_pressure)))
+bus.reset_counts()
+sensor.read_pressure()
+print('read_pressure bus time at 100kHz:   {0:.0f} us'.format(bus.bus_time * 1e6))
+
+bus = new_bus()
+sensor = BMP085.BMP085(i2c=bus, calibration_file=cal_file)
+print('Initialize (cached calibration):    {0} transactions'.format(bus.transactions))
+
+# Time the compensation math for one pressure reading, which is where the
+# driver's debug logging happens, with debug logging off and then on (sent to
+# a handler which discards it).
+READINGS = 20000
+
+def per_reading():
+    seconds = timeit.timeit(lambda: sensor._compensate_pressure(27898, 23843, BMP085.BMP085_STANDARD),
+                            number=READINGS)
+    return seconds / READINGS * 1e6
+
+logger = logging.getLogger('Adafruit_BMP.BMP085')
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+logger.setLevel(logging.WARNING)
+print('Compensate pressure, debug off:     {0:.2f} us/reading'.format(per_reading()))
+logger.setLevel(logging.DEBUG)
+print('Compensate pressure, debug on:      {0:.2f} us/reading'.format(per_reading()))
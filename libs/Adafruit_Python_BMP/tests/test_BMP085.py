@@ -0,0 +1,171 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+import Adafruit_BMP.BMP085 as BMP085
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+
+
+def new_bus():
+    # Return a simulated bus with a BMP085 at its default address, measuring
+    # the datasheet example raw temperature and pressure.
+    bus = SimulatedI2C.Bus()
+    bus.attach(BMP085.BMP085_I2CADDR, SimulatedI2C.BMP085Model())
+    return bus
+
+
+class TestBMP085(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cal_file = os.path.join(self.tempdir, 'bmp085.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_datasheet_example(self):
+        bus = new_bus()
+        sensor = BMP085.BMP085(mode=BMP085.BMP085_ULTRALOWPOWER, i2c=bus)
+        self.assertEqual(sensor.get_calibration(), SimulatedI2C.BMP085Model.CALIBRATION)
+        self.assertEqual(sensor.read_temperature(), 15.0)
+        self.assertEqual(sensor.read_pressure(), 69964)
+
+    def test_transaction_counts(self):
+        bus = new_bus()
+        sensor = BMP085.BMP085(i2c=bus)
+        # Calibration is read in one block transfer.
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(bus.counts['readList'], 1)
+        bus.reset_counts()
+        sensor.read_temperature()
+        self.assertEqual(bus.transactions, 2)
+        bus.reset_counts()
+        sensor.read_pressure()
+        self.assertEqual(bus.transactions, 4)
+
+    def test_cached_calibration_skips_eeprom_read(self):
+        bus = new_bus()
+        BMP085.BMP085(i2c=bus, calibration_file=self.cal_file)
+        self.assertEqual(bus.transactions, 1)
+        self.assertTrue(os.path.exists(self.cal_file))
+        bus = new_bus()
+        sensor = BMP085.BMP085(i2c=bus, calibration_file=self.cal_file)
+        self.assertEqual(bus.transactions, 0)
+        self.assertEqual(sensor.get_calibration(), SimulatedI2C.BMP085Model.CALIBRATION)
+        self.assertEqual(sensor.read_temperature(), 15.0)
+
+    def test_corrupt_calibration_file_reads_eeprom(self):
+        with open(self.cal_file, 'w') as outfile:
+            outfile.write('not json')
+        bus = new_bus()
+        sensor = BMP085.BMP085(i2c=bus, calibration_file=self.cal_file)
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(sensor.get_calibration(), SimulatedI2C.BMP085Model.CALIBRATION)
+
+
+class TestSampling(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = SimulatedI2C.Bus()
+        self.model = self.bus.attach(BMP085.BMP085_I2CADDR, SimulatedI2C.BMP085Model())
+        self.sensor = BMP085.BMP085(mode=BMP085.BMP085_ULTRALOWPOWER, i2c=self.bus)
+        self.addCleanup(self.sensor.stop_sampling)
+
+    def wait_for_sample(self):
+        deadline = time.time() + 5.0
+        while self.sensor._filtered_pressure is None:
+            self.assertLess(time.time(), deadline, 'No background sample taken.')
+            time.sleep(0.001)
+
+    def test_start_sampling(self):
+        self.sensor.start_sampling(mode=BMP085.BMP085_ULTRALOWPOWER)
+        self.wait_for_sample()
+        self.bus.reset_counts()
+        temperature, pressure, age = self.sensor.read_filtered()
+        self.assertEqual(temperature, 15.0)
+        self.assertEqual(pressure, 69964.0)
+        self.assertGreaterEqual(age, 0.0)
+        self.assertLess(age, self.sensor._pressure_max_age)
+        self.assertEqual(self.sensor.read_filtered_pressure(), 69964.0)
+        self.assertEqual(self.sensor.read_filtered_temperature(), 15.0)
+        self.sensor.stop_sampling()
+        self.assertIsNone(self.sensor._sampler)
+        conversions = self.model.conversions
+        time.sleep(0.05)
+        self.assertEqual(self.model.conversions, conversions)
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, self.sensor.start_sampling, mode=4)
+        self.assertRaises(ValueError, self.sensor.start_sampling, alpha=0.0)
+        self.assertRaises(ValueError, self.sensor.start_sampling, alpha=1.5)
+
+    def test_moving_average(self):
+        # Run the sample loop in this thread on a fixed sequence of raw
+        # pressures, stopping after the last one.
+        ups = [23843, 24843, 22843, 23843]
+        remaining = list(ups)
+        def read_raw_pressure(mode=None):
+            if len(remaining) == 1:
+                self.sensor._sampler_stop.set()
+            return remaining.pop(0)
+        self.sensor.read_raw_pressure = read_raw_pressure
+        self.sensor._sample_loop(0.25, BMP085.BMP085_ULTRALOWPOWER, 60.0)
+        expected = None
+        for up in ups:
+            p = self.sensor._compensate_pressure(27898, up, BMP085.BMP085_ULTRALOWPOWER)
+            expected = p if expected is None else expected + 0.25 * (p - expected)
+        self.assertAlmostEqual(self.sensor._filtered_pressure[0], expected)
+        self.assertNotEqual(expected, 69964.0)
+        # Temperature was only read once since temp_interval hadn't passed.
+        self.assertEqual(self.model.conversions, 1)
+        self.assertEqual(self.sensor._filtered_temperature[0], 15.0)
+
+    def test_stale_values_fall_back_to_direct_read(self):
+        self.sensor.start_sampling(mode=BMP085.BMP085_ULTRALOWPOWER)
+        self.wait_for_sample()
+        self.sensor.stop_sampling()
+        self.model.up = 24843
+        direct = self.sensor._compensate_pressure(27898, 24843, BMP085.BMP085_ULTRALOWPOWER)
+        # Values a second old are stale.
+        now = BMP085._clock() + 1.0
+        with patch.object(BMP085, '_clock', lambda: now):
+            self.bus.reset_counts()
+            self.assertEqual(self.sensor.read_filtered(), (15.0, direct, 0.0))
+            self.assertEqual(self.bus.transactions, 4)
+            self.assertEqual(self.sensor.read_filtered_pressure(), direct)
+            self.assertEqual(self.sensor.read_filtered_temperature(), 15.0)
+
+    def test_stop_while_failing_doesnt_wait(self):
+        # Remove the sensor from the bus so every sample fails.
+        self.bus.attach(BMP085.BMP085_I2CADDR, None)
+        self.sensor.start_sampling(temp_interval=60.0)
+        time.sleep(0.05)
+        start = time.time()
+        self.sensor.stop_sampling()
+        self.assertLess(time.time() - start, 1.0)
+        self.assertRaises(IOError, self.sensor.read_filtered)
@@ -0,0 +1,134 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import unittest
+
+import numpy as np
+
+import Adafruit_BMP.BMP085 as BMP085
+import Adafruit_BMP.compensation as compensation
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+
+
+MODES = (BMP085.BMP085_ULTRALOWPOWER, BMP085.BMP085_STANDARD,
+         BMP085.BMP085_HIGHRES, BMP085.BMP085_ULTRAHIGHRES)
+
+# Calibration of a BMP180 as well as the datasheet example, for coefficients
+# with different magnitudes.
+CALIBRATIONS = (SimulatedI2C.BMP085Model.CALIBRATION,
+                (7911, -934, -14306, 31567, 25671, 18974, 5498, 46, -32768, -11075, 2432))
+
+
+def new_sensor(cal):
+    # Return a driver on a simulated bus with the specified calibration.
+    bus = SimulatedI2C.Bus()
+    bus.attach(BMP085.BMP085_I2CADDR, SimulatedI2C.BMP085Model())
+    sensor = BMP085.BMP085(i2c=bus)
+    (sensor.cal_AC1, sensor.cal_AC2, sensor.cal_AC3, sensor.cal_AC4, sensor.cal_AC5,
+     sensor.cal_AC6, sensor.cal_B1, sensor.cal_B2, sensor.cal_MB, sensor.cal_MC,
+     sensor.cal_MD) = cal
+    return sensor
+
+def valid_ut(sensor, ut):
+    # Return the raw temperatures which don't divide by zero computing B5.
+    X1 = ((ut - sensor.cal_AC6) * sensor.cal_AC5) >> 15
+    return ut[X1 + sensor.cal_MD != 0]
+
+def scalar_pressures(sensor, ut, up, mode):
+    return [sensor._compensate_pressure(int(t), int(p), mode) for t, p in zip(ut, up)]
+
+
+class TestCompensation(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(0)
+
+    def test_datasheet_example(self):
+        cal = SimulatedI2C.BMP085Model.CALIBRATION
+        self.assertEqual(compensation.compensate_temperature(cal, [27898]).tolist(), [15.0])
+        self.assertEqual(compensation.compensate_pressure(cal, [27898], [23843],
+                         BMP085.BMP085_ULTRALOWPOWER).tolist(), [69964])
+
+    def test_temperature_matches_driver(self):
+        for cal in CALIBRATIONS:
+            sensor = new_sensor(cal)
+            ut = valid_ut(sensor, np.arange(0, 65536, dtype=np.int64))
+            expected = [sensor._compensate_temperature(int(t)) for t in ut]
+            self.assertTrue(np.array_equal(compensation.compensate_temperature(cal, ut), expected))
+
+    def test_pressure_matches_driver_in_every_mode(self):
+        for cal in CALIBRATIONS:
+            sensor = new_sensor(cal)
+            for mode in MODES:
+                # Random readings over the full raw range of the mode.
+                ut = valid_ut(sensor, self.random.randint(0, 65536, 5000))
+                up = self.random.randint(0, 1 << (16 + mode), len(ut))
+                self.assertTrue(np.array_equal(compensation.compensate_pressure(cal, ut, up, mode),
+                                               scalar_pressures(sensor, ut, up, mode)))
+
+    def test_pressure_matches_driver_at_range_limits(self):
+        # The largest intermediate values, and so the closest the int64 math
+        # gets to overflowing, come from the smallest and largest raw pressures
+        # with raw temperatures either side of where computing B5 divides by
+        # zero, and from the ends of the raw temperature range.
+        for cal in CALIBRATIONS:
+            sensor = new_sensor(cal)
+            ut = np.arange(0, 65536, dtype=np.int64)
+            divisor = np.abs((((ut - sensor.cal_AC6) * sensor.cal_AC5) >> 15) + sensor.cal_MD)
+            ut = valid_ut(sensor, np.concatenate((ut[divisor <= 1], [0, 65535])))
+            for mode in MODES:
+                uts = np.repeat(ut, 2)
+                up = np.tile([0, (1 << (16 + mode)) - 1], len(ut))
+                self.assertTrue(np.array_equal(compensation.compensate_pressure(cal, uts, up, mode),
+                                               scalar_pressures(sensor, uts, up, mode)))
+
+    def test_pressure_matches_driver_at_B7_limit(self):
+        # The datasheet switches from (B7 * 2) // B4 to (B7 // B4) * 2 when B7
+        # reaches 0x80000000, check raw pressures either side of the switch.
+        for cal in CALIBRATIONS:
+            sensor = new_sensor(cal)
+            ut = valid_ut(sensor, np.array([20000, 27898, 34000], dtype=np.int64))
+            for mode in MODES:
+                for t in ut:
+                    t = int(t)
+                    B6 = sensor._compute_B5(t) - 4000
+                    X3 = ((sensor.cal_B2 * (B6 * B6) >> 12) >> 11) + ((sensor.cal_AC2 * B6) >> 11)
+                    B3 = (((sensor.cal_AC1 * 4 + X3) << mode) + 2) // 4
+                    limit = B3 + -(-0x80000000 // (50000 >> mode))
+                    up = np.arange(limit - 3, limit + 3)
+                    uts = np.full(len(up), t, dtype=np.int64)
+                    self.assertTrue(np.array_equal(compensation.compensate_pressure(cal, uts, up, mode),
+                                                   scalar_pressures(sensor, uts, up, mode)))
+
+    def test_compensate_raw_records(self):
+        cal = SimulatedI2C.BMP085Model.CALIBRATION
+        sensor = new_sensor(cal)
+        for mode in MODES:
+            raw = np.zeros(1000, dtype=compensation.RAW_DTYPE)
+            raw['ut'] = self.random.randint(24000, 34000, len(raw))
+            raw['up'] = self.random.randint(20000 << mode, 40000 << mode, len(raw))
+            temperature, pressure = compensation.compensate(cal, raw, mode)
+            self.assertTrue(np.array_equal(temperature,
+                            [sensor._compensate_temperature(int(ut)) for ut in raw['ut']]))
+            self.assertTrue(np.array_equal(pressure, scalar_pressures(sensor, raw['ut'], raw['up'], mode)))
+
+    def test_wrong_calibration_length(self):
+        self.assertRaises(ValueError, compensation.compensate_temperature, (1, 2, 3), [27898])
@@ -36,3 +36,37 @@ def read(sensor, pin):
 		# Some kind of error occured.
 		raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
 	return (humidity, temp)
+
+def read_multi(sensor, pins):
+	# Validate pins are valid GPIOs.
+	for pin in pins:
+		if pin is None or int(pin) < 0 or int(pin) > 31:
+			raise ValueError('Pin must be a valid GPIO number 0 to 31.')
+	# Get readings for all the pins from a single C driver call.
+	readings = []
+	for result, humidity, temp in driver.read_multi(sensor, [int(pin) for pin in pins]):
+		if result in common.TRANSIENT_ERRORS:
+			# Signal no result could be obtained for this pin, but the caller can retry.
+			readings.append((None, None))
+		elif result == common.DHT_ERROR_GPIO:
+			raise RuntimeError('Error accessing GPIO. Make sure program is run as root with sudo!')
+		elif result != common.DHT_SUCCESS:
+			# Some kind of error occured.
+			raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
+		else:
+			readings.append((humidity, temp))
+	return readings
+
+def read_raw(pin):
+	# Validate pin is a valid GPIO.
+	if pin is None or int(pin) < 0 or int(pin) > 31:
+		raise ValueError('Pin must be a valid GPIO number 0 to 31.')
+	# Get the raw pulse widths from C driver code, a timeout is returned with
+	# the pulses seen so far so the caller can see where the read failed.
+	result, pulses = driver.read_raw(int(pin))
+	if result == common.DHT_ERROR_GPIO:
+		raise RuntimeError('Error accessing GPIO. Make sure program is run as root with sudo!')
+	elif result not in (common.DHT_SUCCESS, common.DHT_ERROR_TIMEOUT):
+		# Some kind of error occured.
+		raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
+	return (result, pulses)
@@ -38,12 +38,23 @@ AM2302 = 22
 SENSORS = [DHT11, DHT22, AM2302]
 
 
+# Platform interface, looked up on first use.
+_platform = None
+
+
 def get_platform():
-	"""Return a DHT platform interface for the currently detected platform."""
-	plat = platform_detect.platform_detect()
-	if plat == platform_detect.RASPBERRY_PI:
+	"""Return a DHT platform interface for the currently detected platform.  The
+	interface is looked up once and cached, so reads don't repeat detection."""
+	global _platform
+	if _platform is None:
+		_platform = _load_platform()
+	return _platform
+
+def _load_platform():
+	board = platform_detect.board()
+	if board.platform == platform_detect.RASPBERRY_PI:
 		# Check for version 1 or 2 of the pi.
-		version = platform_detect.pi_version()
+		version = board.pi_version
 		if version == 1:
 			import Raspberry_Pi
 			return Raspberry_Pi
@@ -52,7 +63,7 @@ def get_platform():
 			return Raspberry_Pi_2
 		else:
 			raise RuntimeError('No driver for detected Raspberry Pi version available!')
-	elif plat == platform_detect.BEAGLEBONE_BLACK:
+	elif board.platform == platform_detect.BEAGLEBONE_BLACK:
 		import Beaglebone_Black
 		return Beaglebone_Black
 	else:
@@ -76,6 +87,37 @@ def read(sensor, pin, platform=None):
 		platform = get_platform()
 	return platform.read(sensor, pin)
 
+def read_multi(sensor, pins, platform=None):
+	"""Read several DHT sensors of the same type (DHT11, DHT22, or AM2302) on the
+	specified list of pins and return a list of (humidity, temperature) tuples,
+	one for each pin.  Like the read function a tuple of (None, None) is returned
+	for a sensor which couldn't be read and should be retried.  On platforms
+	whose driver supports it all the sensors are read in a single driver call,
+	so reading several sensors takes about as long as reading one.  Otherwise
+	the sensors are read one after another.
+	"""
+	if sensor not in SENSORS:
+		raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+	if platform is None:
+		platform = get_platform()
+	if hasattr(platform, 'read_multi'):
+		return platform.read_multi(sensor, pins)
+	return [platform.read(sensor, pin) for pin in pins]
+
+def read_raw(pin, platform=None):
+	"""Read the raw pulse widths sent by a DHT sensor on the specified pin
+	without decoding them, for diagnosing bad reads.  Returns a tuple of the
+	result (DHT_SUCCESS, or DHT_ERROR_TIMEOUT if the sensor stopped responding)
+	and a list of the 82 pulse widths, alternating low and high, measured in
+	driver loop counts.  Pulses after a timeout are zero.  See the diagnostics
+	module for decoding the pulses.  Only supported on the Raspberry Pi 2.
+	"""
+	if platform is None:
+		platform = get_platform()
+	if not hasattr(platform, 'read_raw'):
+		raise RuntimeError('Raw pulse reads are not supported on this platform.')
+	return platform.read_raw(pin)
+
 def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None):
 	"""Read DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on 
 	specified pin and return a tuple of humidity (as a floating point value
@@ -0,0 +1,178 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# Tools for diagnosing bad DHT sensor reads from the raw pulse widths returned
+# by common.read_raw.  The C driver decodes a bit as 1 when its high pulse is
+# longer than the average low pulse, which fails when scheduling jitter or long
+# wires stretch the pulses.  The decoder here instead picks the threshold which
+# best separates the two clusters of high pulse widths and reports how far each
+# bit was from it, so marginal reads and wiring problems can be spotted.
+#
+# Requires numpy.
+from collections import namedtuple
+
+import numpy as np
+
+import common
+
+
+# Number of raw pulse widths in a reading: the sensor's response pulse low and
+# high, then a low and high pulse for each of the 40 data bits.
+RAW_PULSES = 82
+DATA_BITS = 40
+
+# Result of decoding a reading.  Data is the 5 bytes sent by the sensor,
+# threshold is the high pulse width which separated 0 and 1 bits, and
+# confidence is an array with a value from 0 to 1 for each bit (0 meaning the
+# pulse was right on the threshold).
+Decoded = namedtuple('Decoded', ['humidity', 'temperature', 'checksum_ok',
+	'data', 'threshold', 'confidence'])
+
+
+def _threshold(highs):
+	# Split the high pulse widths into two clusters (iterative 2-means, also
+	# known as the isodata threshold) and return the midpoint between them.
+	threshold = (highs.min() + highs.max()) / 2.0
+	for i in range(32):
+		zeros = highs[highs <= threshold]
+		ones = highs[highs > threshold]
+		if len(zeros) == 0 or len(ones) == 0:
+			break
+		updated = (zeros.mean() + ones.mean()) / 2.0
+		if updated == threshold:
+			break
+		threshold = updated
+	return threshold
+
+def _convert(sensor, data):
+	# Convert the 5 data bytes to humidity and temperature like the C driver.
+	if sensor == common.DHT11:
+		return (float(data[0]), float(data[2]))
+	humidity = (data[0] * 256 + data[1]) / 10.0
+	temperature = ((data[2] & 0x7F) * 256 + data[3]) / 10.0
+	if data[2] & 0x80:
+		temperature *= -1.0
+	return (humidity, temperature)
+
+def decode(sensor, pulses):
+	"""Decode a list of RAW_PULSES pulse widths from common.read_raw for the
+	specified sensor type and return a Decoded tuple.  Humidity and temperature
+	are None when the checksum doesn't match.
+	"""
+	if sensor not in common.SENSORS:
+		raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+	pulses = np.asarray(pulses, dtype=np.float64)
+	if pulses.shape != (RAW_PULSES,):
+		raise ValueError('Expected {0} pulse widths but got {1}.'.format(RAW_PULSES, pulses.size))
+	# Skip the response pulse and take the high width of each data bit.
+	highs = pulses[3::2]
+	lows = pulses[2::2]
+	if highs.max() - highs.min() < lows.mean() / 2.0:
+		# The high pulses are all about the same width, so all the bits have
+		# the same value and there's only one cluster.  Fall back to the C
+		# driver's threshold of the average low pulse width.  (A 1 bit's high
+		# pulse is about a low pulse width longer than a 0 bit's, even when
+		# long wires stretch them all past the low pulse width.)
+		threshold = lows.mean()
+	else:
+		threshold = _threshold(highs)
+	bits = highs > threshold
+	# Scale each bit's distance from the threshold by half the gap between the
+	# cluster centers, so a typical bit has a confidence of about 1.
+	zeros = highs[~bits]
+	ones = highs[bits]
+	if len(zeros) and len(ones):
+		spread = (ones.mean() - zeros.mean()) / 2.0
+	else:
+		spread = 0.0
+	if spread > 0:
+		confidence = np.minimum(np.abs(highs - threshold) / spread, 1.0)
+	else:
+		confidence = np.zeros(DATA_BITS)
+	data = np.packbits(bits.astype(np.uint8)).tolist()
+	checksum_ok = data[4] == (sum(data[0:4]) & 0xFF)
+	if checksum_ok:
+		humidity, temperature = _convert(sensor, data)
+	else:
+		humidity, temperature = None, None
+	return Decoded(humidity, temperature, checksum_ok, data, threshold, confidence)
+
+
+class ReadStats(object):
+	"""Collect per-pin counts of successful reads, timeouts, and checksum
+	errors from raw reads, to tell an intermittent sensor from a bad one.
+	"""
+
+	def __init__(self, sensor, platform=None):
+		if sensor not in common.SENSORS:
+			raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+		self._sensor = sensor
+		self._platform = platform
+		self._counts = {}
+
+	def read(self, pin):
+		"""Take a raw reading of the sensor on the specified pin, record the
+		outcome, and return the Decoded result or None on a timeout.
+		"""
+		result, pulses = common.read_raw(pin, self._platform)
+		if result != common.DHT_SUCCESS:
+			self.record(pin, result)
+			return None
+		decoded = decode(self._sensor, pulses)
+		if decoded.checksum_ok:
+			self.record(pin, common.DHT_SUCCESS, decoded)
+		else:
+			self.record(pin, common.DHT_ERROR_CHECKSUM, decoded)
+		return decoded
+
+	def record(self, pin, result, decoded=None):
+		"""Record the result code of a read on the specified pin.  Pass the
+		Decoded reading to also track the lowest bit confidence seen.
+		"""
+		counts = self._counts.setdefault(pin, {'reads': 0, 'successes': 0,
+			'timeouts': 0, 'checksum_errors': 0, 'min_confidence': None})
+		counts['reads'] += 1
+		if result == common.DHT_SUCCESS:
+			counts['successes'] += 1
+		elif result == common.DHT_ERROR_TIMEOUT:
+			counts['timeouts'] += 1
+		elif result == common.DHT_ERROR_CHECKSUM:
+			counts['checksum_errors'] += 1
+		if decoded is not None:
+			confidence = float(decoded.confidence.min())
+			if counts['min_confidence'] is None or confidence < counts['min_confidence']:
+				counts['min_confidence'] = confidence
+
+	def summary(self):
+		"""Return a dict, keyed by pin, of dicts with the read count, the
+		success, timeout, and checksum error rates, and the lowest bit
+		confidence seen.
+		"""
+		summary = {}
+		for pin, counts in self._counts.items():
+			reads = float(counts['reads'])
+			summary[pin] = {
+				'reads': counts['reads'],
+				'success_rate': counts['successes'] / reads,
+				'timeout_rate': counts['timeouts'] / reads,
+				'checksum_error_rate': counts['checksum_errors'] / reads,
+				'min_confidence': counts['min_confidence']
+			}
+		return summary
@@ -0,0 +1,127 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+import time
+
+import common
+
+
+# The DHT sensors can't be read more often than about once every 2 seconds.
+MIN_INTERVAL = 2.0
+
+# Clock for reading ages.  The Adafruit Python GPIO library has a monotonic
+# clock for Python 2 too, without it only Python 3 has one.
+try:
+	from Adafruit_GPIO.Clock import monotonic as _clock
+except ImportError:
+	_clock = getattr(time, 'monotonic', time.time)
+
+
+class Monitor(object):
+	"""Read a DHT sensor continuously in a background thread and keep the last
+	good reading.  Failed reads are retried every MIN_INTERVAL seconds until one
+	succeeds, then the sensor is read again every interval seconds.  Callers get
+	the last good reading immediately from read() instead of blocking on the
+	sensor's timing and retries.  The last_error attribute is the reason the
+	latest read failed, or None if it succeeded.
+	"""
+
+	def __init__(self, sensor, pin, interval=MIN_INTERVAL, platform=None):
+		if sensor not in common.SENSORS:
+			raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+		self._sensor = sensor
+		self._pin = pin
+		self._interval = max(interval, MIN_INTERVAL)
+		self._platform = platform
+		# Last good reading as a tuple of (humidity, temperature, clock time).
+		self._reading = (None, None, None)
+		self._stop = threading.Event()
+		self._thread = None
+		self.attempts = 0
+		self.successes = 0
+		self.consecutive_failures = 0
+		self.last_error = None
+
+	def start(self):
+		"""Start reading the sensor in a background thread."""
+		if self._thread is not None:
+			return
+		if self._platform is None:
+			self._platform = common.get_platform()
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		"""Stop the background thread and wait for it to finish."""
+		if self._thread is None:
+			return
+		self._stop.set()
+		self._thread.join()
+		self._thread = None
+
+	def _run(self):
+		while not self._stop.is_set():
+			if self._read_once():
+				delay = self._interval
+			else:
+				delay = MIN_INTERVAL
+			self._stop.wait(delay)
+
+	def _read_once(self):
+		# Take one reading and update the counters, return True if it succeeded.
+		self.attempts += 1
+		try:
+			humidity, temperature = common.read(self._sensor, self._pin, self._platform)
+		except Exception as error:
+			# Count any error as a failed read so the thread keeps running,
+			# instead of dying and leaving the last reading in place forever.
+			humidity, temperature = None, None
+			reason = str(error)
+		else:
+			reason = 'No reading returned, the sensor timed out or the checksum failed.'
+		if humidity is None or temperature is None:
+			self.last_error = reason
+			self.consecutive_failures += 1
+			return False
+		self._reading = (humidity, temperature, _clock())
+		self.successes += 1
+		self.consecutive_failures = 0
+		self.last_error = None
+		return True
+
+	def read(self):
+		"""Return a tuple of (humidity, temperature, age) for the last good
+		reading, where age is the number of seconds since it was taken.  Returns
+		(None, None, None) if no good reading has been taken yet.
+		"""
+		humidity, temperature, taken = self._reading
+		if taken is None:
+			return (None, None, None)
+		return (humidity, temperature, _clock() - taken)
+
+	def success_rate(self):
+		"""Return the fraction of reads which succeeded, or None if the sensor
+		hasn't been read yet."""
+		if self.attempts == 0:
+			return None
+		return self.successes / float(self.attempts)
@@ -22,8 +22,11 @@
 # This is a direct copy of what's in the Adafruit Python GPIO library:
 #  https://raw.githubusercontent.com/adafruit/Adafruit_Python_GPIO/master/Adafruit_GPIO/Platform.py
 # TODO: Add dependency on Adafruit Python GPIO and use its platform detect
-# functions.
+# functions.  Until then keep this in step with Adafruit_GPIO/Platform.py, which
+# is used instead when it's installed.
 
+import collections
+import os
 import platform
 import re
 
@@ -31,6 +34,77 @@ import re
 UNKNOWN          = 0
 RASPBERRY_PI     = 1
 BEAGLEBONE_BLACK = 2
+MINNOWBOARD      = 3
+
+# Environment variable which overrides board detection, useful for testing.
+# Same format as the Adafruit Python GPIO library, for example
+# ADAFRUIT_PLATFORM=RASPBERRY_PI,2,2
+PLATFORM_ENV = 'ADAFRUIT_PLATFORM'
+
+# Description of the board the process is running on.  The Pi version and
+# revision are None when not running on a Raspberry Pi, and the revision is
+# also None on a Pi which doesn't report it.
+Board = collections.namedtuple('Board', ['platform', 'pi_version', 'pi_revision'])
+
+# Share the process wide cached board with the Adafruit Python GPIO library
+# when it's installed so detection only happens once for both libraries.
+try:
+    import Adafruit_GPIO.Platform as _gpio_platform
+except ImportError:
+    _gpio_platform = None
+
+_board = None
+
+
+def board():
+    """Return a Board tuple of (platform, pi_version, pi_revision) for the
+    current board.  Detection is done once and cached for the life of the
+    process.  Set the ADAFRUIT_PLATFORM environment variable to skip detection
+    and use an explicit board.
+    """
+    global _board
+    if _gpio_platform is not None:
+        return _gpio_platform.board()
+    if _board is None:
+        _board = _detect_board()
+    return _board
+
+def clear_board_cache():
+    """Forget the cached board so the next call to board() detects it again."""
+    global _board
+    if _gpio_platform is not None:
+        _gpio_platform.clear_board_cache()
+    _board = None
+
+def _detect_board():
+    override = os.environ.get(PLATFORM_ENV)
+    if override:
+        return parse_board(override)
+    plat = platform_detect()
+    if plat == RASPBERRY_PI:
+        try:
+            revision = pi_revision()
+        except RuntimeError:
+            # Some kernels don't report a Revision line.  Only the default I2C
+            # bus depends on the revision, so leave it unknown instead of
+            # failing detection (and every sensor read) on those boards.
+            revision = None
+        return Board(plat, pi_version(), revision)
+    return Board(plat, None, None)
+
+def parse_board(value):
+    """Parse a board description like 'RASPBERRY_PI,2,2' or 'BEAGLEBONE_BLACK'
+    into a Board tuple."""
+    names = { 'UNKNOWN':          UNKNOWN,
+              'RASPBERRY_PI':     RASPBERRY_PI,
+              'BEAGLEBONE_BLACK': BEAGLEBONE_BLACK,
+              'MINNOWBOARD':      MINNOWBOARD }
+    fields = [field.strip() for field in value.split(',')]
+    if fields[0].upper() not in names or len(fields) > 3:
+        raise ValueError('Unexpected board description {0}.'.format(value))
+    numbers = [int(field) for field in fields[1:]]
+    numbers += [None]*(2 - len(numbers))
+    return Board(names[fields[0].upper()], numbers[0], numbers[1])
 
 
 def platform_detect():
@@ -51,7 +125,16 @@ def platform_detect():
         return BEAGLEBONE_BLACK
     elif plat.lower().find('armv7l-with-glibc2.4') > -1:
         return BEAGLEBONE_BLACK
-    
+
+    # Handle Minnowboard
+    # Assumption is that mraa is installed
+    try:
+        import mraa
+        if mraa.getPlatformName()=='MinnowBoard MAX':
+            return MINNOWBOARD
+    except ImportError:
+        pass
+
     # Couldn't figure out the platform, just return unknown.
     return UNKNOWN
 
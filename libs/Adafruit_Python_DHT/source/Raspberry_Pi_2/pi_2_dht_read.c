@@ -35,23 +35,69 @@
 // the data afterwards.
 #define DHT_PULSES 41
 
-int pi_2_dht_read(int type, int pin, float* humidity, float* temperature) {
-  // Validate humidity and temperature arguments and set them to zero.
-  if (humidity == NULL || temperature == NULL) {
+// Decode the recorded low/high pulse widths into humidity and temperature values.
+static int decode_pulses(int type, const int* pulseCounts, float* humidity, float* temperature) {
+  // Compute the average low pulse width to use as a 50 microsecond reference threshold.
+  // Ignore the first two readings because they are a constant 80 microsecond pulse.
+  uint32_t threshold = 0;
+  for (int i=2; i < DHT_PULSES*2; i+=2) {
+    threshold += pulseCounts[i];
+  }
+  threshold /= DHT_PULSES-1;
+
+  // Interpret each high pulse as a 0 or 1 by comparing it to the 50us reference.
+  // If the count is less than 50us it must be a ~28us 0 pulse, and if it's higher
+  // then it must be a ~70us 1 pulse.
+  uint8_t data[5] = {0};
+  for (int i=3; i < DHT_PULSES*2; i+=2) {
+    int index = (i-3)/16;
+    data[index] <<= 1;
+    if (pulseCounts[i] >= threshold) {
+      // One bit for long pulse.
+      data[index] |= 1;
+    }
+    // Else zero bit for short pulse.
+  }
+
+  // Useful debug info:
+  //printf("Data: 0x%x 0x%x 0x%x 0x%x 0x%x\n", data[0], data[1], data[2], data[3], data[4]);
+
+  // Verify checksum of received data.
+  if (data[4] == ((data[0] + data[1] + data[2] + data[3]) & 0xFF)) {
+    if (type == DHT11) {
+      // Get humidity and temp for DHT11 sensor.
+      *humidity = (float)data[0];
+      *temperature = (float)data[2];
+    }
+    else if (type == DHT22) {
+      // Calculate humidity and temp for DHT22 sensor.
+      *humidity = (data[0] * 256 + data[1]) / 10.0f;
+      *temperature = ((data[2] & 0x7F) * 256 + data[3]) / 10.0f;
+      if (data[2] & 0x80) {
+        *temperature *= -1.0f;
+      }
+    }
+    return DHT_SUCCESS;
+  }
+  else {
+    return DHT_ERROR_CHECKSUM;
+  }
+}
+
+int pi_2_dht_read_raw(int pin, int* pulseCounts) {
+  // Validate pulse count argument and set counts to zero.
+  if (pulseCounts == NULL) {
     return DHT_ERROR_ARGUMENT;
   }
-  *temperature = 0.0f;
-  *humidity = 0.0f;
+  for (int i=0; i < DHT_PULSES*2; ++i) {
+    pulseCounts[i] = 0;
+  }
 
   // Initialize GPIO library.
   if (pi_2_mmio_init() < 0) {
     return DHT_ERROR_GPIO;
   }
 
-  // Store the count that each DHT bit pulse is low and high.
-  // Make sure array is initialized to start at zero.
-  int pulseCounts[DHT_PULSES*2] = {0};
-
   // Set pin to output.
   pi_2_mmio_set_output(pin);
 
@@ -105,54 +151,138 @@ int pi_2_dht_read(int type, int pin, float* humidity, float* temperature) {
     }
   }
 
-  // Done with timing critical code, now interpret the results.
-
-  // Drop back to normal priority.
+  // Done with timing critical code, drop back to normal priority.
   set_default_priority();
+  return DHT_SUCCESS;
+}
 
-  // Compute the average low pulse width to use as a 50 microsecond reference threshold.
-  // Ignore the first two readings because they are a constant 80 microsecond pulse.
-  uint32_t threshold = 0;
-  for (int i=2; i < DHT_PULSES*2; i+=2) {
-    threshold += pulseCounts[i];
+int pi_2_dht_read(int type, int pin, float* humidity, float* temperature) {
+  // Validate humidity and temperature arguments and set them to zero.
+  if (humidity == NULL || temperature == NULL) {
+    return DHT_ERROR_ARGUMENT;
   }
-  threshold /= DHT_PULSES-1;
+  *temperature = 0.0f;
+  *humidity = 0.0f;
 
-  // Interpret each high pulse as a 0 or 1 by comparing it to the 50us reference.
-  // If the count is less than 50us it must be a ~28us 0 pulse, and if it's higher
-  // then it must be a ~70us 1 pulse.
-  uint8_t data[5] = {0};
-  for (int i=3; i < DHT_PULSES*2; i+=2) {
-    int index = (i-3)/16;
-    data[index] <<= 1;
-    if (pulseCounts[i] >= threshold) {
-      // One bit for long pulse.
-      data[index] |= 1;
-    }
-    // Else zero bit for short pulse.
+  // Store the count that each DHT bit pulse is low and high.
+  int pulseCounts[DHT_PULSES*2];
+  int result = pi_2_dht_read_raw(pin, pulseCounts);
+  if (result != DHT_SUCCESS) {
+    return result;
   }
 
-  // Useful debug info:
-  //printf("Data: 0x%x 0x%x 0x%x 0x%x 0x%x\n", data[0], data[1], data[2], data[3], data[4]);
+  // Interpret the results.
+  return decode_pulses(type, pulseCounts, humidity, temperature);
+}
 
-  // Verify checksum of received data.
-  if (data[4] == ((data[0] + data[1] + data[2] + data[3]) & 0xFF)) {
-    if (type == DHT11) {
-      // Get humidity and temp for DHT11 sensor.
-      *humidity = (float)data[0];
-      *temperature = (float)data[2];
+int pi_2_dht_read_multi(int type, const int* pins, int count, float* humidity, float* temperature,
+                        int* results) {
+  // Validate arguments and set outputs to zero.
+  if (pins == NULL || humidity == NULL || temperature == NULL || results == NULL ||
+      count < 1 || count > DHT_MAX_SENSORS) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  uint32_t pinMask = 0;
+  for (int s = 0; s < count; ++s) {
+    if (pins[s] < 0 || pins[s] > 31) {
+      return DHT_ERROR_ARGUMENT;
     }
-    else if (type == DHT22) {
-      // Calculate humidity and temp for DHT22 sensor.
-      *humidity = (data[0] * 256 + data[1]) / 10.0f;
-      *temperature = ((data[2] & 0x7F) * 256 + data[3]) / 10.0f;
-      if (data[2] & 0x80) {
-        *temperature *= -1.0f;
+    pinMask |= 1u << pins[s];
+    humidity[s] = 0.0f;
+    temperature[s] = 0.0f;
+    results[s] = DHT_SUCCESS;
+  }
+
+  // Initialize GPIO library.  The memory mapping is only set up on the first call.
+  if (pi_2_mmio_init() < 0) {
+    return DHT_ERROR_GPIO;
+  }
+
+  // Pulse widths for each sensor, and the index of the pulse each sensor is currently
+  // sending (-1 while waiting for the sensor to respond).
+  int pulseCounts[DHT_MAX_SENSORS][DHT_PULSES*2] = {{0}};
+  int pulse[DHT_MAX_SENSORS];
+  uint32_t waitCounts[DHT_MAX_SENSORS] = {0};
+  bool finished[DHT_MAX_SENSORS] = {false};
+  for (int s = 0; s < count; ++s) {
+    pulse[s] = -1;
+    pi_2_mmio_set_output(pins[s]);
+  }
+
+  // Bump up process priority and change scheduler to try to try to make process more 'real time'.
+  set_max_priority();
+
+  // Set all pins high for ~500 milliseconds.
+  pi_2_mmio_set_high_mask(pinMask);
+  sleep_milliseconds(500);
+
+  // The next calls are timing critical and care should be taken
+  // to ensure no unnecssary work is done below.
+
+  // Send the ~20 millisecond start signal to every sensor at once.
+  pi_2_mmio_set_low_mask(pinMask);
+  busy_wait_milliseconds(20);
+
+  // Set pins as inputs.
+  for (int s = 0; s < count; ++s) {
+    pi_2_mmio_set_input(pins[s]);
+  }
+  // Need a very short delay before reading pins or else value is sometimes still low.
+  for (volatile int i = 0; i < 50; ++i) {
+  }
+
+  // Sample all the pins with one register read per loop and record the pulse widths of
+  // every sensor in parallel.
+  int active = count;
+  while (active > 0) {
+    uint32_t level = pi_2_mmio_input_all();
+    for (int s = 0; s < count; ++s) {
+      if (finished[s]) {
+        continue;
+      }
+      bool high = (level & (1u << pins[s])) != 0;
+      if (pulse[s] < 0) {
+        // Wait for DHT to pull pin low.
+        if (!high) {
+          pulse[s] = 0;
+          pulseCounts[s][0] = 1;
+        }
+        else if (++waitCounts[s] >= DHT_MAXCOUNT) {
+          results[s] = DHT_ERROR_TIMEOUT;
+          finished[s] = true;
+          --active;
+        }
+        continue;
+      }
+      // Even pulses are low and odd pulses are high, keep counting while the pin is
+      // still at the level of the current pulse.
+      if (high == (bool)(pulse[s] & 1)) {
+        if (++pulseCounts[s][pulse[s]] >= DHT_MAXCOUNT) {
+          results[s] = DHT_ERROR_TIMEOUT;
+          finished[s] = true;
+          --active;
+        }
+      }
+      else if (++pulse[s] == DHT_PULSES*2) {
+        // All pulses received.
+        finished[s] = true;
+        --active;
+      }
+      else {
+        pulseCounts[s][pulse[s]] = 1;
       }
     }
-    return DHT_SUCCESS;
   }
-  else {
-    return DHT_ERROR_CHECKSUM;
+
+  // Done with timing critical code, now interpret the results.
+
+  // Drop back to normal priority.
+  set_default_priority();
+
+  for (int s = 0; s < count; ++s) {
+    if (results[s] == DHT_SUCCESS) {
+      results[s] = decode_pulses(type, pulseCounts[s], &humidity[s], &temperature[s]);
+    }
   }
+  return DHT_SUCCESS;
 }
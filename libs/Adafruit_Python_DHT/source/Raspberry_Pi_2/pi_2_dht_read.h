@@ -29,4 +29,26 @@
 // be returned.  Some errors can be ignored and retried, specifically DHT_ERROR_TIMEOUT or DHT_ERROR_CHECKSUM.
 int pi_2_dht_read(int sensor, int pin, float* humidity, float* temperature);
 
+// Number of pulse widths recorded by pi_2_dht_read_raw, a low and high width for the sensor's
+// response pulse followed by a low and high width for each of the 40 data bits.
+#define DHT_RAW_PULSES 82
+
+// Read the raw pulse widths sent by a DHT sensor connected to GPIO pin (using BCM numbering) without
+// decoding them.  The pulseCounts array must hold DHT_RAW_PULSES values and receives the number of
+// loop iterations each pulse lasted, alternating low and high.  Returns DHT_SUCCESS if all the
+// pulses were recorded, or DHT_ERROR_TIMEOUT with the pulses seen before the timeout.
+int pi_2_dht_read_raw(int pin, int* pulseCounts);
+
+// Maximum number of sensors which can be read at once with pi_2_dht_read_multi.
+#define DHT_MAX_SENSORS 8
+
+// Read count DHT sensors of the same type connected to the GPIO pins in the pins array (using BCM
+// numbering) at the same time.  The start signals are sent to all sensors together and their
+// responses are sampled in a single loop, so reading several sensors takes about as long as reading
+// one.  Humidity, temperature and the result code of each sensor are returned in the provided
+// arrays, which must hold count values.  Returns DHT_SUCCESS if the sensors were read (check the
+// results array for each sensor's result), or a negative error value if no read was attempted.
+int pi_2_dht_read_multi(int sensor, const int* pins, int count, float* humidity, float* temperature,
+                        int* results);
+
 #endif
@@ -59,4 +59,18 @@ static inline uint32_t pi_2_mmio_input(const int gpio_number) {
   return *(pi_2_mmio_gpio+13) & (1 << gpio_number);
 }
 
+// Multiple pin variants which take a bit mask of GPIO numbers (bit n is GPIO n).
+
+static inline void pi_2_mmio_set_high_mask(const uint32_t mask) {
+  *(pi_2_mmio_gpio+7) = mask;
+}
+
+static inline void pi_2_mmio_set_low_mask(const uint32_t mask) {
+  *(pi_2_mmio_gpio+10) = mask;
+}
+
+static inline uint32_t pi_2_mmio_input_all(void) {
+  return *(pi_2_mmio_gpio+13);
+}
+
 #endif
@@ -36,10 +36,77 @@ static PyObject* Raspberry_Pi_2_Driver_read(PyObject *self, PyObject *args)
     return Py_BuildValue("iff", result, humidity, temperature);
 }
 
+// Wrap calling dht_read_raw and expose it as DHT.read_raw, which returns a tuple of the result
+// code and a list of the raw pulse widths.
+static PyObject* Raspberry_Pi_2_Driver_read_raw(PyObject *self, PyObject *args)
+{
+    int pin;
+    if (!PyArg_ParseTuple(args, "i", &pin)) {
+        return NULL;
+    }
+    int pulseCounts[DHT_RAW_PULSES];
+    int result = pi_2_dht_read_raw(pin, pulseCounts);
+    PyObject* pulses = PyList_New(DHT_RAW_PULSES);
+    if (pulses == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < DHT_RAW_PULSES; ++i) {
+        PyList_SET_ITEM(pulses, i, PyInt_FromLong(pulseCounts[i]));
+    }
+    return Py_BuildValue("iN", result, pulses);
+}
+
+// Wrap calling dht_read_multi and expose it as DHT.read_multi, which takes a sensor type and a
+// sequence of pins and returns a list of (result, humidity, temperature) tuples.
+static PyObject* Raspberry_Pi_2_Driver_read_multi(PyObject *self, PyObject *args)
+{
+    int sensor;
+    PyObject* pinList;
+    if (!PyArg_ParseTuple(args, "iO", &sensor, &pinList)) {
+        return NULL;
+    }
+    PyObject* pinSeq = PySequence_Fast(pinList, "Pins must be a sequence.");
+    if (pinSeq == NULL) {
+        return NULL;
+    }
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(pinSeq);
+    if (count < 1 || count > DHT_MAX_SENSORS) {
+        Py_DECREF(pinSeq);
+        PyErr_Format(PyExc_ValueError, "Expected 1 to %d pins.", DHT_MAX_SENSORS);
+        return NULL;
+    }
+    int pins[DHT_MAX_SENSORS];
+    for (Py_ssize_t i = 0; i < count; ++i) {
+        pins[i] = (int)PyInt_AsLong(PySequence_Fast_GET_ITEM(pinSeq, i));
+    }
+    Py_DECREF(pinSeq);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    // Call dht_read_multi and return a result code, humidity, and temperature for each pin.
+    float humidity[DHT_MAX_SENSORS] = {0}, temperature[DHT_MAX_SENSORS] = {0};
+    int results[DHT_MAX_SENSORS];
+    int result = pi_2_dht_read_multi(sensor, pins, (int)count, humidity, temperature, results);
+    PyObject* readings = PyList_New(count);
+    if (readings == NULL) {
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < count; ++i) {
+        if (result != DHT_SUCCESS) {
+            // Read wasn't attempted, report the same error for every pin.
+            results[i] = result;
+        }
+        PyList_SET_ITEM(readings, i, Py_BuildValue("iff", results[i], humidity[i], temperature[i]));
+    }
+    return readings;
+}
+
 // Boilerplate python module method list and initialization functions below.
 
 static PyMethodDef module_methods[] = {
     {"read", Raspberry_Pi_2_Driver_read, METH_VARARGS, "Read DHT sensor value on a Raspberry Pi 2."},
+    {"read_raw", Raspberry_Pi_2_Driver_read_raw, METH_VARARGS, "Read raw DHT sensor pulse widths on a Raspberry Pi 2."},
+    {"read_multi", Raspberry_Pi_2_Driver_read_multi, METH_VARARGS, "Read several DHT sensors at once on a Raspberry Pi 2."},
     {NULL, NULL, 0, NULL}
 };
 
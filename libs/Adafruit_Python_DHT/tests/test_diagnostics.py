@@ -0,0 +1,172 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import unittest
+
+import numpy as np
+
+import Adafruit_DHT
+import Adafruit_DHT.common as common
+import Adafruit_DHT.diagnostics as diagnostics
+
+
+def make_pulses(data, zero=26, one=70, low=50):
+	# Return the 82 raw pulse widths a sensor sending the 5 data bytes would
+	# produce, with the specified high widths for 0 and 1 bits.
+	pulses = [80, 80]
+	for byte in data:
+		for bit in range(7, -1, -1):
+			pulses += [low, one if byte & (1 << bit) else zero]
+	return pulses
+
+def with_checksum(data):
+	return list(data) + [sum(data) & 0xFF]
+
+
+class FakePlatform(object):
+	# DHT platform interface which returns scripted raw reads.
+	def __init__(self, results):
+		self.results = list(results)
+
+	def read_raw(self, pin):
+		return self.results.pop(0)
+
+
+class TestDecode(unittest.TestCase):
+
+	def test_clean_read(self):
+		# 65.2% and 25.1C from a DHT22.
+		data = with_checksum([0x02, 0x8C, 0x00, 0xFB])
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses(data))
+		self.assertTrue(decoded.checksum_ok)
+		self.assertEqual(decoded.data, data)
+		self.assertEqual(decoded.humidity, 65.2)
+		self.assertEqual(decoded.temperature, 25.1)
+		self.assertEqual(decoded.threshold, 48.0)
+		self.assertEqual(decoded.confidence.shape, (diagnostics.DATA_BITS,))
+		self.assertTrue(np.all(decoded.confidence == 1.0))
+
+	def test_negative_temperature_and_dht11(self):
+		data = with_checksum([0x01, 0x90, 0x80, 0x65])
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses(data))
+		self.assertEqual((decoded.humidity, decoded.temperature), (40.0, -10.1))
+		data = with_checksum([45, 0, 21, 0])
+		decoded = diagnostics.decode(Adafruit_DHT.DHT11, make_pulses(data))
+		self.assertEqual((decoded.humidity, decoded.temperature), (45.0, 21.0))
+
+	def test_jittered_read_near_threshold(self):
+		data = with_checksum([0x02, 0x8C, 0x00, 0xFB])
+		pulses = make_pulses(data)
+		# Stretch the high pulse of the first 0 bit (bit 0 of the data) to just
+		# under the threshold, and shrink the first 1 bit's to just over it.
+		pulses[3] = 46
+		pulses[2 + 2*6 + 1] = 51
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, pulses)
+		self.assertTrue(decoded.checksum_ok)
+		self.assertEqual(decoded.data, data)
+		self.assertTrue(46 < decoded.threshold < 51)
+		self.assertLess(decoded.confidence[0], 0.2)
+		self.assertLess(decoded.confidence[6], 0.2)
+		self.assertGreater(np.delete(decoded.confidence, [0, 6]).min(), 0.8)
+
+	def test_stretched_pulses(self):
+		# Long wires stretch every high pulse past the average low pulse width,
+		# which the C driver would decode as all 1 bits.
+		data = with_checksum([0x02, 0x8C, 0x00, 0xFB])
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses(data, zero=60, one=110))
+		self.assertTrue(decoded.checksum_ok)
+		self.assertEqual(decoded.data, data)
+		self.assertEqual(decoded.threshold, 85.0)
+
+	def test_checksum_failure(self):
+		data = [0x02, 0x8C, 0x00, 0xFB, 0x88]
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses(data))
+		self.assertFalse(decoded.checksum_ok)
+		self.assertEqual(decoded.data, data)
+		self.assertIsNone(decoded.humidity)
+		self.assertIsNone(decoded.temperature)
+
+	def test_single_cluster(self):
+		# All bits 0 only has one cluster of high pulses, the threshold falls
+		# back to the average low pulse width.
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses([0] * 5))
+		self.assertTrue(decoded.checksum_ok)
+		self.assertEqual(decoded.threshold, 50.0)
+		self.assertTrue(np.all(decoded.confidence == 0.0))
+
+	def test_invalid_input(self):
+		self.assertRaises(ValueError, diagnostics.decode, 12, make_pulses([0] * 5))
+		self.assertRaises(ValueError, diagnostics.decode, Adafruit_DHT.DHT22, [50] * 80)
+		self.assertRaises(ValueError, diagnostics.decode, Adafruit_DHT.DHT22, 50)
+		self.assertRaises(ValueError, diagnostics.decode, Adafruit_DHT.DHT22, [[50] * 82] * 2)
+
+
+class TestThreshold(unittest.TestCase):
+
+	def test_midpoint_between_clusters(self):
+		highs = np.array([24.0, 26.0, 28.0] * 5 + [68.0, 70.0, 72.0] * 5)
+		self.assertEqual(diagnostics._threshold(highs), 48.0)
+
+	def test_uneven_clusters(self):
+		# The threshold moves from the middle of the range to the midpoint of
+		# the cluster means.
+		highs = np.array([20.0, 22.0, 24.0] * 10 + [60.0, 70.0, 80.0] * 3)
+		self.assertEqual(diagnostics._threshold(highs), 46.0)
+
+
+class TestReadStats(unittest.TestCase):
+
+	def test_record_and_summary(self):
+		stats = diagnostics.ReadStats(Adafruit_DHT.DHT22)
+		decoded = diagnostics.decode(Adafruit_DHT.DHT22, make_pulses(with_checksum([1, 2, 3, 4])))
+		stats.record(4, common.DHT_SUCCESS, decoded)
+		stats.record(4, common.DHT_SUCCESS)
+		stats.record(4, common.DHT_ERROR_TIMEOUT)
+		stats.record(4, common.DHT_ERROR_CHECKSUM)
+		stats.record(17, common.DHT_ERROR_TIMEOUT)
+		summary = stats.summary()
+		self.assertEqual(summary[4], {'reads': 4, 'success_rate': 0.5, 'timeout_rate': 0.25,
+			'checksum_error_rate': 0.25, 'min_confidence': 1.0})
+		self.assertEqual(summary[17], {'reads': 1, 'success_rate': 0.0, 'timeout_rate': 1.0,
+			'checksum_error_rate': 0.0, 'min_confidence': None})
+
+	def test_read(self):
+		data = with_checksum([0x02, 0x8C, 0x00, 0xFB])
+		jittered = make_pulses(data)
+		jittered[3] = 46
+		platform = FakePlatform([
+			(common.DHT_SUCCESS, make_pulses(data)),
+			(common.DHT_ERROR_TIMEOUT, [0] * diagnostics.RAW_PULSES),
+			(common.DHT_SUCCESS, make_pulses(data[:4] + [0])),
+			(common.DHT_SUCCESS, jittered)])
+		stats = diagnostics.ReadStats(Adafruit_DHT.DHT22, platform)
+		self.assertEqual(stats.read(4).humidity, 65.2)
+		self.assertIsNone(stats.read(4))
+		self.assertFalse(stats.read(4).checksum_ok)
+		self.assertTrue(stats.read(4).checksum_ok)
+		summary = stats.summary()[4]
+		self.assertEqual(summary['reads'], 4)
+		self.assertEqual(summary['success_rate'], 0.5)
+		self.assertEqual(summary['timeout_rate'], 0.25)
+		self.assertEqual(summary['checksum_error_rate'], 0.25)
+		self.assertLess(summary['min_confidence'], 0.2)
+
+	def test_invalid_sensor(self):
+		self.assertRaises(ValueError, diagnostics.ReadStats, 12)
@@ -0,0 +1,134 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import unittest
+
+from mock import patch
+
+import Adafruit_DHT
+import Adafruit_DHT.monitor as monitor
+
+
+class FakePlatform(object):
+	# DHT platform interface which returns scripted results, raising any which
+	# are exceptions.
+	def __init__(self, results):
+		self.results = list(results)
+		self.reads = []
+
+	def read(self, sensor, pin):
+		self.reads.append((sensor, pin))
+		result = self.results.pop(0)
+		if isinstance(result, Exception):
+			raise result
+		return result
+
+
+class FakeEvent(object):
+	# Stop event which records the delays the thread waits for and advances the
+	# test's clock instead of sleeping, and is set after a number of waits.
+	def __init__(self, test, waits):
+		self._test = test
+		self._waits = waits
+		self._set = False
+		self.delays = []
+
+	def is_set(self):
+		return self._set
+
+	def set(self):
+		self._set = True
+
+	def clear(self):
+		self._set = False
+
+	def wait(self, delay):
+		self.delays.append(delay)
+		self._test.now += delay
+		if len(self.delays) >= self._waits:
+			self._set = True
+		return self._set
+
+
+class TestMonitor(unittest.TestCase):
+
+	def setUp(self):
+		self.now = 100.0
+		patcher = patch.object(monitor, '_clock', lambda: self.now)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_thread_interval_and_retries(self):
+		platform = FakePlatform([(50.0, 20.0), (None, None), IOError('GPIO error'),
+			(None, None), (55.0, 21.0)])
+		dht = Adafruit_DHT.Monitor(Adafruit_DHT.DHT22, 4, interval=10.0, platform=platform)
+		event = FakeEvent(self, 5)
+		dht._stop = event
+		dht.start()
+		dht._thread.join(5.0)
+		self.assertFalse(dht._thread.is_alive())
+		dht.stop()
+		self.assertIsNone(dht._thread)
+		self.assertEqual(platform.reads, [(Adafruit_DHT.DHT22, 4)] * 5)
+		# The interval after good reads, MIN_INTERVAL after failed ones.
+		self.assertEqual(event.delays, [10.0, 2.0, 2.0, 2.0, 10.0])
+		self.assertEqual(dht.attempts, 5)
+		self.assertEqual(dht.successes, 2)
+		self.assertEqual(dht.consecutive_failures, 0)
+		self.assertIsNone(dht.last_error)
+		self.assertEqual(dht.success_rate(), 0.4)
+		# The last reading was taken at 116, before the final 10 second wait.
+		self.assertEqual(dht.read(), (55.0, 21.0, 10.0))
+
+	def test_counters_and_last_error(self):
+		platform = FakePlatform([(None, None), IOError('GPIO error'), (None, None), (50.0, 20.0)])
+		dht = Adafruit_DHT.Monitor(Adafruit_DHT.DHT22, 4, platform=platform)
+		self.assertEqual(dht.read(), (None, None, None))
+		self.assertIsNone(dht.success_rate())
+		self.assertFalse(dht._read_once())
+		self.assertIn('checksum', dht.last_error)
+		self.assertFalse(dht._read_once())
+		self.assertEqual(dht.last_error, 'GPIO error')
+		self.assertFalse(dht._read_once())
+		self.assertIn('checksum', dht.last_error)
+		self.assertEqual(dht.consecutive_failures, 3)
+		self.assertEqual(dht.read(), (None, None, None))
+		self.assertTrue(dht._read_once())
+		self.assertIsNone(dht.last_error)
+		self.assertEqual(dht.consecutive_failures, 0)
+		self.assertEqual(dht.success_rate(), 0.25)
+
+	def test_read_age(self):
+		dht = Adafruit_DHT.Monitor(Adafruit_DHT.DHT22, 4, platform=FakePlatform([(50.0, 20.0), (None, None)]))
+		dht._read_once()
+		self.assertEqual(dht.read(), (50.0, 20.0, 0.0))
+		self.now += 3.5
+		self.assertEqual(dht.read(), (50.0, 20.0, 3.5))
+		# A failed read keeps the last good reading and its age.
+		self.now += 2.0
+		dht._read_once()
+		self.assertEqual(dht.read(), (50.0, 20.0, 5.5))
+
+	def test_interval_limited_to_minimum(self):
+		dht = Adafruit_DHT.Monitor(Adafruit_DHT.DHT22, 4, interval=0.5, platform=FakePlatform([]))
+		self.assertEqual(dht._interval, monitor.MIN_INTERVAL)
+
+	def test_invalid_sensor(self):
+		self.assertRaises(ValueError, Adafruit_DHT.Monitor, 12, 4)
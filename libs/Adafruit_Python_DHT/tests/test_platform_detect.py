@@ -0,0 +1,99 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import unittest
+
+from mock import Mock, patch
+
+import Adafruit_DHT.platform_detect as platform_detect
+
+
+class TestBoard(unittest.TestCase):
+	# Tests of the detection in this library, used when the Adafruit Python GPIO
+	# library isn't installed.
+
+	def setUp(self):
+		patcher = patch.object(platform_detect, '_gpio_platform', None)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		platform_detect.clear_board_cache()
+		self.addCleanup(platform_detect.clear_board_cache)
+
+	@patch.dict('os.environ', {'ADAFRUIT_PLATFORM': 'raspberry_pi,2,2'})
+	def test_environment_override(self):
+		detect = Mock(return_value=platform_detect.UNKNOWN)
+		with patch.object(platform_detect, 'platform_detect', detect):
+			board = platform_detect.board()
+		self.assertEqual(board, platform_detect.Board(platform_detect.RASPBERRY_PI, 2, 2))
+		self.assertFalse(detect.called)
+
+	@patch.dict('os.environ', {'ADAFRUIT_PLATFORM': 'MINNOWBOARD'})
+	def test_environment_override_minnowboard(self):
+		self.assertEqual(platform_detect.board(),
+			platform_detect.Board(platform_detect.MINNOWBOARD, None, None))
+
+	@patch.dict('os.environ', {'ADAFRUIT_PLATFORM': 'ARDUINO'})
+	def test_environment_override_invalid(self):
+		self.assertRaises(ValueError, platform_detect.board)
+
+	def test_detected_once(self):
+		detect = Mock(return_value=platform_detect.BEAGLEBONE_BLACK)
+		with patch.dict('os.environ', clear=True), \
+				patch.object(platform_detect, 'platform_detect', detect):
+			first = platform_detect.board()
+			second = platform_detect.board()
+			self.assertEqual(detect.call_count, 1)
+			platform_detect.clear_board_cache()
+			platform_detect.board()
+			self.assertEqual(detect.call_count, 2)
+		self.assertEqual(first, platform_detect.Board(platform_detect.BEAGLEBONE_BLACK, None, None))
+		self.assertIs(first, second)
+
+	@patch.object(platform_detect, 'pi_revision', Mock(side_effect=RuntimeError))
+	@patch.object(platform_detect, 'pi_version', Mock(return_value=2))
+	@patch.object(platform_detect, 'platform_detect', Mock(return_value=platform_detect.RASPBERRY_PI))
+	def test_raspberry_pi_without_revision(self):
+		with patch.dict('os.environ', clear=True):
+			board = platform_detect.board()
+		self.assertEqual(board, platform_detect.Board(platform_detect.RASPBERRY_PI, 2, None))
+
+	def test_parse_board_matches_gpio_library(self):
+		try:
+			import Adafruit_GPIO.Platform as Platform
+		except ImportError:
+			self.skipTest('Adafruit Python GPIO library is not installed.')
+		for value in ('UNKNOWN', 'RASPBERRY_PI,1,1', 'beaglebone_black', 'MINNOWBOARD'):
+			self.assertEqual(platform_detect.parse_board(value), Platform.parse_board(value))
+
+
+class TestGPIOLibraryBoard(unittest.TestCase):
+	# Tests of board detection shared with the Adafruit Python GPIO library.
+
+	def setUp(self):
+		if platform_detect._gpio_platform is None:
+			self.skipTest('Adafruit Python GPIO library is not installed.')
+		platform_detect.clear_board_cache()
+		self.addCleanup(platform_detect.clear_board_cache)
+
+	@patch.dict('os.environ', {'ADAFRUIT_PLATFORM': 'RASPBERRY_PI,1,1'})
+	def test_shares_cached_board(self):
+		board = platform_detect.board()
+		self.assertEqual(board, platform_detect.Board(platform_detect.RASPBERRY_PI, 1, 1))
+		self.assertIs(board, platform_detect._gpio_platform.board())
@@ -0,0 +1,82 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Monotonic clock for measuring timeouts, delays and ages.  Python 3 has
+# time.monotonic, Python 2 doesn't so on Linux clock_gettime(CLOCK_MONOTONIC)
+# is called directly through ctypes.  Only if that isn't available (like on
+# Python 2 on another OS) does this fall back to time.time, which jumps when
+# the system clock is changed.
+import ctypes
+import ctypes.util
+import sys
+import time
+
+
+# CLOCK_MONOTONIC clock id from linux/time.h.
+CLOCK_MONOTONIC = 1
+
+
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec',  ctypes.c_long),
+                ('tv_nsec', ctypes.c_long)]
+
+
+def _load_clock_gettime():
+    # Return the clock_gettime function from the C library, or None if it can't
+    # be found.  Older glibc versions only have it in librt.
+    if not sys.platform.startswith('linux'):
+        return None
+    for name in ('c', 'rt'):
+        path = ctypes.util.find_library(name)
+        if path is None:
+            continue
+        try:
+            function = ctypes.CDLL(path, use_errno=True).clock_gettime
+        except (OSError, AttributeError):
+            continue
+        function.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+        function.restype = ctypes.c_int
+        return function
+    return None
+
+
+def _clock_gettime_monotonic():
+    # Return CLOCK_MONOTONIC in seconds using clock_gettime through ctypes.
+    now = _timespec()
+    if _clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now)) != 0:
+        raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+    return now.tv_sec + now.tv_nsec * 1e-9
+
+
+if hasattr(time, 'monotonic'):
+    monotonic = time.monotonic
+else:
+    _clock_gettime = _load_clock_gettime()
+    if _clock_gettime is not None:
+        monotonic = _clock_gettime_monotonic
+    else:
+        monotonic = time.time
+
+
+def is_monotonic():
+    """Return True if monotonic() is a real monotonic clock, False if it fell
+    back to time.time."""
+    return monotonic is not time.time
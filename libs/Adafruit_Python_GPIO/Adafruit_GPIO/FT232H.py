@@ -20,15 +20,18 @@
 # THE SOFTWARE.
 
 import atexit
+import contextlib
 import logging
 import math
 import os
+import struct
 import subprocess
 import sys
 import time
 
 import ftdi1 as ftdi
 
+import Clock
 import GPIO
 
 
@@ -42,6 +45,27 @@ LSBFIRST = 1
 
 _REPEAT_DELAY = 4
 
+# Default FTDI latency timer in milliseconds, how long the chip waits before
+# sending a partially filled buffer back to the host.  The chip's default is
+# 16ms, which delays short responses like register reads.
+DEFAULT_LATENCY_TIMER = 1
+
+# Read polling first spins without sleeping for _POLL_SPIN seconds, since most
+# responses arrive within a USB frame or two, then sleeps between polls
+# starting at _POLL_MIN_SLEEP seconds and doubling up to _POLL_MAX_SLEEP.
+_POLL_SPIN      = 0.002
+_POLL_MIN_SLEEP = 0.0001
+_POLL_MAX_SLEEP = 0.01
+
+# Writes inside a batch which are at least this many bytes long are written
+# directly instead of being queued, so large SPI payloads aren't copied into
+# the batch.
+_BATCH_MAX_LENGTH = 4096
+
+# Clock for read timeouts, monotonic so a timeout isn't cut short or stretched
+# if the system clock is changed while polling.
+_clock = Clock.monotonic
+
 
 def _check_running_as_root():
     # NOTE: Checking for root with user ID 0 isn't very portable, perhaps
@@ -132,14 +156,19 @@ class FT232H(GPIO.BaseGPIO):
     IN   = GPIO.IN
     OUT  = GPIO.OUT
 
-    def __init__(self, vid=FT232H_VID, pid=FT232H_PID, serial=None):
+    def __init__(self, vid=FT232H_VID, pid=FT232H_PID, serial=None,
+                 latency_timer=DEFAULT_LATENCY_TIMER):
         """Create a FT232H object.  Will search for the first available FT232H
         device with the specified USB vendor ID and product ID (defaults to
         FT232H default VID & PID).  Can also specify an optional serial number
         string to open an explicit FT232H device given its serial number.  See
         the FT232H.enumerate_device_serials() function to see how to list all
-        connected device serial numbers.
+        connected device serial numbers.  The FTDI latency timer is set to the
+        specified number of milliseconds (1 to 255).
         """
+        # Commands queued by batch, None when not batching.
+        self._batch = None
+        self._batch_depth = 0
         # Initialize FTDI device connection.
         self._ctx = ftdi.new()
         if self._ctx == 0:
@@ -159,6 +188,8 @@ class FT232H(GPIO.BaseGPIO):
         # Change read & write buffers to maximum size, 65535 bytes.
         self._check(ftdi.read_data_set_chunksize, 65535)
         self._check(ftdi.write_data_set_chunksize, 65535)
+        # Return short responses quickly instead of after the default 16ms.
+        self.set_latency_timer(latency_timer)
         # Clear pending read data & write buffers.
         self._check(ftdi.usb_purge_buffers)
         # Enable MPSSE and syncronize communication with device.
@@ -177,8 +208,16 @@ class FT232H(GPIO.BaseGPIO):
 
     def _write(self, string):
         """Helper function to call write_data on the provided FTDI device and
-        verify it succeeds.
+        verify it succeeds.  Inside a batch the string is queued instead,
+        unless it's at least _BATCH_MAX_LENGTH bytes long, in which case the
+        queued commands are sent and then the string is written directly so
+        large payloads aren't copied into the batch.
         """
+        if self._batch is not None:
+            if len(string) < _BATCH_MAX_LENGTH:
+                self._batch.append(string)
+                return
+            self._send_batch()
         # Get modem status. Useful to enable for debugging.
         #ret, status = ftdi.poll_modem_status(self._ctx)
         #if ret == 0:
@@ -204,18 +243,39 @@ class FT232H(GPIO.BaseGPIO):
         if ret != 0:
             raise RuntimeError('ftdi_{0} failed with error {1}: {2}'.format(command.__name__, ret, ftdi.get_error_string(self._ctx)))
 
+    def set_latency_timer(self, latency_ms):
+        """Set the FTDI latency timer to the specified number of milliseconds (1
+        to 255).  This is how long the chip waits for its buffer to fill before
+        sending a partial response to the host.
+        """
+        if latency_ms < 1 or latency_ms > 255:
+            raise ValueError('Latency timer must be between 1 and 255 milliseconds.')
+        self._check(ftdi.set_latency_timer, latency_ms)
+
     def _poll_read(self, expected, timeout_s=5.0):
         """Helper function to continuously poll reads on the FTDI device until an
         expected number of bytes are returned.  Will throw a timeout error if no
         data is received within the specified number of timeout seconds.  Returns
         the read data as a string if successful, otherwise raises an execption.
         """
-        start = time.time()
-        # Start with an empty response buffer.
-        response = bytearray(expected)
+        return str(self._poll_read_into(bytearray(expected), timeout_s))
+
+    def _poll_read_into(self, response, timeout_s=5.0):
+        """Poll reads on the FTDI device like _poll_read, but store the bytes
+        directly in the specified writable buffer (like a bytearray or
+        memoryview) until it is full, and return the buffer.  The timeout is
+        measured with a monotonic clock.
+        """
+        expected = len(response)
+        # Send any batched commands first since the response depends on them.
+        self._send_batch()
+        start = _clock()
+        spin_until = start + _POLL_SPIN
+        deadline = start + timeout_s
+        delay = _POLL_MIN_SLEEP
         index = 0
         # Loop calling read until the response buffer is full or a timeout occurs.
-        while time.time() - start <= timeout_s:
+        while True:
             ret, data = ftdi.read_data(self._ctx, expected - index)
             # Fail if there was an error reading data.
             if ret < 0:
@@ -225,10 +285,49 @@ class FT232H(GPIO.BaseGPIO):
             index += ret
             # Buffer is full, return the result data.
             if index >= expected:
-                return str(response)
-            time.sleep(0.01)
+                return response
+            now = _clock()
+            if now > deadline:
+                break
+            # Spin at first, then back off to avoid burning the CPU on slow
+            # responses.
+            if now >= spin_until:
+                time.sleep(delay)
+                delay = min(delay * 2, _POLL_MAX_SLEEP)
         raise RuntimeError('Timeout while polling ftdi_read_data for {0} bytes!'.format(expected))
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager which queues the MPSSE commands for pin changes (and
+        any other commands) made inside it and sends them all in one USB write
+        when it exits, instead of one write per change.  Pin changes are still
+        made in order, so a bit-banged waveform runs at USB bulk speed.  Reads
+        inside the batch send the queued commands first.  Batches can be
+        nested, the commands are sent when the outermost batch exits.
+        """
+        self._batch_depth += 1
+        if self._batch is None:
+            self._batch = []
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                try:
+                    self._send_batch()
+                finally:
+                    self._batch = None
+
+    def _send_batch(self):
+        # Send the commands queued by batch, if any, and keep batching.
+        if self._batch:
+            commands = ''.join(self._batch)
+            self._batch = None
+            try:
+                self._write(commands)
+            finally:
+                self._batch = []
+
     def _mpsse_enable(self):
         """Enable MPSSE mode on the FTDI device."""
         # Reset MPSSE by sending mask = 0 and mode = 0
@@ -312,6 +411,20 @@ class FT232H(GPIO.BaseGPIO):
         """Write the current MPSSE GPIO state to the FT232H chip."""
         self._write(self.mpsse_gpio())
 
+    def output_sequence(self, steps, hold=1, repeat=1):
+        """Output a waveform on the pins in one USB write.  Steps is a list of
+        dicts of pin name to pin value (HIGH/True for 1, LOW/False for 0), each
+        applied in turn on top of the previous pin levels.  Each step is held
+        by repeating its GPIO command hold times, and the whole sequence is
+        output repeat times.  Pins must already be set up as outputs.
+        """
+        commands = []
+        for step in steps:
+            for pin, value in iter(step.items()):
+                self._output_pin(pin, value)
+            commands.append(self.mpsse_gpio() * hold)
+        self._write(''.join(commands) * repeat)
+
     def get_i2c_device(self, address, **kwargs):
         """Return an I2CDevice instance using this FT232H object and the provided
         I2C address.  Meant to be passed as the i2c_provider parameter to objects
@@ -391,6 +504,28 @@ class FT232H(GPIO.BaseGPIO):
         return [((_pins >> pin) & 0x0001) == 1 for pin in pins]
 
 
+# Largest number of bytes one MPSSE data clocking command can transfer.
+_MAX_SPI_LENGTH = 65536
+
+# Number of bytes in each chunk of a full-duplex transfer.  A chunk has to be
+# read back before the next is written, and has to fit in the FT232H's 1K
+# FIFOs, or the MPSSE engine stalls while the chunk is still being written.
+_SPI_TRANSFER_CHUNK = 1024
+
+def _spi_header(command, length):
+    # Return an MPSSE data clocking command for length bytes.
+    # NOTE: Must actually send length minus one because the MPSSE engine
+    # considers 0 a length of 1 and FFFF a length of 65536
+    return bytearray((command, (length-1) & 0xFF, ((length-1) >> 8) & 0xFF))
+
+def _spi_buffer(data):
+    # Return a memoryview of data without copying it, unless it is a sequence
+    # of byte values which has to be packed into a bytearray first.
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytearray(data)
+    return memoryview(data)
+
+
 class SPI(object):
     def __init__(self, ft232h, cs=None, max_speed_hz=1000000, mode=0, bitorder=MSBFIRST):
         self._ft232h = ft232h
@@ -465,66 +600,170 @@ class SPI(object):
             raise ValueError('Order must be MSBFIRST or LSBFIRST.')
 
     def write(self, data):
-        """Half-duplex SPI write.  The specified array of bytes will be clocked
-        out the MOSI line.
+        """Half-duplex SPI write.  The specified bytes (a bytes, bytearray or
+        memoryview object, or a list of byte values) will be clocked out the
+        MOSI line.  Transfers of any length can be made, short ones are sent in
+        one USB write with the chip select changes while longer ones are
+        written directly from one copy of each 65536 byte chunk.
         """
         # Build command to write SPI data.
         command = 0x10 | (self.lsbfirst << 3) | self.write_clock_ve
         logger.debug('SPI write with command {0:2X}.'.format(command))
-        # Compute length low and high bytes.
-        # NOTE: Must actually send length minus one because the MPSSE engine
-        # considers 0 a length of 1 and FFFF a length of 65536
-        length = len(data)-1
-        len_low  = length & 0xFF
-        len_high = (length >> 8) & 0xFF
-        self._assert_cs()
-        # Send command and length.
-        self._ft232h._write(str(bytearray((command, len_low, len_high))))
-        # Send data.
-        self._ft232h._write(str(bytearray(data)))
-        self._deassert_cs()
+        data = _spi_buffer(data)
+        with self._ft232h.batch():
+            self._assert_cs()
+            for start in range(0, len(data), _MAX_SPI_LENGTH):
+                chunk = data[start:start+_MAX_SPI_LENGTH]
+                # Write the header and data separately rather than copying
+                # them into one string.
+                self._ft232h._write(str(_spi_header(command, len(chunk))))
+                self._ft232h._write(chunk.tobytes())
+            self._deassert_cs()
 
     def read(self, length):
         """Half-duplex SPI read.  The specified length of bytes will be clocked
         in the MISO line and returned as a bytearray object.
         """
+        return self.readinto(bytearray(length))
+
+    def readinto(self, buf):
+        """Half-duplex SPI read into the specified writable buffer (like a
+        bytearray or memoryview).  As many bytes as the buffer holds will be
+        clocked in the MISO line and stored directly in the buffer, which is
+        returned.  Reads of any length are requested in one USB write.
+        """
         # Build command to read SPI data.
         command = 0x20 | (self.lsbfirst << 3) | (self.read_clock_ve << 2)
         logger.debug('SPI read with command {0:2X}.'.format(command))
-        # Compute length low and high bytes.
-        # NOTE: Must actually send length minus one because the MPSSE engine
-        # considers 0 a length of 1 and FFFF a length of 65536
-        len_low  = (length-1) & 0xFF
-        len_high = ((length-1) >> 8) & 0xFF
-        self._assert_cs()
-        # Send command and length.
-        self._ft232h._write(str(bytearray((command, len_low, len_high, 0x87))))
-        self._deassert_cs()
+        length = len(buf)
+        if length == 0:
+            return buf
+        with self._ft232h.batch():
+            self._assert_cs()
+            for start in range(0, length, _MAX_SPI_LENGTH):
+                chunk = min(length - start, _MAX_SPI_LENGTH)
+                self._ft232h._write(str(_spi_header(command, chunk)))
+            # Ask to return response bytes immediately.
+            self._ft232h._write('\x87')
+            self._deassert_cs()
         # Read response bytes.
-        return bytearray(self._ft232h._poll_read(length))
+        self._ft232h._poll_read_into(memoryview(buf))
+        return buf
 
-    def transfer(self, data):
-        """Full-duplex SPI read and write.  The specified array of bytes will be
+    def transfer(self, data, buf=None):
+        """Full-duplex SPI read and write.  The specified bytes (a bytes,
+        bytearray or memoryview object, or a list of byte values) will be
         clocked out the MOSI line, while simultaneously bytes will be read from
-        the MISO line.  Read bytes will be returned as a bytearray object.
+        the MISO line.  Read bytes will be returned as a bytearray object, or
+        stored in the specified writable buffer (which must be at least as long
+        as data) and the buffer returned.  Transfers are made in 1024 byte
+        chunks, each written and read back before the next, so the data and
+        response fit in the FT232H's 1K FIFOs and the MPSSE engine can't stall
+        partway through a chunk.
         """
         # Build command to read and write SPI data.
         command = 0x30 | (self.lsbfirst << 3) | (self.read_clock_ve << 2) | self.write_clock_ve
         logger.debug('SPI transfer with command {0:2X}.'.format(command))
-        # Compute length low and high bytes.
-        # NOTE: Must actually send length minus one because the MPSSE engine
-        # considers 0 a length of 1 and FFFF a length of 65536
+        data = _spi_buffer(data)
         length = len(data)
-        len_low  = (length-1) & 0xFF
-        len_high = ((length-1) >> 8) & 0xFF
-        # Send command and length.
-        self._assert_cs()
-        self._ft232h._write(str(bytearray((command, len_low, len_high))))
-        self._ft232h._write(str(bytearray(data)))
-        self._ft232h._write('\x87')
-        self._deassert_cs()
-        # Read response bytes.
-        return bytearray(self._ft232h._poll_read(length))
+        if buf is None:
+            buf = bytearray(length)
+        elif len(buf) < length:
+            raise ValueError('Buffer must be at least as long as the data.')
+        if length == 0:
+            return buf
+        view = memoryview(buf)
+        with self._ft232h.batch():
+            self._assert_cs()
+            for start in range(0, length, _SPI_TRANSFER_CHUNK):
+                chunk = data[start:start+_SPI_TRANSFER_CHUNK]
+                # Send command, length and data, then ask to return response
+                # bytes immediately.
+                self._ft232h._write(str(_spi_header(command, len(chunk))))
+                self._ft232h._write(chunk.tobytes())
+                self._ft232h._write('\x87')
+                if start + len(chunk) >= length:
+                    self._deassert_cs()
+                # Read response bytes, which sends the queued commands.
+                self._ft232h._poll_read_into(view[start:start+len(chunk)])
+        return buf
+
+
+# Register operations queued on an I2CDevice.  A write is a tuple of (_WRITE,
+# bytes after the address byte) and a read is a tuple of (_READ, register,
+# length, decode function for the read bytearray).
+_WRITE = 0
+_READ  = 1
+
+class _I2CTemplates(object):
+    # Precomputed MPSSE command sequences for I2C start, stop, idle and byte
+    # transfers with the FT232H's other pins at the specified direction and
+    # level.  See I2CDevice._i2c_start and friends for what each one does.
+    def __init__(self, direction, level):
+        def gpio(scl, sda):
+            value = level | scl | (sda << 1)
+            return bytearray((0x80, value & 0xFF, direction & 0xFF,
+                              0x82, (value >> 8) & 0xFF, (direction >> 8) & 0xFF))
+        self.idle = gpio(1, 1) * _REPEAT_DELAY
+        self.start = gpio(1, 0) * _REPEAT_DELAY + gpio(0, 0) * _REPEAT_DELAY
+        self.stop = gpio(0, 0) * _REPEAT_DELAY + gpio(1, 0) * _REPEAT_DELAY + \
+                    gpio(1, 1) * _REPEAT_DELAY
+        # Write a byte, return the lines to idle and read the ACK bit.
+        self.write_prefix = bytearray((0x11, 0x00, 0x00))
+        self.write_suffix = gpio(0, 1) * _REPEAT_DELAY + bytearray((0x22, 0x00))
+        # Read a byte and send an ACK (or a NAK for the last byte), then return
+        # the lines to idle.
+        self.read_ack = bytearray((0x20, 0x00, 0x00, 0x13, 0x00, 0x00)) + gpio(0, 1)
+        self.read_nak = bytearray((0x20, 0x00, 0x00, 0x13, 0x00, 0xFF)) + gpio(0, 1)
+
+    def write(self, command, data):
+        # Append writes of the bytes in data to command and return the number
+        # of ACK bytes they respond with.
+        for byte in data:
+            command += self.write_prefix
+            command.append(byte)
+            command += self.write_suffix
+        return len(data)
+
+    def read(self, command, length):
+        # Append a read of length bytes to command and return length.
+        command += self.read_ack * (length - 1)
+        command += self.read_nak
+        return length
+
+def _write_op(data, register=None):
+    data = [byte & 0xFF for byte in data]
+    if register is not None:
+        data.insert(0, register)
+    return (_WRITE, data)
+
+def _read_op(register, length, decode):
+    return (_READ, register, length, decode)
+
+def _pack16(value, little_endian=True):
+    value = value & 0xFFFF
+    if little_endian:
+        return [value & 0xFF, value >> 8]
+    else:
+        return [value >> 8, value & 0xFF]
+
+def _decode_U8(data):
+    return data[0]
+
+def _decode_S8(data):
+    return data[0] - 256 if data[0] > 127 else data[0]
+
+def _decode_U16LE(data):
+    return (data[1] << 8) | data[0]
+
+def _decode_U16BE(data):
+    return (data[0] << 8) | data[1]
+
+def _signed16(decode):
+    def decode_signed(data):
+        result = decode(data)
+        return result - 65536 if result > 32767 else result
+    return decode_signed
 
 
 class I2CDevice(object):
@@ -545,6 +784,9 @@ class I2CDevice(object):
         # share the I2C bus.
         self._ft232h._write('\x9E\x07\x00')
         self._idle()
+        # Command templates for register operations, see _templates.
+        self._template = None
+        self._template_state = None
 
     def _idle(self):
         """Put I2C lines into idle state."""
@@ -646,6 +888,79 @@ class I2CDevice(object):
             if byte & 0x01 != 0x00:
                 raise RuntimeError('Failed to find expected I2C ACK!')
 
+    def _templates(self):
+        """Return the MPSSE command templates for the current direction and level
+        of the FT232H's other pins, rebuilding them only when those change."""
+        # I2C uses D0 (SCL) and D1 (SDA) as outputs and D2 as an input.
+        direction = (self._ft232h._direction | 0x0003) & ~0x0004 & 0xFFFF
+        level = self._ft232h._level & ~0x0007 & 0xFFFF
+        if self._template_state != (direction, level):
+            self._template = _I2CTemplates(direction, level)
+            self._template_state = (direction, level)
+        return self._template
+
+    def _build(self, ops):
+        """Return a tuple of the MPSSE command buffer for a list of register
+        operations and the number of response bytes it will return."""
+        t = self._templates()
+        write_address = self._address_byte(False)
+        read_address = self._address_byte(True)
+        # Start from the idle state in the same buffer rather than with a
+        # separate USB write.
+        command = bytearray(t.idle)
+        expected = 0
+        for op in ops:
+            command += t.start
+            if op[0] == _WRITE:
+                expected += t.write(command, [write_address] + op[1])
+            else:
+                expected += t.write(command, (write_address, op[1]))
+                command += t.stop
+                command += t.idle
+                command += t.start
+                expected += t.write(command, (read_address,))
+                expected += t.read(command, op[2])
+            command += t.stop
+        # Ask to return response bytes immediately.
+        command.append(0x87)
+        return (command, expected)
+
+    def _execute(self, ops):
+        """Send a list of register operations (see _write_op and _read_op) as
+        one MPSSE command buffer with a single USB write and read.  Verifies
+        every ACK and returns a list with the decoded result of each read, or
+        None for each write.
+        """
+        command, expected = self._build(ops)
+        # The transaction leaves the I2C lines idle, keep the FT232H's pin
+        # state in sync with that.
+        self._ft232h._direction = self._template_state[0]
+        self._ft232h._level = self._template_state[1] | 0x0003
+        self._ft232h._write(str(command))
+        response = bytearray(self._ft232h._poll_read(expected))
+        # Split the response into each operation's ACKs and read bytes.
+        results = []
+        index = 0
+        for op in ops:
+            if op[0] == _WRITE:
+                acks = len(op[1]) + 1
+                self._verify_acks(response[index:index+acks])
+                index += acks
+                results.append(None)
+            else:
+                self._verify_acks(response[index:index+3])
+                index += 3
+                results.append(op[3](response[index:index+op[2]]))
+                index += op[2]
+        return results
+
+    def batch(self):
+        """Return an I2CBatch which queues register reads and writes on this
+        device and sends them all in one USB transfer, instead of one transfer
+        per read or write.  Use it as a context manager, or call execute.
+        """
+        return I2CBatch(self)
+
     def ping(self):
         """Attempt to detect if a device at this address is present on the I2C
         bus.  Will send out the device's address for writing and verify an ACK
@@ -674,58 +989,30 @@ class I2CDevice(object):
 
     def write8(self, register, value):
         """Write an 8-bit value to the specified register."""
-        value = value & 0xFF
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(False), register, value])
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response)
+        self._execute([_write_op([register, value & 0xFF])])
 
     def write16(self, register, value, little_endian=True):
         """Write a 16-bit value to the specified register."""
-        value = value & 0xFFFF
-        value_low  = value & 0xFF
-        value_high = (value >> 8) & 0xFF
-        if not little_endian:
-            value_low, value_high = value_high, value_low
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(False), register, value_low,
-                                value_high])
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response)
+        self._execute([_write_op(_pack16(value, little_endian), register)])
 
     def writeList(self, register, data):
         """Write bytes to the specified register."""
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(False), register] + data)
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response)
+        self._execute([_write_op(data, register)])
 
     def readList(self, register, length):
         """Read a length number of bytes from the specified register.  Results
         will be returned as a bytearray."""
         if length <= 0:
             raise ValueError("Length must be at least 1 byte.")
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(True), register])
-        self._i2c_stop()
-        self._i2c_idle()
-        self._i2c_start()
-        self._i2c_read_bytes(length)
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response[:-length])
-        return response[-length:]
+        return self._execute([_read_op(register, length, bytearray)])[0]
+
+    def read_struct(self, register, fmt):
+        """Read the registers starting at the specified register in one transfer
+        and decode them with the specified struct module format string, for
+        example '>hhH' for two signed and one unsigned big endian 16-bit values.
+        Returns a tuple of the decoded values."""
+        return self._execute([_read_op(register, struct.calcsize(fmt),
+                                       lambda data: struct.unpack(fmt, str(data)))])[0]
 
     def readRaw8(self):
         """Read an 8-bit value on the bus (without register)."""
@@ -745,19 +1032,7 @@ class I2CDevice(object):
 
     def readU8(self, register):
         """Read an unsigned byte from the specified register."""
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(False), register])
-        self._i2c_stop()
-        self._i2c_idle()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(True)])
-        self._i2c_read_bytes(1)
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response[:-1])
-        return response[-1]
+        return self._execute([_read_op(register, 1, _decode_U8)])[0]
 
     def readS8(self, register):
         """Read a signed byte from the specified register."""
@@ -770,22 +1045,8 @@ class I2CDevice(object):
         """Read an unsigned 16-bit value from the specified register, with the
         specified endianness (default little endian, or least significant byte
         first)."""
-        self._idle()
-        self._transaction_start()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(False), register])
-        self._i2c_stop()
-        self._i2c_idle()
-        self._i2c_start()
-        self._i2c_write_bytes([self._address_byte(True)])
-        self._i2c_read_bytes(2)
-        self._i2c_stop()
-        response = self._transaction_end()
-        self._verify_acks(response[:-2])
-        if little_endian:
-            return (response[-1] << 8) | response[-2]
-        else:
-            return (response[-2] << 8) | response[-1]
+        decode = _decode_U16LE if little_endian else _decode_U16BE
+        return self._execute([_read_op(register, 2, decode)])[0]
 
     def readS16(self, register, little_endian=True):
         """Read a signed 16-bit value from the specified register, with the
@@ -815,3 +1076,105 @@ class I2CDevice(object):
         """Read a signed 16-bit value from the specified register, in big
         endian byte order."""
         return self.readS16(register, little_endian=False)
+
+
+class I2CBatch(object):
+    """Queue of register reads and writes on an FT232H I2CDevice which are
+    sent in one MPSSE command buffer, with a single USB write and read, when
+    executed.  Each read or write function queues an operation and returns its
+    index in the results list.  Use it as a context manager to execute the
+    queue when the block ends, after which the results attribute holds the
+    decoded value of each read (None for writes):
+
+        with device.batch() as batch:
+            batch.write8(0x01, 0x80)
+            status = batch.readU8(0x02)
+            value = batch.readS16BE(0x03)
+        print(batch.results[status], batch.results[value])
+    """
+
+    def __init__(self, device):
+        self._device = device
+        self._ops = []
+        self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+
+    def _queue(self, op):
+        self._ops.append(op)
+        return len(self._ops) - 1
+
+    def execute(self):
+        """Send all the queued operations in one transfer and return the list
+        of results, which is also stored in the results attribute.  Raises
+        RuntimeError if any operation isn't acknowledged."""
+        ops, self._ops = self._ops, []
+        self.results = self._device._execute(ops) if ops else []
+        return self.results
+
+    def write8(self, register, value):
+        """Queue a write of an 8-bit value to the specified register."""
+        return self._queue(_write_op([register, value]))
+
+    def write16(self, register, value, little_endian=True):
+        """Queue a write of a 16-bit value to the specified register."""
+        return self._queue(_write_op(_pack16(value, little_endian), register))
+
+    def writeList(self, register, data):
+        """Queue a write of bytes to the specified register."""
+        return self._queue(_write_op(data, register))
+
+    def readList(self, register, length):
+        """Queue a read of length bytes from the specified register, returned
+        as a bytearray."""
+        if length <= 0:
+            raise ValueError("Length must be at least 1 byte.")
+        return self._queue(_read_op(register, length, bytearray))
+
+    def read_struct(self, register, fmt):
+        """Queue a read of the registers starting at the specified register,
+        decoded with the specified struct module format string."""
+        return self._queue(_read_op(register, struct.calcsize(fmt),
+                                    lambda data: struct.unpack(fmt, str(data))))
+
+    def readU8(self, register):
+        """Queue a read of an unsigned byte from the specified register."""
+        return self._queue(_read_op(register, 1, _decode_U8))
+
+    def readS8(self, register):
+        """Queue a read of a signed byte from the specified register."""
+        return self._queue(_read_op(register, 1, _decode_S8))
+
+    def readU16(self, register, little_endian=True):
+        """Queue a read of an unsigned 16-bit value from the specified register,
+        with the specified endianness (default little endian)."""
+        decode = _decode_U16LE if little_endian else _decode_U16BE
+        return self._queue(_read_op(register, 2, decode))
+
+    def readS16(self, register, little_endian=True):
+        """Queue a read of a signed 16-bit value from the specified register,
+        with the specified endianness (default little endian)."""
+        decode = _decode_U16LE if little_endian else _decode_U16BE
+        return self._queue(_read_op(register, 2, _signed16(decode)))
+
+    def readU16LE(self, register):
+        """Queue a read of an unsigned 16-bit little endian value."""
+        return self.readU16(register, little_endian=True)
+
+    def readU16BE(self, register):
+        """Queue a read of an unsigned 16-bit big endian value."""
+        return self.readU16(register, little_endian=False)
+
+    def readS16LE(self, register):
+        """Queue a read of a signed 16-bit little endian value."""
+        return self.readS16(register, little_endian=True)
+
+    def readS16BE(self, register):
+        """Queue a read of a signed 16-bit big endian value."""
+        return self.readS16(register, little_endian=False)
@@ -18,6 +18,10 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+import contextlib
+import ctypes
+import mmap
+import os
 
 import Adafruit_GPIO.Platform as Platform
 
@@ -105,6 +109,21 @@ class BaseGPIO(object):
         # General implementation that can be optimized by derived classes.
         return [self.input(pin) for pin in pins]
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager which groups the pin changes made inside it so they
+        can be sent to the hardware together when it exits, for example:
+
+            with gpio.batch():
+                gpio.output(0, HIGH)
+                gpio.output(1, LOW)
+
+        Pin changes are still made in order.  This general implementation
+        writes each change immediately, but derived classes with a costly
+        write per change can collect them.  See the FT232H class for example.
+        """
+        yield self
+
 
     def add_event_detect(self, pin, edge):
         """Enable edge detection events for a particular GPIO channel.  Pin 
@@ -253,6 +272,125 @@ class RPiGPIOAdapter(BaseGPIO):
         else:
             self.rpi_gpio.cleanup(pin)
 
+# Raspberry Pi GPIO register block, at this offset from the peripheral base
+# address and available without root from /dev/gpiomem.  Register offsets are
+# in 32-bit words, each register has a word for pins 0-31 and one for 32-53.
+RPI_GPIO_BASE_OFFSET = 0x200000
+RPI_GPIO_LENGTH = 4096
+RPI_GPSET0 = 0x1C // 4
+RPI_GPCLR0 = 0x28 // 4
+RPI_GPLEV0 = 0x34 // 4
+RPI_NUM_GPIO = 54
+
+def _rpi_peripheral_base():
+    # Read the peripheral base address from the device tree, like RPi.GPIO
+    # and the DHT library's pi_2_mmio do.
+    with open('/proc/device-tree/soc/ranges', 'rb') as f:
+        ranges = bytearray(f.read(8))
+    return ranges[4] << 24 | ranges[5] << 16 | ranges[6] << 8 | ranges[7]
+
+def map_rpi_gpio():
+    """Map the Raspberry Pi GPIO registers into memory and return the mmap
+    object.  Uses /dev/gpiomem when it's available (no root required) and
+    otherwise /dev/mem at the GPIO address (requires root).
+    """
+    try:
+        fd = os.open('/dev/gpiomem', os.O_RDWR | os.O_SYNC)
+        offset = 0
+    except OSError:
+        fd = os.open('/dev/mem', os.O_RDWR | os.O_SYNC)
+        offset = _rpi_peripheral_base() + RPI_GPIO_BASE_OFFSET
+    try:
+        return mmap.mmap(fd, RPI_GPIO_LENGTH, mmap.MAP_SHARED,
+                         mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+    finally:
+        os.close(fd)
+
+class RPiMMIOAdapter(RPiGPIOAdapter):
+    """GPIO implementation for the Raspberry Pi which reads and writes pins
+    with the memory mapped GPIO registers, so input_pins reads every pin in
+    one or two register reads (GPLEV) and output_pins sets and clears any
+    number of pins with at most four register writes (GPSET and GPCLR).  Pin
+    setup, pull-ups and edge detection still use the RPi.GPIO library.  Pins
+    must use BCM numbering.
+    """
+
+    def __init__(self, rpi_gpio, mode=None, mmio=None):
+        """Create the adapter, mapping the GPIO registers with map_rpi_gpio
+        unless a writable buffer of the registers is passed as mmio.
+        """
+        if mode is not None and mode != rpi_gpio.BCM:
+            raise ValueError('Memory mapped GPIO requires BCM pin numbering.')
+        super(RPiMMIOAdapter, self).__init__(rpi_gpio, mode)
+        if mmio is None:
+            mmio = map_rpi_gpio()
+        self._mmio = mmio
+        # Index the registers as 32-bit words so each access is a single
+        # aligned load or store.
+        self._registers = (ctypes.c_uint32 * (len(mmio) // 4)).from_buffer(mmio)
+
+    def _validate_pin(self, pin):
+        if pin < 0 or pin >= RPI_NUM_GPIO:
+            raise ValueError('Invalid GPIO value, must be between 0 and {0}.'.format(RPI_NUM_GPIO))
+
+    def output(self, pin, value):
+        """Set the specified pin the provided high/low value.  Value should be
+        either HIGH/LOW or a boolean (true = high).
+        """
+        self._validate_pin(pin)
+        register = RPI_GPSET0 if value else RPI_GPCLR0
+        self._registers[register + (pin >> 5)] = 1 << (pin & 31)
+
+    def input(self, pin):
+        """Read the specified pin and return HIGH/true if the pin is pulled high,
+        or LOW/false if pulled low.
+        """
+        self._validate_pin(pin)
+        return (self._registers[RPI_GPLEV0 + (pin >> 5)] >> (pin & 31)) & 1 == 1
+
+    def read_bank(self):
+        """Return the levels of all the GPIO pins as an integer with bit n set
+        if pin n is high.
+        """
+        return self._registers[RPI_GPLEV0] | self._registers[RPI_GPLEV0 + 1] << 32
+
+    def write_bank(self, set_mask=0, clear_mask=0):
+        """Set the pins with bits set in set_mask high and the pins with bits
+        set in clear_mask low, with one register write for each half of the
+        pins which has changes.  Only pins set up as outputs are affected.
+        """
+        for word in range(2):
+            bits = (set_mask >> (32 * word)) & 0xFFFFFFFF
+            if bits:
+                self._registers[RPI_GPSET0 + word] = bits
+            bits = (clear_mask >> (32 * word)) & 0xFFFFFFFF
+            if bits:
+                self._registers[RPI_GPCLR0 + word] = bits
+
+    def input_pins(self, pins):
+        """Read multiple pins specified in the given list and return list of pin values
+        GPIO.HIGH/True if the pin is pulled high, or GPIO.LOW/False if pulled low.
+        All the pins are read at the same time.
+        """
+        [self._validate_pin(pin) for pin in pins]
+        levels = self.read_bank()
+        return [(levels >> pin) & 1 == 1 for pin in pins]
+
+    def output_pins(self, pins):
+        """Set multiple pins high or low at once.  Pins should be a dict of pin
+        name to pin value (HIGH/True for 1, LOW/False for 0).  All provided pins
+        will be set to the given values.
+        """
+        set_mask = 0
+        clear_mask = 0
+        for pin, value in iter(pins.items()):
+            self._validate_pin(pin)
+            if value:
+                set_mask |= 1 << pin
+            else:
+                clear_mask |= 1 << pin
+        self.write_bank(set_mask, clear_mask)
+
 class AdafruitBBIOAdapter(BaseGPIO):
     """GPIO implementation for the Beaglebone Black using the Adafruit_BBIO
     library.
@@ -410,11 +548,16 @@ def get_platform_gpio(**keywords):
     executed on.  Currently supports only the Raspberry Pi using the RPi.GPIO
     library and Beaglebone Black using the Adafruit_BBIO library.  Will throw an
     exception if a GPIO instance can't be created for the current platform.  The
-    returned GPIO object is an instance of BaseGPIO.
+    returned GPIO object is an instance of BaseGPIO.  On the Raspberry Pi pass
+    mmio=True to read and write pins through the memory mapped GPIO registers
+    (see RPiMMIOAdapter).
     """
     plat = Platform.platform_detect()
+    mmio = keywords.pop('mmio', False)
     if plat == Platform.RASPBERRY_PI:
         import RPi.GPIO
+        if mmio:
+            return RPiMMIOAdapter(RPi.GPIO, **keywords)
         return RPiGPIOAdapter(RPi.GPIO, **keywords)
     elif plat == Platform.BEAGLEBONE_BLACK:
         import Adafruit_BBIO.GPIO
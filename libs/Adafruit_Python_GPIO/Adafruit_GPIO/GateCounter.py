@@ -0,0 +1,174 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import itertools
+import threading
+
+import numpy as np
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.Clock as Clock
+
+
+# Clock for edge times, monotonic so a change to the system clock between the
+# two edges of a crossing can't pair them in the wrong order or time them out.
+_clock = Clock.monotonic
+
+# Sides of a gate, outer is the beam on the outside of the entrance.
+OUTER = 0
+INNER = 1
+
+
+class GateCounter(object):
+    """Count crossings through entrance gates made of two beam-break sensors,
+    like IR gates at a hive entrance.  Each gate is a pair of outer and inner
+    pins, and the direction of a crossing comes from which beam was broken
+    first: outer then inner is in, inner then outer is out.  Breaks without a
+    matching break on the other beam within max_gap seconds are counted as
+    unpaired.
+
+    Edges are detected with the GPIO object's add_event_detect and
+    add_event_callback, and the callbacks only store the time of each edge in
+    preallocated arrays without taking a lock, so bursts of edges don't block
+    the GPIO library's event thread.  The stored edges are paired up when
+    counts are read, which should happen before capacity edges have built up
+    (edges which are overwritten before being read are counted as dropped).
+    """
+
+    def __init__(self, gpio, gates, edge=GPIO.FALLING, pull_up_down=GPIO.PUD_UP,
+                 max_gap=0.5, holdoff=0.02, capacity=65536):
+        """Count crossings through gates, a list of (outer pin, inner pin)
+        tuples, on the GPIO object.  Edge is the edge when a beam is broken,
+        and further edges on the same pin within holdoff seconds are ignored.
+        Capacity is rounded up to a power of two.
+        """
+        self._gpio = gpio
+        self._gates = [tuple(gate) for gate in gates]
+        self._edge = edge
+        self._pull_up_down = pull_up_down
+        self.max_gap = max_gap
+        self.holdoff = holdoff
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        # Each edge is stored at the slot for its index with the code of the
+        # pin (gate * 2 + side) and its index + 1, which tells the reader the
+        # slot holds a new edge.
+        self._times = np.zeros(size, dtype=np.float64)
+        self._codes = np.zeros(size, dtype=np.int16)
+        self._sequence = np.zeros(size, dtype=np.int64)
+        self._next = itertools.count()
+        self._read = 0
+        self._lock = threading.Lock()
+        self._last = [-holdoff] * (2 * len(self._gates))
+        self._pending = [None] * len(self._gates)
+        self._counts = self._zero_counts()
+        self.totals = self._zero_counts()
+        self._started = False
+
+    def _zero_counts(self):
+        return {'in': 0, 'out': 0, 'unpaired': 0, 'dropped': 0}
+
+    def _callback(self, code):
+        # Return a GPIO event callback which stores edges for the pin code.
+        def callback(channel=None):
+            index = next(self._next)
+            slot = index & self._mask
+            self._times[slot] = _clock()
+            self._codes[slot] = code
+            self._sequence[slot] = index + 1
+        return callback
+
+    def start(self):
+        """Set up the gate pins as inputs and start detecting edges."""
+        if self._started:
+            return
+        for gate, pins in enumerate(self._gates):
+            for side, pin in enumerate(pins):
+                self._gpio.setup(pin, GPIO.IN, self._pull_up_down)
+                self._gpio.add_event_detect(pin, self._edge)
+                self._gpio.add_event_callback(pin, self._callback(gate * 2 + side))
+        self._started = True
+
+    def stop(self):
+        """Stop detecting edges on the gate pins."""
+        if not self._started:
+            return
+        for pins in self._gates:
+            for pin in pins:
+                self._gpio.remove_event_detect(pin)
+        self._started = False
+
+    def _count(self, name, count=1):
+        self._counts[name] += count
+        self.totals[name] += count
+
+    def _edge_at(self, code, when):
+        # Pair up an edge with the last unpaired edge on the gate.
+        if when - self._last[code] < self.holdoff:
+            return
+        self._last[code] = when
+        gate, side = divmod(code, 2)
+        pending = self._pending[gate]
+        if pending is not None and when - pending[1] > self.max_gap:
+            self._count('unpaired')
+            pending = None
+        if pending is None or pending[0] == side:
+            if pending is not None:
+                self._count('unpaired')
+            self._pending[gate] = (side, when)
+        else:
+            self._count('in' if side == INNER else 'out')
+            self._pending[gate] = None
+
+    def _collect(self):
+        # Process the edges stored since the last call in order.
+        while True:
+            slot = self._read & self._mask
+            sequence = int(self._sequence[slot])
+            if sequence <= self._read:
+                break
+            if sequence > self._read + 1:
+                # The slot was overwritten before it was read, so skip to the
+                # oldest edge still stored.
+                oldest = sequence - 1 - self._mask
+                self._count('dropped', oldest - self._read)
+                self._read = oldest
+                continue
+            self._edge_at(int(self._codes[slot]), float(self._times[slot]))
+            self._read += 1
+        # Edges which have waited longer than max_gap can't be paired anymore.
+        now = _clock()
+        for gate, pending in enumerate(self._pending):
+            if pending is not None and now - pending[1] > self.max_gap:
+                self._count('unpaired')
+                self._pending[gate] = None
+
+    def read(self):
+        """Return a dict with the number of crossings in, out, unpaired beam
+        breaks and dropped edges since the last call to read.  Running totals
+        are kept in the totals attribute.
+        """
+        with self._lock:
+            self._collect()
+            counts = self._counts
+            self._counts = self._zero_counts()
+        return counts
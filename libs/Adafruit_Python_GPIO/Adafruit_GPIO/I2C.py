@@ -19,8 +19,15 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+import collections
+import ctypes
+import fcntl
 import logging
-import subprocess
+import numbers
+import os
+import struct
+import threading
+import time
 
 import smbus
 
@@ -30,40 +37,153 @@ import Adafruit_GPIO.Platform as Platform
 def reverseByteOrder(data):
     """Reverses the byte order of an int (16-bit) or long (32-bit) value."""
     # Courtesy Vishal Sapre
-    byteCount = len(hex(data)[2:].replace('L','')[::2])
+    byteCount = max((data.bit_length() + 7) // 8, 1)
     val       = 0
     for i in range(byteCount):
         val    = (val << 8) | (data & 0xff)
         data >>= 8
     return val
 
+# Linux i2c-dev ioctl for combined transactions and its read message flag,
+# from linux/i2c-dev.h and linux/i2c.h.
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+
+class _i2c_msg(ctypes.Structure):
+    _fields_ = [('addr',  ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('len',   ctypes.c_uint16),
+                ('buf',   ctypes.POINTER(ctypes.c_uint8))]
+
+class _i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [('msgs',  ctypes.POINTER(_i2c_msg)),
+                ('nmsgs', ctypes.c_uint32)]
+
+class _I2CDevFile(object):
+    # An open /dev/i2c-N file for issuing i2c-dev ioctls.
+    def __init__(self, busnum):
+        self.fd = os.open('/dev/i2c-{0}'.format(busnum), os.O_RDWR)
+
+    def close(self):
+        os.close(self.fd)
+
+# Environment variable which, when set to a number of entries, turns on tracing
+# of raw transactions into a ring buffer of that size.  See enable_trace.
+TRACE_ENV = 'ADAFRUIT_I2C_TRACE'
+
+# Ring buffer of traced transactions, or None when tracing is off.
+_trace = None
+
+def enable_trace(size):
+    """Record the last size transactions made by any I2C device into a ring
+    buffer, which get_trace returns.  Unlike debug logging no strings are built
+    so tracing is cheap enough to leave on while a problem is reproduced.
+    """
+    global _trace
+    _trace = collections.deque(maxlen=size)
+
+def disable_trace():
+    """Stop tracing transactions and discard the recorded trace."""
+    global _trace
+    _trace = None
+
+def get_trace():
+    """Return a list of the traced transactions, oldest first, as tuples of
+    (time, bus number, address, operation, register, value).  Register is None
+    for operations without one, and value is the value written or read.
+    """
+    if _trace is None:
+        return []
+    return list(_trace)
+
+if os.environ.get(TRACE_ENV):
+    enable_trace(int(os.environ[TRACE_ENV]))
+
+class _SharedBus(object):
+    # A bus handle shared by all the devices on one bus, with a lock to keep
+    # their transactions from interleaving and a count of the devices using it.
+    def __init__(self, handle, lock):
+        self.handle = handle
+        self.lock = lock
+        self.refs = 0
+
+# Open bus handles keyed by the function which opened them and bus number, the
+# lock for each bus number (shared by all kinds of handle to the bus), and a
+# lock to guard changes to them.
+_buses = {}
+_bus_locks = {}
+_buses_lock = threading.Lock()
+
+def _acquire_bus(busnum, opener=None):
+    # Return the shared bus handle opened by opener (an smbus.SMBus by default)
+    # for the specified bus number, opening it if no other device is using it.
+    if opener is None:
+        opener = smbus.SMBus
+    with _buses_lock:
+        shared = _buses.get((opener, busnum))
+        if shared is None:
+            lock = _bus_locks.setdefault(busnum, threading.RLock())
+            shared = _SharedBus(opener(busnum), lock)
+            _buses[(opener, busnum)] = shared
+        shared.refs += 1
+        return shared
+
+def _release_bus(busnum, opener=None):
+    # Release a device's use of the shared bus handle, closing it once no
+    # devices are using it.
+    if opener is None:
+        opener = smbus.SMBus
+    with _buses_lock:
+        shared = _buses[(opener, busnum)]
+        shared.refs -= 1
+        if shared.refs == 0:
+            del _buses[(opener, busnum)]
+            close = getattr(shared.handle, 'close', None)
+            if close is not None:
+                close()
+
 def get_default_bus():
     """Return the default bus number based on the device platform.  For a
     Raspberry Pi either bus 0 or 1 (based on the Pi revision) will be returned.
     For a Beaglebone Black the first user accessible bus, 1, will be returned.
     """
-    plat = Platform.platform_detect()
-    if plat == Platform.RASPBERRY_PI:
-        if Platform.pi_revision() == 1:
+    board = Platform.board()
+    if board.platform == Platform.RASPBERRY_PI:
+        if board.pi_revision == 1:
             # Revision 1 Pi uses I2C bus 0.
             return 0
         else:
             # Revision 2 Pi uses I2C bus 1.
             return 1
-    elif plat == Platform.BEAGLEBONE_BLACK:
+    elif board.platform == Platform.BEAGLEBONE_BLACK:
         # Beaglebone Black has multiple I2C buses, default to 1 (P9_19 and P9_20).
         return 1
     else:
         raise RuntimeError('Could not determine default I2C bus for platform.')
 
-def get_i2c_device(address, busnum=None, **kwargs):
+def get_i2c_device(address, busnum=None, device_class=None, **kwargs):
     """Return an I2C device for the specified address and on the specified bus.
     If busnum isn't specified, the default I2C bus for the platform will attempt
-    to be detected.
+    to be detected.  Device_class picks the device implementation, by default
+    Device which uses smbus, or RDWRDevice for combined transactions.
     """
     if busnum is None:
         busnum = get_default_bus()
-    return Device(address, busnum, **kwargs)
+    if device_class is None:
+        device_class = Device
+    return device_class(address, busnum, **kwargs)
+
+# Largest number of bytes one SMBus block read can return.
+SMBUS_BLOCK_SIZE = 32
+
+# Largest number of bytes the kernel allows in one I2C_RDWR message.
+I2C_RDWR_MAX_LENGTH = 8192
+
+# Largest number of messages the kernel allows in one I2C_RDWR transaction.
+I2C_RDWR_IOCTL_MAX_MSGS = 42
+
+# BCM2708 I2C driver parameter which enables repeated starts.
+_COMBINED_PARAMETER = '/sys/module/i2c_bcm2708/parameters/combined'
 
 def require_repeated_start():
     """Enable repeated start conditions for I2C register reads.  This is the
@@ -78,8 +198,9 @@ def require_repeated_start():
         # repeated start condition like the kernel smbus I2C driver functions
         # define.  As a workaround this bit in the BCM2708 driver sysfs tree can
         # be changed to enable I2C repeated starts.
-        subprocess.check_call('chmod 666 /sys/module/i2c_bcm2708/parameters/combined', shell=True)
-        subprocess.check_call('echo -n 1 > /sys/module/i2c_bcm2708/parameters/combined', shell=True)
+        os.chmod(_COMBINED_PARAMETER, 0o666)
+        with open(_COMBINED_PARAMETER, 'w') as combined:
+            combined.write('1')
     # Other platforms are a no-op because they (presumably) have the correct
     # behavior and send repeated starts.
 
@@ -87,60 +208,121 @@ def require_repeated_start():
 class Device(object):
     """Class for communicating with an I2C device using the smbus library.
     Allows reading and writing 8-bit, 16-bit, and byte array values to registers
-    on the device."""
+    on the device.
+
+    All the devices on a bus share one smbus connection, and each register
+    read or write holds the bus lock so devices used from different threads
+    never interleave their transactions.  Hold the lock attribute to make a
+    sequence of reads and writes without another device using the bus in
+    between."""
+    # Largest read readList can make in one transaction.
+    _block_size = SMBUS_BLOCK_SIZE
+
     def __init__(self, address, busnum):
         """Create an instance of the I2C device at the specified address on the
         specified I2C bus number."""
         self._address = address
-        self._bus = smbus.SMBus(busnum)
+        self._busnum = busnum
+        self._opener = None
+        shared = _acquire_bus(busnum)
+        self._bus = shared.handle
+        self.lock = shared.lock
         self._logger = logging.getLogger('Adafruit_I2C.Device.Bus.{0}.Address.{1:#0X}' \
                                 .format(busnum, address))
 
+    def _record(self, operation, register, value):
+        # Add a transaction to the trace, only called when tracing is on.
+        _trace.append((time.time(), self._busnum, self._address, operation,
+                       register, value))
+
+    def close(self):
+        """Stop using the bus, closing it if no other devices are using it.  The
+        device can't be used after it is closed."""
+        if self._bus is not None:
+            self._bus = None
+            _release_bus(self._busnum, self._opener)
+
     def writeRaw8(self, value):
         """Write an 8-bit value on the bus (without register)."""
         value = value & 0xFF
-        self._bus.write_byte(self._address, value)
+        with self.lock:
+            self._bus.write_byte(self._address, value)
+        if _trace is not None:
+            self._record('writeRaw8', None, value)
         self._logger.debug("Wrote 0x%02X",
                      value)
 
     def write8(self, register, value):
         """Write an 8-bit value to the specified register."""
         value = value & 0xFF
-        self._bus.write_byte_data(self._address, register, value)
+        with self.lock:
+            self._bus.write_byte_data(self._address, register, value)
+        if _trace is not None:
+            self._record('write8', register, value)
         self._logger.debug("Wrote 0x%02X to register 0x%02X",
                      value, register)
 
     def write16(self, register, value):
         """Write a 16-bit value to the specified register."""
         value = value & 0xFFFF
-        self._bus.write_word_data(self._address, register, value)
+        with self.lock:
+            self._bus.write_word_data(self._address, register, value)
+        if _trace is not None:
+            self._record('write16', register, value)
         self._logger.debug("Wrote 0x%04X to register pair 0x%02X, 0x%02X",
                      value, register, register+1)
 
     def writeList(self, register, data):
         """Write bytes to the specified register."""
-        self._bus.write_i2c_block_data(self._address, register, data)
+        with self.lock:
+            self._bus.write_i2c_block_data(self._address, register, data)
+        if _trace is not None:
+            self._record('writeList', register, data)
         self._logger.debug("Wrote to register 0x%02X: %s",
                      register, data)
 
     def readList(self, register, length):
         """Read a length number of bytes from the specified register.  Results
         will be returned as a bytearray."""
-        results = self._bus.read_i2c_block_data(self._address, register, length)
+        with self.lock:
+            results = self._bus.read_i2c_block_data(self._address, register, length)
+        if _trace is not None:
+            self._record('readList', register, results)
         self._logger.debug("Read the following from register 0x%02X: %s",
                      register, results)
         return results
 
+    def read_struct(self, register, fmt):
+        """Read the registers starting at the specified register and decode
+        them with the specified struct module format string, for example
+        '>hhH' for two signed and one unsigned big endian 16-bit values.
+        Returns a tuple of the decoded values.  The registers are read in as
+        few block reads as the bus allows, holding the bus lock throughout, and
+        the device must auto-increment the register address between bytes."""
+        length = struct.calcsize(fmt)
+        data = bytearray()
+        with self.lock:
+            while len(data) < length:
+                count = min(length - len(data), self._block_size)
+                data.extend(self.readList(register + len(data), count))
+        return struct.unpack(fmt, bytes(data))
+
     def readRaw8(self):
         """Read an 8-bit value on the bus (without register)."""
-        result = self._bus.read_byte(self._address) & 0xFF
+        with self.lock:
+            result = self._bus.read_byte(self._address) & 0xFF
+        if _trace is not None:
+            self._record('readRaw8', None, result)
         self._logger.debug("Read 0x%02X",
                     result)
         return result
 
     def readU8(self, register):
         """Read an unsigned byte from the specified register."""
-        result = self._bus.read_byte_data(self._address, register) & 0xFF
+        with self.lock:
+            result = self._bus.read_byte_data(self._address, register) & 0xFF
+        if _trace is not None:
+            self._record('readU8', register, result)
         self._logger.debug("Read 0x%02X from register 0x%02X",
                      result, register)
         return result
@@ -156,7 +338,10 @@ class Device(object):
         """Read an unsigned 16-bit value from the specified register, with the
         specified endianness (default little endian, or least significant byte
         first)."""
-        result = self._bus.read_word_data(self._address,register) & 0xFFFF
+        with self.lock:
+            result = self._bus.read_word_data(self._address,register) & 0xFFFF
+        if _trace is not None:
+            self._record('readU16', register, result)
         self._logger.debug("Read 0x%04X from register pair 0x%02X, 0x%02X",
                            result, register, register+1)
         # Swap bytes if using big endian because read_word_data assumes little
@@ -193,3 +378,126 @@ class Device(object):
         """Read a signed 16-bit value from the specified register, in big
         endian byte order."""
         return self.readS16(register, little_endian=False)
+
+
+class RDWRDevice(Device):
+    """Class for communicating with an I2C device using the i2c-dev I2C_RDWR
+    ioctl.  Each register read is sent as one combined transaction, a write of
+    the register address followed by a read with a repeated start, and reads
+    aren't limited to the 32 byte SMBus block size.  Use transfer to send any
+    sequence of messages as one transaction.  Has the same read and write
+    functions as Device and shares the bus lock with Device instances on the
+    same bus.
+    """
+    _block_size = I2C_RDWR_MAX_LENGTH
+
+    def __init__(self, address, busnum):
+        """Create an instance of the I2C device at the specified address on the
+        specified I2C bus number."""
+        self._address = address
+        self._busnum = busnum
+        self._opener = _I2CDevFile
+        shared = _acquire_bus(busnum, _I2CDevFile)
+        self._bus = shared.handle
+        self.lock = shared.lock
+        self._logger = logging.getLogger('Adafruit_I2C.RDWRDevice.Bus.{0}.Address.{1:#0X}' \
+                                .format(busnum, address))
+
+    def transfer(self, messages):
+        """Send a list of messages to the device as one combined transaction.
+        Each message is either a sequence of bytes to write or an int number of
+        bytes to read.  Returns a list with a bytearray of the bytes read for
+        each read message, in order.  Raises ValueError if there are more than
+        I2C_RDWR_IOCTL_MAX_MSGS messages or a message is longer than
+        I2C_RDWR_MAX_LENGTH bytes, which the kernel would reject."""
+        if len(messages) > I2C_RDWR_IOCTL_MAX_MSGS:
+            raise ValueError('I2C_RDWR transactions can have at most {0} messages, got {1}!'
+                             .format(I2C_RDWR_IOCTL_MAX_MSGS, len(messages)))
+        msgs = (_i2c_msg * len(messages))()
+        buffers = []
+        reads = []
+        for i, message in enumerate(messages):
+            if isinstance(message, numbers.Integral):
+                buf = (ctypes.c_uint8 * message)()
+                msgs[i].flags = I2C_M_RD
+                reads.append(buf)
+            else:
+                message = bytearray(message)
+                buf = (ctypes.c_uint8 * len(message)).from_buffer(message)
+            # The kernel rejects longer messages, and longer lengths would
+            # also be truncated by the 16-bit len field.
+            if len(buf) > I2C_RDWR_MAX_LENGTH:
+                raise ValueError('I2C_RDWR messages can be at most {0} bytes, got {1}!'
+                                 .format(I2C_RDWR_MAX_LENGTH, len(buf)))
+            msgs[i].addr = self._address
+            msgs[i].len = len(buf)
+            msgs[i].buf = ctypes.cast(buf, ctypes.POINTER(ctypes.c_uint8))
+            buffers.append(buf)
+        data = _i2c_rdwr_ioctl_data(msgs, len(messages))
+        with self.lock:
+            fcntl.ioctl(self._bus.fd, I2C_RDWR, data)
+        results = [bytearray(buf) for buf in reads]
+        if _trace is not None:
+            self._record('transfer', None, (messages, results))
+        return results
+
+    def writeRaw8(self, value):
+        """Write an 8-bit value on the bus (without register)."""
+        value = value & 0xFF
+        self.transfer([[value]])
+        self._logger.debug("Wrote 0x%02X",
+                     value)
+
+    def write8(self, register, value):
+        """Write an 8-bit value to the specified register."""
+        value = value & 0xFF
+        self.transfer([[register, value]])
+        self._logger.debug("Wrote 0x%02X to register 0x%02X",
+                     value, register)
+
+    def write16(self, register, value):
+        """Write a 16-bit value to the specified register."""
+        value = value & 0xFFFF
+        self.transfer([[register, value & 0xFF, value >> 8]])
+        self._logger.debug("Wrote 0x%04X to register pair 0x%02X, 0x%02X",
+                     value, register, register+1)
+
+    def writeList(self, register, data):
+        """Write bytes to the specified register."""
+        self.transfer([bytearray([register]) + bytearray(data)])
+        self._logger.debug("Wrote to register 0x%02X: %s",
+                     register, data)
+
+    def readList(self, register, length):
+        """Read a length number of bytes from the specified register.  Results
+        will be returned as a bytearray."""
+        results = self.transfer([[register], length])[0]
+        self._logger.debug("Read the following from register 0x%02X: %s",
+                     register, results)
+        return results
+
+    def readRaw8(self):
+        """Read an 8-bit value on the bus (without register)."""
+        result = self.transfer([1])[0][0]
+        self._logger.debug("Read 0x%02X",
+                    result)
+        return result
+
+    def readU8(self, register):
+        """Read an unsigned byte from the specified register."""
+        result = self.transfer([[register], 1])[0][0]
+        self._logger.debug("Read 0x%02X from register 0x%02X",
+                     result, register)
+        return result
+
+    def readU16(self, register, little_endian=True):
+        """Read an unsigned 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        low, high = self.transfer([[register], 2])[0]
+        if not little_endian:
+            low, high = high, low
+        result = (high << 8) | low
+        self._logger.debug("Read 0x%04X from register pair 0x%02X, 0x%02X",
+                           result, register, register+1)
+        return result
@@ -0,0 +1,423 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import collections
+import errno
+import struct
+import threading
+import time
+
+import Adafruit_GPIO.Clock as Clock
+
+
+# Clock for measuring durations.
+_clock = Clock.monotonic
+
+# Log file header, a magic string and format version.
+LOG_MAGIC = b'I2CL\x01'
+
+# Each record is a header of the start time, duration in seconds, bus number,
+# address, operation, status (0 or the errno of a failed transaction), register
+# (-1 for operations without one), and data length, followed by the data bytes
+# written or read.
+_RECORD = struct.Struct('<dfBBBBhH')
+
+# Operation codes stored in the log.
+OPERATIONS = ('writeRaw8', 'write8', 'write16', 'writeList', 'readList',
+              'read_struct', 'readRaw8', 'readU8', 'readU16LE', 'readU16BE')
+_CODES = dict((name, code) for code, name in enumerate(OPERATIONS))
+
+# A transaction read from a log.  Data is a bytearray of the bytes written or
+# read, with 16-bit values stored little endian.
+Record = collections.namedtuple('Record', ['time', 'duration', 'busnum',
+    'address', 'operation', 'status', 'register', 'data'])
+
+
+def read_log(log):
+    """Return a list of the Records in the specified log, either a file name
+    or a file-like object opened for binary reading."""
+    if not hasattr(log, 'read'):
+        with open(log, 'rb') as stream:
+            return read_log(stream)
+    if log.read(len(LOG_MAGIC)) != LOG_MAGIC:
+        raise RuntimeError('Not an I2C transaction log.')
+    records = []
+    while True:
+        header = log.read(_RECORD.size)
+        if len(header) < _RECORD.size:
+            # End of the log, or a record cut off by a crash.
+            break
+        start, duration, busnum, address, code, status, register, length = _RECORD.unpack(header)
+        data = bytearray(log.read(length))
+        if len(data) < length:
+            break
+        records.append(Record(start, duration, busnum, address, OPERATIONS[code],
+                              status, None if register < 0 else register, data))
+    return records
+
+def latency_stats(records):
+    """Return a dict, keyed by operation name, of dicts with the count and the
+    mean, minimum, median, 95th percentile, 99th percentile and maximum
+    duration in seconds of the specified records' transactions."""
+    durations = collections.defaultdict(list)
+    for record in records:
+        durations[record.operation].append(record.duration)
+    stats = {}
+    for operation, values in durations.items():
+        values.sort()
+        def percentile(p):
+            return values[min(int(p * len(values)), len(values) - 1)]
+        stats[operation] = {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'min': values[0],
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': values[-1]
+        }
+    return stats
+
+
+class _LoggedDevice(object):
+    # Functions of the I2C Device class which are built on the primitive
+    # register reads and are the same for recording and replaying devices.
+
+    def readS8(self, register):
+        """Read a signed byte from the specified register."""
+        result = self.readU8(register)
+        if result > 127:
+            result -= 256
+        return result
+
+    def readS16(self, register, little_endian=True):
+        """Read a signed 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        result = self.readU16(register, little_endian)
+        if result > 32767:
+            result -= 65536
+        return result
+
+    def readU16LE(self, register):
+        """Read an unsigned 16-bit value from the specified register, in little
+        endian byte order."""
+        return self.readU16(register, little_endian=True)
+
+    def readU16BE(self, register):
+        """Read an unsigned 16-bit value from the specified register, in big
+        endian byte order."""
+        return self.readU16(register, little_endian=False)
+
+    def readS16LE(self, register):
+        """Read a signed 16-bit value from the specified register, in little
+        endian byte order."""
+        return self.readS16(register, little_endian=True)
+
+    def readS16BE(self, register):
+        """Read a signed 16-bit value from the specified register, in big
+        endian byte order."""
+        return self.readS16(register, little_endian=False)
+
+
+class Recorder(object):
+    """I2C provider which wraps another provider (by default the
+    Adafruit_GPIO.I2C module) and records every transaction its devices make,
+    with its start time and duration, to a compact binary log.  Pass it as the
+    i2c parameter of a driver, or wrap an existing device such as an
+    FT232H.I2CDevice with wrap.  Log is a file name or a file-like object
+    opened for binary writing.
+    """
+
+    def __init__(self, log, i2c=None):
+        if i2c is None:
+            import Adafruit_GPIO.I2C as I2C
+            i2c = I2C
+        self._i2c = i2c
+        self._lock = threading.Lock()
+        if hasattr(log, 'write'):
+            self._log = log
+            self._owns_log = False
+        else:
+            self._log = open(log, 'wb')
+            self._owns_log = True
+        self._log.write(LOG_MAGIC)
+
+    def get_default_bus(self):
+        """Return the default bus of the wrapped provider."""
+        return self._i2c.get_default_bus()
+
+    def get_i2c_device(self, address, busnum=None, **kwargs):
+        """Return a recording device for the specified address, created by the
+        wrapped provider."""
+        if busnum is None:
+            busnum = self._i2c.get_default_bus()
+        device = self._i2c.get_i2c_device(address, busnum=busnum, **kwargs)
+        return self.wrap(device, address, busnum)
+
+    def wrap(self, device, address, busnum=0):
+        """Return a recording device which wraps the specified device at the
+        specified address and bus number."""
+        return RecordingDevice(self, device, address, busnum)
+
+    def flush(self):
+        """Flush recorded transactions to the log."""
+        with self._lock:
+            self._log.flush()
+
+    def close(self):
+        """Stop recording and close the log if it was opened by name."""
+        with self._lock:
+            if self._owns_log:
+                self._log.close()
+            else:
+                self._log.flush()
+
+    def _record(self, start, duration, busnum, address, operation, status,
+                register, data):
+        data = bytes(data)
+        if register is None:
+            register = -1
+        header = _RECORD.pack(start, duration, busnum, address, _CODES[operation],
+                              status, register, len(data))
+        with self._lock:
+            self._log.write(header + data)
+
+
+class RecordingDevice(_LoggedDevice):
+    """Device which passes reads and writes through to another device and
+    records them with a Recorder."""
+
+    def __init__(self, recorder, device, address, busnum):
+        self._recorder = recorder
+        self._device = device
+        self._address = address
+        self._busnum = busnum
+
+    def _call(self, operation, register, written, function, *args):
+        # Call a function of the wrapped device and record it.  Written is the
+        # data written, or None for reads whose result is recorded instead.
+        start = time.time()
+        begin = _clock()
+        try:
+            result = function(*args)
+        except (IOError, OSError) as error:
+            self._recorder._record(start, _clock() - begin, self._busnum,
+                self._address, operation, (error.errno or errno.EIO) & 0xFF,
+                register, b'')
+            raise
+        duration = _clock() - begin
+        if written is not None:
+            data = bytearray(written)
+        elif operation in ('readU16LE', 'readU16BE'):
+            data = bytearray(struct.pack('<H', result))
+        elif operation in ('readRaw8', 'readU8'):
+            data = bytearray((result,))
+        else:
+            data = bytearray(result)
+        self._recorder._record(start, duration, self._busnum, self._address,
+                               operation, 0, register, data)
+        return result
+
+    def close(self):
+        """Close the wrapped device."""
+        close = getattr(self._device, 'close', None)
+        if close is not None:
+            close()
+
+    def writeRaw8(self, value):
+        """Write an 8-bit value on the bus (without register)."""
+        value = value & 0xFF
+        self._call('writeRaw8', None, [value], self._device.writeRaw8, value)
+
+    def write8(self, register, value):
+        """Write an 8-bit value to the specified register."""
+        value = value & 0xFF
+        self._call('write8', register, [value], self._device.write8, register, value)
+
+    def write16(self, register, value):
+        """Write a 16-bit value to the specified register."""
+        value = value & 0xFFFF
+        self._call('write16', register, struct.pack('<H', value),
+                   self._device.write16, register, value)
+
+    def writeList(self, register, data):
+        """Write bytes to the specified register."""
+        self._call('writeList', register, data, self._device.writeList, register, data)
+
+    def readList(self, register, length):
+        """Read a length number of bytes from the specified register."""
+        return self._call('readList', register, None, self._device.readList,
+                          register, length)
+
+    def read_struct(self, register, fmt):
+        """Read the registers starting at the specified register and decode
+        them with the specified struct module format string."""
+        # Read through the wrapped device's read_struct so it's split into
+        # block reads and locked the same way as without a recorder, and
+        # record the values packed back into bytes so the log doesn't depend
+        # on the format.
+        values = []
+        def read():
+            values.extend(self._device.read_struct(register, fmt))
+            return struct.pack(fmt, *values)
+        self._call('read_struct', register, None, read)
+        return tuple(values)
+
+    def readRaw8(self):
+        """Read an 8-bit value on the bus (without register)."""
+        return self._call('readRaw8', None, None, self._device.readRaw8)
+
+    def readU8(self, register):
+        """Read an unsigned byte from the specified register."""
+        return self._call('readU8', register, None, self._device.readU8, register)
+
+    def readU16(self, register, little_endian=True):
+        """Read an unsigned 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        operation = 'readU16LE' if little_endian else 'readU16BE'
+        return self._call(operation, register, None, self._device.readU16,
+                          register, little_endian)
+
+
+class Replayer(object):
+    """I2C provider which replays a log written by a Recorder.  Devices it
+    returns answer each read with the recorded result, and re-raise recorded
+    failures, in the recorded order, so a driver sees exactly the bus traffic
+    the recorded node saw.  A RuntimeError is raised if the driver makes a
+    transaction which doesn't match the next recorded one.  If realtime is
+    True each transaction waits until its recorded time since the first
+    transaction, reproducing the recorded timing.
+    """
+
+    def __init__(self, log, realtime=False):
+        self._records = read_log(log)
+        self._next = 0
+        self._realtime = realtime
+        self._start = None
+        self._lock = threading.Lock()
+
+    def get_default_bus(self):
+        """Return the bus number of the first recorded transaction."""
+        if self._records:
+            return self._records[0].busnum
+        return 0
+
+    def get_i2c_device(self, address, busnum=None, **kwargs):
+        """Return a device which replays the transactions recorded for the
+        specified address."""
+        if busnum is None:
+            busnum = self.get_default_bus()
+        return ReplayDevice(self, address, busnum)
+
+    def remaining(self):
+        """Return the number of recorded transactions not replayed yet."""
+        return len(self._records) - self._next
+
+    def _replay(self, busnum, address, operation, register, written=None,
+                length=None):
+        # Check a transaction against the next recorded one and return the
+        # recorded data, which must be length bytes for reads.
+        with self._lock:
+            if self._next >= len(self._records):
+                raise RuntimeError('Replay log has no more transactions.')
+            record = self._records[self._next]
+            if (record.busnum, record.address, record.operation, record.register) != \
+               (busnum, address, operation, register):
+                raise RuntimeError('Replayed transaction {0} on bus {1} address {2:#04x} register {3} does not match recorded transaction {4} on bus {5} address {6:#04x} register {7}.' \
+                    .format(operation, busnum, address, register, record.operation,
+                            record.busnum, record.address, record.register))
+            self._next += 1
+            first = self._records[0].time
+        if self._realtime:
+            if self._start is None:
+                self._start = _clock()
+            delay = (record.time - first + record.duration) - (_clock() - self._start)
+            if delay > 0:
+                time.sleep(delay)
+        if record.status != 0:
+            raise IOError(record.status, 'Recorded transaction failed: {0}'.format(
+                          errno.errorcode.get(record.status, record.status)))
+        if written is not None and bytearray(written) != record.data:
+            raise RuntimeError('Replayed {0} wrote {1} but the recorded transaction wrote {2}.' \
+                .format(operation, list(bytearray(written)), list(record.data)))
+        if length is not None and length != len(record.data):
+            raise RuntimeError('Replayed {0} read {1} bytes but the recorded transaction read {2}.' \
+                .format(operation, length, len(record.data)))
+        return record.data
+
+
+class ReplayDevice(_LoggedDevice):
+    """Device which answers reads and writes from a Replayer's log."""
+
+    def __init__(self, replayer, address, busnum):
+        self._replayer = replayer
+        self._address = address
+        self._busnum = busnum
+
+    def _replay(self, operation, register, written=None, length=None):
+        return self._replayer._replay(self._busnum, self._address, operation,
+                                      register, written, length)
+
+    def close(self):
+        """Stop using the device, does nothing when replaying."""
+        pass
+
+    def writeRaw8(self, value):
+        """Write an 8-bit value on the bus (without register)."""
+        self._replay('writeRaw8', None, [value & 0xFF])
+
+    def write8(self, register, value):
+        """Write an 8-bit value to the specified register."""
+        self._replay('write8', register, [value & 0xFF])
+
+    def write16(self, register, value):
+        """Write a 16-bit value to the specified register."""
+        self._replay('write16', register, struct.pack('<H', value & 0xFFFF))
+
+    def writeList(self, register, data):
+        """Write bytes to the specified register."""
+        self._replay('writeList', register, data)
+
+    def readList(self, register, length):
+        """Read a length number of bytes from the specified register."""
+        return bytearray(self._replay('readList', register, length=length))
+
+    def read_struct(self, register, fmt):
+        """Read the registers starting at the specified register and decode
+        them with the specified struct module format string."""
+        data = self._replay('read_struct', register, length=struct.calcsize(fmt))
+        return struct.unpack(fmt, bytes(data))
+
+    def readRaw8(self):
+        """Read an 8-bit value on the bus (without register)."""
+        return self._replay('readRaw8', None, length=1)[0]
+
+    def readU8(self, register):
+        """Read an unsigned byte from the specified register."""
+        return self._replay('readU8', register, length=1)[0]
+
+    def readU16(self, register, little_endian=True):
+        """Read an unsigned 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        operation = 'readU16LE' if little_endian else 'readU16BE'
+        return struct.unpack('<H', bytes(self._replay(operation, register, length=2)))[0]
@@ -19,9 +19,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 import math
+import threading
 
 import Adafruit_GPIO as GPIO
-import Adafruit_GPIO.I2C as I2C
 
 
 class MCP230xxBase(GPIO.BaseGPIO):
@@ -46,23 +46,47 @@ class MCP230xxBase(GPIO.BaseGPIO):
         self.iodir = [0x00]*self.gpio_bytes  # Default direction to all inputs.
         self.gppu = [0x00]*self.gpio_bytes  # Default to pullups disabled.
         self.gpio = [0x00]*self.gpio_bytes
+        # Interrupt-on-change state, see start_interrupts.
+        self.gpinten = [0x00]*self.gpio_bytes
+        self._interrupt_gpio = None
+        self._interrupt_pin = None
+        self._interrupt_callback = None
+        self._saved_interrupt_config = None
+        # Last input levels read, kept up to date by interrupts.  The lock is
+        # held while they're read and compared so changes are reported once,
+        # whether the interrupt handler or a read of other pins sees them.
+        self._inputs = None
+        self._inputs_lock = threading.Lock()
+        self.interrupts = 0
         # Write current direction and pullup buffer state.
         self.write_iodir()
         self.write_gppu()
 
 
-    def setup(self, pin, value):
-        """Set the input or output mode for a specified pin.  Mode should be
-        either GPIO.OUT or GPIO.IN.
-        """
-        self._validate_pin(pin)
+    def _set_iodir(self, pin, value):
         # Set bit to 1 for input or 0 for output.
+        self._validate_pin(pin)
         if value == GPIO.IN:
             self.iodir[int(pin/8)] |= 1 << (int(pin%8))
         elif value == GPIO.OUT:
             self.iodir[int(pin/8)] &= ~(1 << (int(pin%8)))
         else:
             raise ValueError('Unexpected value.  Must be GPIO.IN or GPIO.OUT.')
+
+    def setup(self, pin, value):
+        """Set the input or output mode for a specified pin.  Mode should be
+        either GPIO.OUT or GPIO.IN.
+        """
+        self._set_iodir(pin, value)
+        self.write_iodir()
+
+    def setup_pins(self, pins):
+        """Setup multiple pins as inputs or outputs at once.  Pins should be a
+        dict of pin name to pin type (IN or OUT).  The direction register is
+        written once for all the pins.
+        """
+        for pin, value in iter(pins.items()):
+            self._set_iodir(pin, value)
         self.write_iodir()
 
 
@@ -97,25 +121,140 @@ class MCP230xxBase(GPIO.BaseGPIO):
     def input_pins(self, pins):
         """Read multiple pins specified in the given list and return list of pin values
         GPIO.HIGH/True if the pin is pulled high, or GPIO.LOW/False if pulled low.
+        Pins with interrupt-on-change enabled (see start_interrupts) are read
+        from the levels cached at the last change, so reading only them doesn't
+        touch the bus.  Reading other pins while interrupts are enabled clears
+        any pending interrupt, so changes to interrupt pins it finds are passed
+        to the interrupt callback from this call instead.
         """
         [self._validate_pin(pin) for pin in pins]
-        # Get GPIO state.
-        gpio = self._device.readList(self.GPIO, self.gpio_bytes)
+        gpio = self._inputs
+        if gpio is None or not all(self._interrupt_enabled(pin) for pin in pins):
+            if self._interrupt_gpio is None:
+                # Get GPIO state.
+                gpio = self._device.readList(self.GPIO, self.gpio_bytes)
+            else:
+                gpio = self._refresh_inputs()
         # Return True if pin's bit is set.
         return [(gpio[int(pin/8)] & 1 << (int(pin%8))) > 0 for pin in pins]
 
 
-    def pullup(self, pin, enabled):
-        """Turn on the pull-up resistor for the specified pin if enabled is True,
-        otherwise turn off the pull-up resistor.
-        """
+    def _set_gppu(self, pin, enabled):
         self._validate_pin(pin)
         if enabled:
             self.gppu[int(pin/8)] |= 1 << (int(pin%8))
         else:
             self.gppu[int(pin/8)] &= ~(1 << (int(pin%8)))
+
+    def pullup(self, pin, enabled):
+        """Turn on the pull-up resistor for the specified pin if enabled is True,
+        otherwise turn off the pull-up resistor.
+        """
+        self._set_gppu(pin, enabled)
         self.write_gppu()
 
+    def pullup_pins(self, pins):
+        """Turn pull-up resistors on or off for multiple pins at once.  Pins
+        should be a dict of pin name to True to enable or False to disable the
+        pull-up.  The pull-up register is written once for all the pins.
+        """
+        for pin, enabled in iter(pins.items()):
+            self._set_gppu(pin, enabled)
+        self.write_gppu()
+
+    def _interrupt_enabled(self, pin):
+        return (self.gpinten[int(pin/8)] & 1 << (int(pin%8))) > 0
+
+    def start_interrupts(self, pins, gpio, interrupt_pin, callback=None):
+        """Enable interrupt-on-change for the specified list of input pins,
+        with the chip's INT output (INTA on the MCP23017, which is mirrored to
+        INTB so either can be used) wired to interrupt_pin on the host GPIO
+        object.  INT is configured active low and push-pull, so the host sees
+        a falling edge for each change.  When the host detects the edge the
+        interrupt flags, captured levels and current levels are read in one
+        transfer, which also clears the interrupt, and the current levels are
+        cached for input and input_pins.  If callback is specified it's called
+        with a dict of pin to new value (True/False) for the pins which
+        changed.  INTCON and IOCON are saved first and restored by
+        stop_interrupts.
+        """
+        self.stop_interrupts()
+        self.gpinten = [0x00]*self.gpio_bytes
+        for pin in pins:
+            self._validate_pin(pin)
+            self.gpinten[int(pin/8)] |= 1 << (int(pin%8))
+        # Save the interrupt configuration to restore in stop_interrupts.
+        self._saved_interrupt_config = (
+            self._device.readList(self.INTCON, self.gpio_bytes),
+            self._device.readU8(self.IOCON))
+        # Compare each pin against its previous value rather than DEFVAL.
+        self._device.writeList(self.INTCON, [0x00]*self.gpio_bytes)
+        self._device.write8(self.IOCON, self.IOCON_MIRROR)
+        self._interrupt_callback = callback
+        gpio.setup(interrupt_pin, GPIO.IN, GPIO.PUD_UP)
+        gpio.add_event_detect(interrupt_pin, GPIO.FALLING)
+        gpio.add_event_callback(interrupt_pin, self._handle_interrupt)
+        self._interrupt_gpio = gpio
+        self._interrupt_pin = interrupt_pin
+        self._device.writeList(self.GPINTEN, self.gpinten)
+        # Read the current levels, which also clears any pending interrupt.
+        self._inputs = self._device.readList(self.GPIO, self.gpio_bytes)
+
+    def stop_interrupts(self):
+        """Disable interrupt-on-change, stop caching input levels and restore
+        the INTCON and IOCON registers changed by start_interrupts.
+        """
+        if self._interrupt_gpio is None:
+            return
+        self._interrupt_gpio.remove_event_detect(self._interrupt_pin)
+        self._interrupt_gpio = None
+        self._interrupt_pin = None
+        self._interrupt_callback = None
+        with self._inputs_lock:
+            self._inputs = None
+            self.gpinten = [0x00]*self.gpio_bytes
+        self._device.writeList(self.GPINTEN, self.gpinten)
+        intcon, iocon = self._saved_interrupt_config
+        self._device.writeList(self.INTCON, intcon)
+        self._device.write8(self.IOCON, iocon)
+        self._saved_interrupt_config = None
+
+    def _refresh_inputs(self, interrupt=False):
+        # Read and cache the input levels while interrupts are enabled, pass
+        # the interrupt pins which changed to the callback and return the
+        # levels.  INTF, INTCAP and GPIO are consecutive registers, so read
+        # them all at once.  Reading GPIO gets any change made after the
+        # capture and clears the interrupt.
+        with self._inputs_lock:
+            previous = self._inputs
+            # Until the read succeeds inputs are read from the bus.
+            self._inputs = None
+            registers = self._device.readList(self.INTF, 3*self.gpio_bytes)
+            gpio = registers[2*self.gpio_bytes:]
+            if self._interrupt_gpio is not None:
+                self._inputs = gpio
+            if interrupt:
+                self.interrupts += 1
+            changed = {}
+            for port in range(self.gpio_bytes):
+                # Pins flagged in INTF changed, and so did any which are now
+                # different from the cached levels.
+                bits = registers[port]
+                if previous is not None:
+                    bits |= previous[port] ^ gpio[port]
+                bits &= self.gpinten[port]
+                for bit in range(8):
+                    if bits & 1 << bit:
+                        changed[port*8 + bit] = (gpio[port] & 1 << bit) > 0
+            callback = self._interrupt_callback
+        # Call back without the lock held so the callback can read pins.
+        if changed and callback is not None:
+            callback(changed)
+        return gpio
+
+    def _handle_interrupt(self, channel=None):
+        self._refresh_inputs(interrupt=True)
+
     def write_gpio(self, gpio=None):
         """Write the specified byte value to the GPIO registor.  If no value
         specified the current buffered value will be written.
@@ -146,8 +285,14 @@ class MCP23017(MCP230xxBase):
     # Define number of pins and registor addresses.
     NUM_GPIO = 16
     IODIR    = 0x00
-    GPIO     = 0x12
+    GPINTEN  = 0x04
+    INTCON   = 0x08
+    IOCON    = 0x0A
     GPPU     = 0x0C
+    INTF     = 0x0E
+    GPIO     = 0x12
+    # IOCON MIRROR bit, which ORs the port A and B interrupts onto both pins.
+    IOCON_MIRROR = 0x40
 
     def __init__(self, address=0x20, **kwargs):
         super(MCP23017, self).__init__(address, **kwargs)
@@ -158,8 +303,14 @@ class MCP23008(MCP230xxBase):
     # Define number of pins and registor addresses.
     NUM_GPIO = 8
     IODIR    = 0x00
-    GPIO     = 0x09
+    GPINTEN  = 0x02
+    INTCON   = 0x04
+    IOCON    = 0x05
     GPPU     = 0x06
+    INTF     = 0x07
+    GPIO     = 0x09
+    # There's only one port, so no interrupt mirroring.
+    IOCON_MIRROR = 0x00
 
     def __init__(self, address=0x20, **kwargs):
         super(MCP23008, self).__init__(address, **kwargs)
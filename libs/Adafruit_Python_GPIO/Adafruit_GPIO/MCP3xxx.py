@@ -0,0 +1,278 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import threading
+import time
+
+import numpy as np
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.SPI as SPI
+
+
+# Each conversion is started and read back in a 3 byte SPI transfer.
+CONVERSION_BYTES = 3
+
+
+class MCP3xxxBase(object):
+    """Base class to represent an MCP3xxx series SPI analog to digital
+    converter.  Conversions are read with any of the Adafruit_GPIO SPI classes
+    (hardware SpiDev, BitBang or FT232H SPI).
+    """
+
+    def __init__(self, spi=None, clk=None, cs=None, miso=None, mosi=None,
+                 gpio=None, max_speed_hz=1000000):
+        """Initialize the ADC with either a hardware SPI device (like
+        SPI.SpiDev(0, 0)) passed as spi, or the clk, cs, miso and mosi pins
+        of a software SPI bus on the specified or platform GPIO.
+        """
+        if spi is None:
+            if clk is None or cs is None or miso is None or mosi is None:
+                raise ValueError('Must specify either spi for hardware SPI or clk, cs, miso, and mosi for software SPI!')
+            if gpio is None:
+                gpio = GPIO.get_platform_gpio()
+            spi = SPI.BitBang(gpio, clk, mosi, miso, cs)
+        spi.set_clock_hz(max_speed_hz)
+        spi.set_mode(0)
+        spi.set_bit_order(SPI.MSBFIRST)
+        self._spi = spi
+        self._mask = (1 << self.BITS) - 1
+        # Command and response buffers for the last scan, reused while the
+        # same channels are scanned.
+        self._scan = None
+
+    def _validate_channel(self, channel):
+        # Raise an exception if channel isn't valid.
+        if channel < 0 or channel >= self.CHANNELS:
+            raise ValueError('Channel must be a value within 0-{0}!'.format(self.CHANNELS - 1))
+
+    def _read(self, channel, single_ended):
+        self._validate_channel(channel)
+        response = self._spi.transfer(self._command(channel, single_ended))
+        return ((response[1] << 8) | response[2]) & self._mask
+
+    def read_adc(self, channel):
+        """Read the current value of the specified ADC channel (0-7).  The
+        value is an integer from 0 to the ADC's maximum (1023 for 10 bits,
+        4095 for 12 bits).
+        """
+        return self._read(channel, True)
+
+    def read_adc_difference(self, differential):
+        """Read the difference between two channels.  Differential should be
+        a value of:
+          - 0: Return channel 0 minus channel 1
+          - 1: Return channel 1 minus channel 0
+          - 2: Return channel 2 minus channel 3
+          - 3: Return channel 3 minus channel 2
+          - 4: Return channel 4 minus channel 5
+          - 5: Return channel 5 minus channel 4
+          - 6: Return channel 6 minus channel 7
+          - 7: Return channel 7 minus channel 6
+        """
+        return self._read(differential, False)
+
+    def read_scans(self, channels, count=1, out=None):
+        """Read count scans of the specified single ended channels and return
+        them as a NumPy array of uint16 values with a row for each scan and a
+        column for each channel, or store them in out (an array of that shape,
+        like a slice of a larger buffer).  On hardware SPI all the conversions
+        are sent in as few ioctls as possible, so scanning a block of many
+        samples at once is much faster than reading them one at a time.
+        """
+        channels = tuple(channels)
+        for channel in channels:
+            self._validate_channel(channel)
+        key = (channels, count)
+        if self._scan is None or self._scan[0] != key:
+            commands = bytearray().join(self._command(channel, True) for channel in channels)
+            commands *= count
+            self._scan = (key, commands, bytearray(len(commands)))
+        key, commands, response = self._scan
+        transfer_blocks = getattr(self._spi, 'transfer_blocks', None)
+        if transfer_blocks is not None:
+            transfer_blocks(commands, CONVERSION_BYTES, response)
+        else:
+            # Other SPI classes need a transfer for each conversion so chip
+            # select is released between them.
+            for start in range(0, len(commands), CONVERSION_BYTES):
+                end = start + CONVERSION_BYTES
+                response[start:end] = self._spi.transfer(commands[start:end])
+        conversions = np.frombuffer(response, dtype=np.uint8).reshape(-1, CONVERSION_BYTES)
+        values = conversions[:, 1].astype(np.uint16) << 8
+        values |= conversions[:, 2]
+        values &= self._mask
+        values = values.reshape(count, len(channels))
+        if out is None:
+            return values
+        out[...] = values
+        return out
+
+
+class MCP3008(MCP3xxxBase):
+    """MCP3008 8 channel 10-bit analog to digital converter."""
+
+    CHANNELS = 8
+    BITS = 10
+
+    def _command(self, channel, single_ended):
+        # Start bit, then the single ended/differential bit and channel in the
+        # high nibble of the second byte.  The 10 bit result comes back in the
+        # low 2 bits of the second byte and all of the third.
+        mode = 0x08 if single_ended else 0x00
+        return bytearray((0x01, (mode | channel) << 4, 0x00))
+
+
+class MCP3208(MCP3xxxBase):
+    """MCP3208 8 channel 12-bit analog to digital converter."""
+
+    CHANNELS = 8
+    BITS = 12
+
+    def _command(self, channel, single_ended):
+        # Start bit, single ended/differential bit and the top channel bit in
+        # the first byte and the rest of the channel at the top of the second.
+        # The 12 bit result comes back in the low 4 bits of the second byte and
+        # all of the third.
+        mode = 0x02 if single_ended else 0x00
+        return bytearray((0x04 | mode | (channel >> 2), (channel & 0x03) << 6, 0x00))
+
+
+class Sampler(object):
+    """Sample channels of an MCP3008 or MCP3208 continuously in a background
+    thread.  Scans are read in blocks and stored in a NumPy ring buffer which
+    holds the last seconds of samples, and statistics (mean, RMS, minimum and
+    maximum) can be taken over any recent window of it.  Values are converted
+    to volts with vref and then to the channel's units by subtracting its
+    offset (in volts) and multiplying by its scale, for example a current
+    sensor centered on 2.5 volts with 0.185 volts per amp would have an offset
+    of 2.5 and a scale of 1/0.185.
+    """
+
+    def __init__(self, adc, channels, rate=1000, seconds=10.0, block=None,
+                 vref=3.3, offset=None, scale=None):
+        """Sample the list of channels on the ADC at rate scans per second.
+        Each block of scans (by default 10 milliseconds worth) is read back to
+        back and then the thread sleeps until the next block is due.
+        """
+        self._adc = adc
+        self._channels = list(channels)
+        self._rate = float(rate)
+        self._block = block if block is not None else max(1, int(self._rate / 100))
+        # Keep one block more than the requested seconds so the block being
+        # read is never part of a window.
+        size = max(int(self._rate * seconds), self._block)
+        blocks = (size + self._block - 1) // self._block + 1
+        self._size = blocks * self._block
+        self._buffer = np.zeros((self._size, len(self._channels)), dtype=np.uint16)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if offset is None:
+            offset = [0.0] * len(self._channels)
+        if scale is None:
+            scale = [1.0] * len(self._channels)
+        scale = np.asarray(scale, dtype=np.float64)
+        self._gain = vref / float(1 << adc.BITS) * scale
+        self._bias = -np.asarray(offset, dtype=np.float64) * scale
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and wait for it to finish."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        period = self._block / self._rate
+        due = time.time()
+        while not self._stop.is_set():
+            self.sample_block()
+            due += period
+            delay = due - time.time()
+            if delay < -1.0:
+                # Too far behind to catch up, so start again from now.
+                due = time.time()
+            elif delay > 0:
+                self._stop.wait(delay)
+
+    def sample_block(self):
+        """Read one block of scans into the ring buffer.  Called by the
+        background thread, or directly to sample without one.  Returns True if
+        the block was read.
+        """
+        start = self._count % self._size
+        try:
+            self._adc.read_scans(self._channels, self._block,
+                                 out=self._buffer[start:start + self._block])
+        except (IOError, OSError, RuntimeError) as error:
+            self.errors += 1
+            self.last_error = str(error)
+            return False
+        with self._lock:
+            self._count += self._block
+        return True
+
+    def window(self, seconds=None):
+        """Return the samples from the last seconds (or all that are kept when
+        None) converted to units, as an array with a row for each scan and a
+        column for each channel.
+        """
+        with self._lock:
+            count = min(self._count, self._size - self._block)
+            if seconds is not None:
+                count = min(count, int(round(seconds * self._rate)))
+            end = self._count % self._size
+            start = end - count
+            if start >= 0:
+                raw = self._buffer[start:end].copy()
+            else:
+                raw = np.concatenate((self._buffer[start:], self._buffer[:end]))
+        return raw * self._gain + self._bias
+
+    def stats(self, seconds=None):
+        """Return a dict with the mean, rms, min and max of each channel over
+        the last seconds (or all the samples kept when None) as arrays in
+        channel order, and the number of scans as count.  Returns None if
+        nothing has been sampled yet.
+        """
+        values = self.window(seconds)
+        if len(values) == 0:
+            return None
+        return {
+            'mean': values.mean(axis=0),
+            'rms': np.sqrt(np.square(values).mean(axis=0)),
+            'min': values.min(axis=0),
+            'max': values.max(axis=0),
+            'count': len(values)
+        }
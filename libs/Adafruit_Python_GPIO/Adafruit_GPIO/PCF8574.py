@@ -21,7 +21,6 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.'''
 
 import Adafruit_GPIO as GPIO
-import Adafruit_GPIO.I2C as I2C
 
 
 
@@ -48,7 +47,9 @@ class PCF8574(GPIO.BaseGPIO):
         if self.__name__[0] != 'P':
             raise ValueError(self.__name__)
         # Create I2C device.
-        i2c = i2c or I2C
+        if i2c is None:
+            import Adafruit_GPIO.I2C as I2C
+            i2c = I2C
         busnum = busnum or i2c.get_default_bus()
         self._device = i2c.get_i2c_device(address, busnum, **kwargs)
         # Buffer register values so they can be changed without reading.
@@ -68,9 +69,9 @@ class PCF8574(GPIO.BaseGPIO):
         self.setup_pins({pin: mode})
 
     def setup_pins(self, pins):
-        if False in [y for x,y in [(self._validate_pin(pin),mode in (IN,OUT)) for pin,mode in pins.iteritems()]]:
+        if False in [y for x,y in [(self._validate_pin(pin),mode in (IN,OUT)) for pin,mode in pins.items()]]:
             raise ValueError('Invalid MODE, IN or OUT')
-        for pin,mode in pins.iteritems():
+        for pin,mode in pins.items():
             self.iodir = self._bit2(self.iodir, pin, mode)
         self._write_pins()
 
@@ -80,7 +81,7 @@ class PCF8574(GPIO.BaseGPIO):
 
     def output_pins(self, pins):
         [self._validate_pin(pin) for pin in pins.keys()]
-        for pin,value in pins.iteritems():
+        for pin,value in pins.items():
             self.gpio = self._bit2(self.gpio, pin, bool(value))
         self._write_pins()
 
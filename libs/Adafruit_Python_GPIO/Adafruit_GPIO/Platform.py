@@ -18,6 +18,8 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import collections
+import os
 import platform
 import re
 
@@ -27,6 +29,67 @@ RASPBERRY_PI     = 1
 BEAGLEBONE_BLACK = 2
 MINNOWBOARD      = 3
 
+# Environment variable which overrides board detection, useful for testing.
+# Value is the platform name optionally followed by the Pi version and
+# revision, for example ADAFRUIT_PLATFORM=RASPBERRY_PI,2,2
+PLATFORM_ENV = 'ADAFRUIT_PLATFORM'
+
+# Description of the board the process is running on.  The Pi version and
+# revision are None when not running on a Raspberry Pi, and the revision is
+# also None on a Pi which doesn't report it.
+Board = collections.namedtuple('Board', ['platform', 'pi_version', 'pi_revision'])
+
+_board = None
+
+
+def board():
+    """Return a Board tuple describing the platform, Raspberry Pi version and
+    Raspberry Pi revision.  Detection is done once and cached for the life of
+    the process, so unlike platform_detect this is cheap enough to call on
+    every sensor read.  Set the ADAFRUIT_PLATFORM environment variable to skip
+    detection and use an explicit board.
+    """
+    global _board
+    if _board is None:
+        _board = _detect_board()
+    return _board
+
+def clear_board_cache():
+    """Forget the cached board so the next call to board() detects it again."""
+    global _board
+    _board = None
+
+def _detect_board():
+    override = os.environ.get(PLATFORM_ENV)
+    if override:
+        return parse_board(override)
+    plat = platform_detect()
+    if plat == RASPBERRY_PI:
+        try:
+            revision = pi_revision()
+        except RuntimeError:
+            # Some kernels don't report a Revision line.  Only the default I2C
+            # bus depends on the revision, so leave it unknown instead of
+            # failing detection (and every sensor read) on those boards.
+            revision = None
+        return Board(plat, pi_version(), revision)
+    return Board(plat, None, None)
+
+def parse_board(value):
+    """Parse a board description like 'RASPBERRY_PI,2,2' or 'BEAGLEBONE_BLACK'
+    into a Board tuple."""
+    names = { 'UNKNOWN':          UNKNOWN,
+              'RASPBERRY_PI':     RASPBERRY_PI,
+              'BEAGLEBONE_BLACK': BEAGLEBONE_BLACK,
+              'MINNOWBOARD':      MINNOWBOARD }
+    fields = [field.strip() for field in value.split(',')]
+    if fields[0].upper() not in names or len(fields) > 3:
+        raise ValueError('Unexpected board description {0}.'.format(value))
+    numbers = [int(field) for field in fields[1:]]
+    numbers += [None]*(2 - len(numbers))
+    return Board(names[fields[0].upper()], numbers[0], numbers[1])
+
+
 def platform_detect():
     """Detect if running on the Raspberry Pi or Beaglebone Black and return the
     platform type.  Will return RASPBERRY_PI, BEAGLEBONE_BLACK, or UNKNOWN."""
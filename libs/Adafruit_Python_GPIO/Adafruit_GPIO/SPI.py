@@ -19,7 +19,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import operator
+import ctypes
+import os
 import time
 
 import Adafruit_GPIO as GPIO
@@ -28,21 +29,83 @@ import Adafruit_GPIO as GPIO
 MSBFIRST = 0
 LSBFIRST = 1
 
+# Linux spidev ioctl for a message of one transfer, SPI_IOC_MESSAGE(1) from
+# linux/spi/spidev.h, and the spidev driver's default maximum message size,
+# which can be changed with its bufsiz module parameter.
+SPI_IOC_MESSAGE_1 = 0x40206B00
+SPIDEV_BUFSIZ = 4096
+# Most transfers in one message, limited by the ioctl's 14 bit size field.
+_SPI_IOC_MAX_TRANSFERS = 511
+_SPIDEV_BUFSIZ_PARAMETER = '/sys/module/spidev/parameters/bufsiz'
+
+class _spi_ioc_transfer(ctypes.Structure):
+    _fields_ = [('tx_buf',           ctypes.c_uint64),
+                ('rx_buf',           ctypes.c_uint64),
+                ('len',              ctypes.c_uint32),
+                ('speed_hz',         ctypes.c_uint32),
+                ('delay_usecs',      ctypes.c_uint16),
+                ('bits_per_word',    ctypes.c_uint8),
+                ('cs_change',        ctypes.c_uint8),
+                ('tx_nbits',         ctypes.c_uint8),
+                ('rx_nbits',         ctypes.c_uint8),
+                ('word_delay_usecs', ctypes.c_uint8),
+                ('pad',              ctypes.c_uint8)]
+
+def _spi_ioc_message(count):
+    # Return the spidev ioctl for a message of count transfers.
+    return SPI_IOC_MESSAGE_1 & ~(0x3FFF << 16) | ((count * 32) << 16)
+
+def _spidev_bufsiz():
+    # Return the spidev driver's maximum message size.
+    try:
+        with open(_SPIDEV_BUFSIZ_PARAMETER) as f:
+            return int(f.read())
+    except (IOError, OSError, ValueError):
+        return SPIDEV_BUFSIZ
+
+def _shared(buf):
+    # Return a ctypes array sharing the memory of a writable buffer like a
+    # bytearray, or None if it can't share it (like a memoryview on Python 2).
+    try:
+        return (ctypes.c_char * len(buf)).from_buffer(buf)
+    except TypeError:
+        return None
+
+def _readable(data):
+    # Return a ctypes array with the bytes of data, sharing its memory when
+    # possible and otherwise copying it (like for bytes or a list).
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytearray(data)
+    array = _shared(data)
+    if array is None:
+        array = (ctypes.c_char * len(data)).from_buffer_copy(bytearray(data))
+    return array
+
 
 class SpiDev(object):
-    """Hardware-based SPI implementation using the spidev interface."""
+    """Hardware-based SPI implementation using the spidev interface.  Data is
+    transferred with the spidev ioctl directly from and into the caller's
+    buffers, and transfers longer than the spidev driver's maximum message
+    size (4096 bytes by default) are split into chunks.
+    """
 
-    def __init__(self, port, device, max_speed_hz=500000):
+    def __init__(self, port, device, max_speed_hz=500000, bufsiz=None):
         """Initialize an SPI device using the SPIdev interface.  Port and device
         identify the device, for example the device /dev/spidev1.0 would be port
-        1 and device 0.
+        1 and device 0.  Bufsiz is the largest transfer to make at once, by
+        default the spidev driver's bufsiz parameter.
         """
+        import fcntl
         import spidev
+        self._fcntl = fcntl
         self._device = spidev.SpiDev()
         self._device.open(port, device)
         self._device.max_speed_hz=max_speed_hz
         # Default to mode 0.
         self._device.mode = 0
+        # Open the device for transfers with the spidev ioctl.
+        self._fd = os.open('/dev/spidev{0}.{1}'.format(port, device), os.O_RDWR)
+        self._bufsiz = bufsiz if bufsiz is not None else _spidev_bufsiz()
 
     def set_clock_hz(self, hz):
         """Set the speed of the SPI clock in hertz.  Note that not all speeds
@@ -73,26 +136,119 @@ class SpiDev(object):
 
     def close(self):
         """Close communication with the SPI device."""
+        os.close(self._fd)
         self._device.close()
 
-    def write(self, data):
-        """Half-duplex SPI write.  The specified array of bytes will be clocked
-        out the MOSI line.
+    def _exchange(self, data, buf, length, hold_cs):
+        # Clock length bytes out from data and in to buf (either can be None
+        # to only read or write) in chunks of at most bufsiz bytes.  Setting
+        # cs_change on the last transfer of a message asks the kernel to keep
+        # chip select asserted until the next message.
+        if length == 0:
+            return
+        tx = _readable(data) if data is not None else None
+        rx = None
+        if buf is not None:
+            rx = _shared(buf)
+            if rx is None:
+                # Read into a bytearray and copy it when buf's memory can't be
+                # shared.
+                temp = bytearray(length)
+                self._exchange(data, temp, length, hold_cs)
+                buf[:length] = temp
+                return
+        tx_address = ctypes.addressof(tx) if tx is not None else 0
+        rx_address = ctypes.addressof(rx) if rx is not None else 0
+        transfer = _spi_ioc_transfer()
+        for start in range(0, length, self._bufsiz):
+            chunk = min(self._bufsiz, length - start)
+            transfer.tx_buf = tx_address + start if tx_address else 0
+            transfer.rx_buf = rx_address + start if rx_address else 0
+            transfer.len = chunk
+            transfer.cs_change = 1 if hold_cs and start + chunk < length else 0
+            self._fcntl.ioctl(self._fd, SPI_IOC_MESSAGE_1, transfer)
+
+    def write(self, data, hold_cs=True):
+        """Half-duplex SPI write.  The specified bytes (a bytes, bytearray or
+        memoryview object, or a list of byte values) will be clocked out the
+        MOSI line.  Chip select stays asserted between chunks of a long write
+        unless hold_cs is False.
         """
-        self._device.writebytes(data)
+        self._exchange(data, None, len(data), hold_cs)
 
-    def read(self, length):
+    def read(self, length, hold_cs=True):
         """Half-duplex SPI read.  The specified length of bytes will be clocked
         in the MISO line and returned as a bytearray object.
         """
-        return bytearray(self._device.readbytes(length))
+        return self.readinto(bytearray(length), hold_cs)
 
-    def transfer(self, data):
-        """Full-duplex SPI read and write.  The specified array of bytes will be
+    def readinto(self, buf, hold_cs=True):
+        """Half-duplex SPI read into the specified writable buffer (like a
+        bytearray or memoryview).  As many bytes as the buffer holds will be
+        clocked in the MISO line and stored directly in the buffer, which is
+        returned.  Reuse the same buffer for continuous reads to avoid
+        allocating one for each read.
+        """
+        self._exchange(None, buf, len(buf), hold_cs)
+        return buf
+
+    def transfer(self, data, buf=None, hold_cs=True):
+        """Full-duplex SPI read and write.  The specified bytes (a bytes,
+        bytearray or memoryview object, or a list of byte values) will be
         clocked out the MOSI line, while simultaneously bytes will be read from
-        the MISO line.  Read bytes will be returned as a bytearray object.
+        the MISO line.  Read bytes will be returned as a bytearray object, or
+        stored in the specified writable buffer (which must be at least as long
+        as data) and the buffer returned.
+        """
+        length = len(data)
+        if buf is None:
+            buf = bytearray(length)
+        elif len(buf) < length:
+            raise ValueError('Buffer must be at least as long as the data.')
+        self._exchange(data, buf, length, hold_cs)
+        return buf
+
+    def transfer_blocks(self, data, size, buf=None):
+        """Full-duplex SPI read and write of data split into blocks of the
+        specified size, with chip select released between blocks, like for a
+        series of conversions from an ADC.  As many blocks as fit in the
+        spidev driver's maximum message size are sent in each ioctl instead of
+        one ioctl for each block.  Read bytes are returned or stored in buf like
+        transfer.  Blocks can't be longer than the spidev driver's buffer size
+        (bufsiz) since each one is a single transfer.
         """
-        return bytearray(self._device.xfer2(data))
+        length = len(data)
+        if size <= 0 or length % size != 0:
+            raise ValueError('Data length must be a multiple of the block size.')
+        if size > self._bufsiz:
+            raise ValueError('Block size {0} is larger than the spidev bufsiz of {1} bytes.'.format(size, self._bufsiz))
+        if buf is None:
+            buf = bytearray(length)
+        elif len(buf) < length:
+            raise ValueError('Buffer must be at least as long as the data.')
+        if length == 0:
+            return buf
+        rx = _shared(buf)
+        if rx is None:
+            buf[:length] = self.transfer_blocks(data, size)
+            return buf
+        tx = _readable(data)
+        tx_address = ctypes.addressof(tx)
+        rx_address = ctypes.addressof(rx)
+        per_message = max(1, min(_SPI_IOC_MAX_TRANSFERS, self._bufsiz // size))
+        transfers = (_spi_ioc_transfer * per_message)()
+        for start in range(0, length, per_message * size):
+            count = min(per_message, (length - start) // size)
+            for i in range(count):
+                transfer = transfers[i]
+                transfer.tx_buf = tx_address + start + i * size
+                transfer.rx_buf = rx_address + start + i * size
+                transfer.len = size
+                # cs_change on any but the last transfer releases chip select
+                # before the next one.
+                transfer.cs_change = 1 if i < count - 1 else 0
+            self._fcntl.ioctl(self._fd, _spi_ioc_message(count), transfers)
+        return buf
 
 class SpiDevMraa(object):
     """Hardware SPI implementation with the mraa library on Minnowboard"""
@@ -147,6 +303,15 @@ class SpiDevMraa(object):
         """
         self._device.write(bytearray(data))
 
+def _overrides(gpio, name):
+    # Return True if the GPIO object's class provides its own implementation
+    # of the named BaseGPIO method.
+    method = getattr(type(gpio), name, None)
+    if method is None:
+        return False
+    base = getattr(GPIO.BaseGPIO, name)
+    return getattr(method, '__func__', method) is not getattr(base, '__func__', base)
+
 class BitBang(object):
     """Software-based implementation of the SPI protocol over GPIO pins."""
 
@@ -157,12 +322,17 @@ class BitBang(object):
         with an error, likewise for MISO reads will be disabled.  If SS is set to
         None then SS will not be asserted high/low by the library when
         transfering data.
+
+        If the GPIO class provides its own output_pins (like the FT232H,
+        MCP230xx and PCF8574 classes) the clock and MOSI are changed together
+        where possible, so each bit takes two pin writes instead of three.
         """
         self._gpio = gpio
         self._sclk = sclk
         self._mosi = mosi
         self._miso = miso
         self._ss = ss
+        self._bulk = mosi is not None and _overrides(gpio, 'output_pins')
         # Set pins as outputs/inputs.
         gpio.setup(sclk, GPIO.OUT)
         if mosi is not None:
@@ -203,6 +373,7 @@ class BitBang(object):
         else:
             # Read on leading edge in mode 0 and 2.
             self._read_leading = True
+        self._schedules = {}
         # Put clock into its base state.
         self._gpio.output(self._sclk, self._clock_base)
 
@@ -211,24 +382,72 @@ class BitBang(object):
         either MSBFIRST for most-significant first, or LSBFIRST for
         least-signifcant first.
         """
-        # Set self._mask to the bitmask which points at the appropriate bit to
-        # read or write, and appropriate left/right shift operator function for
-        # reading/writing.
+        # Set self._masks to the bitmask of each bit in the order they're
+        # read or written.
         if order == MSBFIRST:
-            self._mask = 0x80
-            self._write_shift = operator.lshift
-            self._read_shift = operator.rshift
+            self._masks = (0x80, 0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01)
         elif order == LSBFIRST:
-            self._mask = 0x01
-            self._write_shift = operator.rshift
-            self._read_shift = operator.lshift
+            self._masks = (0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80)
         else:
             raise ValueError('Order must be MSBFIRST or LSBFIRST.')
+        self._schedules = {}
 
     def close(self):
         """Close the SPI connection.  Unused in the bit bang implementation."""
         pass
 
+    def _bit_steps(self, bit):
+        # Return a tuple of the pin writes to clock one bit, as a tuple of the
+        # writes before MISO is sampled and a tuple of the writes after.  Each
+        # write is a tuple of pin and value for the GPIO output function, or a
+        # dict for output_pins in bulk mode.  Bit is the MOSI value, or None to
+        # leave MOSI alone (which never uses bulk mode).
+        sclk = self._sclk
+        base = self._clock_base
+        active = not base
+        if not self._bulk or bit is None:
+            # Set MOSI, flip the clock off base, then return it to base.
+            before = ((self._mosi, bit),) if bit is not None else ()
+            if self._read_leading:
+                return (before + ((sclk, active),), ((sclk, base),))
+            return (before + ((sclk, active), (sclk, base)), ())
+        if self._read_leading:
+            # Change MOSI along with returning the clock to base (the trailing
+            # edge, where the slave doesn't sample) and then flip the clock.
+            # The clock is returned to base after the last bit by _finish.
+            return (({sclk: base, self._mosi: bit}, {sclk: active}), ())
+        # Change MOSI along with the leading edge, the slave samples it on the
+        # trailing edge.
+        return (({sclk: active, self._mosi: bit}, {sclk: base}), ())
+
+    def _schedule(self, kind):
+        # Return a precomputed schedule of pin writes, built on first use after
+        # a mode or bit order change.  The write schedule is a list with the
+        # flattened writes for each byte value.  The transfer schedule is a
+        # list with a tuple of (mask, before, after) for each bit of each byte
+        # value and the read schedule is that tuple for one byte of reading.
+        schedule = self._schedules.get(kind)
+        if schedule is None:
+            if kind == 'read':
+                schedule = tuple((mask,) + self._bit_steps(None) for mask in self._masks)
+            else:
+                schedule = []
+                for byte in range(256):
+                    bits = [(mask,) + self._bit_steps(1 if byte & mask else 0)
+                            for mask in self._masks]
+                    if kind == 'write':
+                        bits = [step for mask, before, after in bits
+                                for step in before + after]
+                    schedule.append(tuple(bits))
+            self._schedules[kind] = schedule
+        return schedule
+
+    def _finish(self):
+        # Return the clock to base after the last bit when bulk writes leave
+        # it active.
+        if self._bulk and self._read_leading:
+            self._gpio.output_pins({self._sclk: self._clock_base})
+
     def write(self, data, assert_ss=True, deassert_ss=True):
         """Half-duplex SPI write.  If assert_ss is True, the SS line will be
         asserted low, the specified bytes will be clocked out the MOSI line, and
@@ -237,21 +456,25 @@ class BitBang(object):
         # Fail MOSI is not specified.
         if self._mosi is None:
             raise RuntimeError('Write attempted with no MOSI pin specified.')
-        if assert_ss and self._ss is not None:
-            self._gpio.set_low(self._ss)
-        for byte in data:
-            for i in range(8):
-                # Write bit to MOSI.
-                if self._write_shift(byte, i) & self._mask:
-                    self._gpio.set_high(self._mosi)
-                else:
-                    self._gpio.set_low(self._mosi)
-                # Flip clock off base.
-                self._gpio.output(self._sclk, not self._clock_base)
-                # Return clock to base.
-                self._gpio.output(self._sclk, self._clock_base)
-        if deassert_ss and self._ss is not None:
-            self._gpio.set_high(self._ss)
+        schedule = self._schedule('write')
+        data = bytearray(data)
+        with self._gpio.batch():
+            if assert_ss and self._ss is not None:
+                self._gpio.set_low(self._ss)
+            if self._bulk:
+                output_pins = self._gpio.output_pins
+                for byte in data:
+                    for pins in schedule[byte]:
+                        output_pins(pins)
+            else:
+                output = self._gpio.output
+                for byte in data:
+                    for pin, value in schedule[byte]:
+                        output(pin, value)
+            if data:
+                self._finish()
+            if deassert_ss and self._ss is not None:
+                self._gpio.set_high(self._ss)
 
     def read(self, length, assert_ss=True, deassert_ss=True):
         """Half-duplex SPI read.  If assert_ss is true, the SS line will be
@@ -261,33 +484,31 @@ class BitBang(object):
         """
         if self._miso is None:
             raise RuntimeError('Read attempted with no MISO pin specified.')
-        if assert_ss and self._ss is not None:
-            self._gpio.set_low(self._ss)
+        schedule = self._schedule('read')
+        output = self._gpio.output
+        # MISO is sampled with one input call per bit, since each sample has
+        # to be taken between that bit's clock edges.  Reading it with
+        # input_pins wouldn't save anything as only the one pin is read, but
+        # batching lets the clock changes before each sample go out with the
+        # read (one USB write per bit on the FT232H instead of three).
+        input_pin = self._gpio.input
+        miso = self._miso
         result = bytearray(length)
-        for i in range(length):
-            for j in range(8):
-                # Flip clock off base.
-                self._gpio.output(self._sclk, not self._clock_base)
-                # Handle read on leading edge of clock.
-                if self._read_leading:
-                    if self._gpio.is_high(self._miso):
-                        # Set bit to 1 at appropriate location.
-                        result[i] |= self._read_shift(self._mask, j)
-                    else:
-                        # Set bit to 0 at appropriate location.
-                        result[i] &= ~self._read_shift(self._mask, j)
-                # Return clock to base.
-                self._gpio.output(self._sclk, self._clock_base)
-                # Handle read on trailing edge of clock.
-                if not self._read_leading:
-                    if self._gpio.is_high(self._miso):
-                        # Set bit to 1 at appropriate location.
-                        result[i] |= self._read_shift(self._mask, j)
-                    else:
-                        # Set bit to 0 at appropriate location.
-                        result[i] &= ~self._read_shift(self._mask, j)
-        if deassert_ss and self._ss is not None:
-            self._gpio.set_high(self._ss)
+        with self._gpio.batch():
+            if assert_ss and self._ss is not None:
+                self._gpio.set_low(self._ss)
+            for i in range(length):
+                value = 0
+                for mask, before, after in schedule:
+                    for pin, level in before:
+                        output(pin, level)
+                    if input_pin(miso):
+                        value |= mask
+                    for pin, level in after:
+                        output(pin, level)
+                result[i] = value
+            if deassert_ss and self._ss is not None:
+                self._gpio.set_high(self._ss)
         return result
 
     def transfer(self, data, assert_ss=True, deassert_ss=True):
@@ -299,38 +520,42 @@ class BitBang(object):
         """
         if self._mosi is None:
             raise RuntimeError('Write attempted with no MOSI pin specified.')
-        if self._mosi is None:
+        if self._miso is None:
             raise RuntimeError('Read attempted with no MISO pin specified.')
-        if assert_ss and self._ss is not None:
-            self._gpio.set_low(self._ss)
+        schedule = self._schedule('transfer')
+        # MISO is sampled one bit at a time like in read.
+        input_pin = self._gpio.input
+        miso = self._miso
+        data = bytearray(data)
         result = bytearray(len(data))
-        for i in range(len(data)):
-            for j in range(8):
-                # Write bit to MOSI.
-                if self._write_shift(data[i], j) & self._mask:
-                    self._gpio.set_high(self._mosi)
-                else:
-                    self._gpio.set_low(self._mosi)
-                # Flip clock off base.
-                self._gpio.output(self._sclk, not self._clock_base)
-                # Handle read on leading edge of clock.
-                if self._read_leading:
-                    if self._gpio.is_high(self._miso):
-                        # Set bit to 1 at appropriate location.
-                        result[i] |= self._read_shift(self._mask, j)
-                    else:
-                        # Set bit to 0 at appropriate location.
-                        result[i] &= ~self._read_shift(self._mask, j)
-                # Return clock to base.
-                self._gpio.output(self._sclk, self._clock_base)
-                # Handle read on trailing edge of clock.
-                if not self._read_leading:
-                    if self._gpio.is_high(self._miso):
-                        # Set bit to 1 at appropriate location.
-                        result[i] |= self._read_shift(self._mask, j)
-                    else:
-                        # Set bit to 0 at appropriate location.
-                        result[i] &= ~self._read_shift(self._mask, j)
-        if deassert_ss and self._ss is not None:
-            self._gpio.set_high(self._ss)
+        with self._gpio.batch():
+            if assert_ss and self._ss is not None:
+                self._gpio.set_low(self._ss)
+            if self._bulk:
+                # Bulk mode writes never come after the sample.
+                output_pins = self._gpio.output_pins
+                for i, byte in enumerate(data):
+                    value = 0
+                    for mask, before, after in schedule[byte]:
+                        for pins in before:
+                            output_pins(pins)
+                        if input_pin(miso):
+                            value |= mask
+                    result[i] = value
+                if data:
+                    self._finish()
+            else:
+                output = self._gpio.output
+                for i, byte in enumerate(data):
+                    value = 0
+                    for mask, before, after in schedule[byte]:
+                        for pin, level in before:
+                            output(pin, level)
+                        if input_pin(miso):
+                            value |= mask
+                        for pin, level in after:
+                            output(pin, level)
+                    result[i] = value
+            if deassert_ss and self._ss is not None:
+                self._gpio.set_high(self._ss)
         return result
@@ -0,0 +1,658 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+# Simulated libftdi for running the FT232H code without the ftdi1 binding or
+# an FT232H.  This module has the same functions as the parts of the ftdi1
+# binding used by Adafruit_GPIO.FT232H, and each simulated chip runs the MPSSE
+# commands written to it: GPIO reads and writes, clocking data in and out (to
+# attached simulated SPI and I2C devices), the bad command response used to
+# synchronize, and send immediate.  Install it before importing
+# Adafruit_GPIO.FT232H, for example:
+#
+#   import Adafruit_GPIO.SimulatedFTDI as SimulatedFTDI
+#   import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+#   chip = SimulatedFTDI.add_device()
+#   chip.attach_i2c(0x77, SimulatedI2C.BMP085Model())
+#   SimulatedFTDI.install()
+#   import Adafruit_GPIO.FT232H as FT232H
+#   ft232h = FT232H.FT232H()
+#
+# Each chip counts the USB writes, reads, bytes and round trips made to it so
+# changes to how commands are buffered can be measured.
+import collections
+import sys
+
+import Adafruit_GPIO.Clock as Clock
+
+
+FT232H_VID = 0x0403
+FT232H_PID = 0x6014
+
+# libftdi error codes returned by the simulated functions.
+_ERROR_NOT_FOUND   = -3
+_ERROR_UNAVAILABLE = -666
+
+# Number of argument bytes for the MPSSE commands which only change settings
+# and don't clock data or return anything.
+_SETTINGS_COMMANDS = {
+    0x84: 0,    # Connect TDI/DO to TDO/DI for loopback.
+    0x85: 0,    # Disconnect loopback.
+    0x86: 2,    # Set clock divisor.
+    0x8A: 0,    # Disable clock divide by 5.
+    0x8B: 0,    # Enable clock divide by 5.
+    0x8C: 0,    # Enable three phase clocking.
+    0x8D: 0,    # Disable three phase clocking.
+    0x96: 0,    # Enable adaptive clocking.
+    0x97: 0,    # Disable adaptive clocking.
+    0x9E: 2,    # Set drive-zero (open drain) mode pins.
+}
+
+# Clock for the latency timer.
+_clock = Clock.monotonic
+
+
+class SPIDevice(object):
+    """Simulated SPI device to attach to a Chip.  Every byte clocked while the
+    device is selected is added to the received bytearray, and the device
+    responds with the bytes of the response data in turn (then 0xFF when they
+    run out).  Subclasses can override exchange to respond differently.
+    """
+
+    def __init__(self, response=b''):
+        self.received = bytearray()
+        self.response = collections.deque(bytearray(response))
+        self.selected = False
+
+    def select(self):
+        """Called when chip select is asserted."""
+        self.selected = True
+
+    def deselect(self):
+        """Called when chip select is deasserted."""
+        self.selected = False
+
+    def exchange(self, byte):
+        """Receive one byte and return the byte sent back at the same time."""
+        self.received.append(byte)
+        if self.response:
+            return self.response.popleft()
+        return 0xFF
+
+
+class LoopbackSPIDevice(SPIDevice):
+    """Simulated SPI device which sends back each byte it receives."""
+
+    def exchange(self, byte):
+        self.received.append(byte)
+        return byte
+
+
+class _I2CBus(object):
+    # Bit level I2C bus driven by the chip's D0 (SCL) and D1 (SDA) pins, with
+    # D2 wired to SDA to read it, which dispatches transactions to register
+    # models from Adafruit_GPIO.SimulatedI2C.  Each transaction's write bytes
+    # are passed to the model with write_raw (for one byte) or write (for a
+    # register and data) at the next start or stop, and read bytes come from
+    # the model's read_raw.  When log is a list the start ('S') and stop ('P')
+    # conditions and the bytes the master writes are appended to it.
+    IDLE, RECEIVE, SLAVE_ACK, TRANSMIT, MASTER_ACK = range(5)
+
+    def __init__(self):
+        self.models = {}
+        self.transactions = 0
+        self.log = None
+        self.state = self.IDLE
+        self._model = None
+        self._addressed = False
+        self._writing = False
+        self._written = None
+
+    def start(self):
+        self._finish()
+        if self.log is not None:
+            self.log.append('S')
+        self.state = self.RECEIVE
+        self._addressed = False
+        self._byte = 0
+        self._bits = 0
+
+    def stop(self):
+        self._finish()
+        if self.log is not None:
+            self.log.append('P')
+        self.state = self.IDLE
+
+    def _finish(self):
+        # Pass the bytes written in the finished transaction to its model.
+        if self._written:
+            if len(self._written) == 1:
+                self._model.write_raw(self._written[0])
+            else:
+                self._model.write(self._written[0], list(self._written[1:]))
+        self._written = None
+
+    def clock(self, master_bit):
+        # Clock one bit with the master driving SDA to master_bit (1 releases
+        # it) and return the level of SDA, which the slave can pull low.
+        state = self.state
+        if state == self.SLAVE_ACK:
+            bit = master_bit & (0 if self._ack else 1)
+            if not self._ack:
+                self.state = self.IDLE
+            elif not self._writing:
+                self._load()
+            else:
+                self.state = self.RECEIVE
+            return bit
+        if state == self.TRANSMIT:
+            bit = master_bit & ((self._byte >> (7 - self._bits)) & 1)
+            self._bits += 1
+            if self._bits == 8:
+                self.state = self.MASTER_ACK
+            return bit
+        if state == self.MASTER_ACK:
+            if master_bit:
+                # NAK, the master is done reading.
+                self.state = self.IDLE
+            else:
+                self._load()
+            return master_bit
+        if state == self.RECEIVE:
+            self._byte = ((self._byte << 1) | master_bit) & 0xFF
+            self._bits += 1
+            if self._bits == 8:
+                self._received(self._byte)
+                self._byte = 0
+                self._bits = 0
+            return master_bit
+        return master_bit
+
+    def _received(self, byte):
+        if self.log is not None:
+            self.log.append(byte)
+        self.state = self.SLAVE_ACK
+        if self._addressed:
+            self._written.append(byte)
+            self._ack = True
+            return
+        # First byte is the address and R/W bit.
+        self._addressed = True
+        self._model = self.models.get(byte >> 1)
+        self._ack = self._model is not None
+        self._writing = (byte & 0x01) == 0
+        if self._ack:
+            self.transactions += 1
+            if self._writing:
+                self._written = bytearray()
+
+    def _load(self):
+        # Start transmitting the next byte read from the model.
+        self._byte = self._model.read_raw() & 0xFF
+        self._bits = 0
+        self.state = self.TRANSMIT
+
+
+class Chip(object):
+    """Simulated FT232H which runs the MPSSE commands written to it.  Attach
+    simulated devices with attach_spi and attach_i2c, and set the level of
+    pins driven from outside with the inputs attribute (a 16 bit value, D0-D7
+    in the lower 8 bits and C0-C7 in the upper 8 bits).
+
+    The chip counts the USB writes and reads made to it (in the writes and
+    reads attributes), the bytes in each direction (bytes_written and
+    bytes_read), the round trips (reads which returned data after a write),
+    and the bits clocked and the time that would take at the configured clock
+    speed (clocked_bits and clock_time, in seconds).
+
+    Responses are sent to the host on a send immediate (0x87) command, or once
+    the latency timer has expired like the real chip.
+    """
+
+    def __init__(self, serial='FTSIM0', manufacturer='FTDI', description='FT232H'):
+        self.serial = serial
+        self.manufacturer = manufacturer
+        self.description = description
+        self.vid = FT232H_VID
+        self.pid = FT232H_PID
+        self.inputs = 0x0000
+        self.is_open = False
+        self._spi = []
+        self._i2c = _I2CBus()
+        self.latency_timer = 16
+        self.reset()
+
+    def reset(self):
+        """Reset the chip to its power on state (keeping attached devices)."""
+        self.mpsse = False
+        self.level = 0x0000
+        self.direction = 0x0000
+        self.divisor = 0
+        self.divide_by_5 = True
+        self.three_phase = False
+        self.adaptive = False
+        self.drive_zero = 0x0000
+        self._sda = 1
+        self.purge()
+        self.reset_counts()
+
+    def purge(self):
+        """Clear unprocessed commands and unread responses."""
+        self._commands = bytearray()
+        self._pending = bytearray()
+        self._pending_since = None
+        self._response = bytearray()
+
+    def reset_counts(self):
+        """Reset the USB transfer counts to zero."""
+        self.writes = 0
+        self.reads = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.round_trips = 0
+        self.clocked_bits = 0
+        self.clock_time = 0.0
+        self._wrote = False
+
+    def attach_spi(self, device, cs=None):
+        """Attach a simulated SPI device (like SPIDevice) to the chip's D0
+        (SCK), D1 (MOSI) and D2 (MISO) pins, selected when the specified chip
+        select pin is an output driven low, or always selected when cs is None.
+        Returns the device.
+        """
+        self._spi.append((device, cs))
+        if cs is None:
+            device.select()
+        return device
+
+    def attach_i2c(self, address, model):
+        """Attach a register model from Adafruit_GPIO.SimulatedI2C (like
+        RegisterModel or BMP085Model) to the I2C bus on the chip's D0 (SCL) and
+        D1/D2 (SDA) pins at the specified address.  Returns the model.
+        """
+        self._i2c.models[address] = model
+        return model
+
+    @property
+    def i2c_transactions(self):
+        """Number of I2C transactions addressed to a device on the bus."""
+        return self._i2c.transactions
+
+    def log_i2c(self):
+        """Start logging the I2C bus and return the log, a list which gets the
+        start ('S') and stop ('P') conditions and each byte written by the
+        master (addresses with the R/W bit, registers and data) in order.
+        """
+        self._i2c.log = []
+        return self._i2c.log
+
+    @property
+    def clock_hz(self):
+        """Data clock speed in hertz for the current clock settings."""
+        base = 12000000.0 if self.divide_by_5 else 60000000.0
+        return base / ((1 + self.divisor) * 2)
+
+    def pins(self):
+        """Return the 16 bit level of the pins, outputs at their driven level
+        and inputs at the level set in the inputs attribute."""
+        return (self.level & self.direction) | (self.inputs & ~self.direction & 0xFFFF)
+
+    def write(self, data):
+        """Receive a USB write of MPSSE commands and run them."""
+        self.writes += 1
+        self.bytes_written += len(data)
+        self._wrote = True
+        if not self.mpsse:
+            return
+        self._commands += bytearray(data)
+        index = self._run(self._commands)
+        # Keep a partial command at the end until the rest of it is written.
+        del self._commands[:index]
+
+    def read(self, size):
+        """Return up to size bytes of the responses sent to the host."""
+        if self._pending and _clock() - self._pending_since >= self.latency_timer / 1000.0:
+            self._send()
+        data = self._response[:size]
+        del self._response[:size]
+        self.reads += 1
+        self.bytes_read += len(data)
+        if data and self._wrote:
+            self.round_trips += 1
+            self._wrote = False
+        return bytes(data)
+
+    def _respond(self, data):
+        # Queue response bytes until they're sent to the host.
+        if not self._pending:
+            self._pending_since = _clock()
+        self._pending += data
+
+    def _send(self):
+        self._response += self._pending
+        self._pending = bytearray()
+        self._pending_since = None
+
+    def _run(self, commands):
+        # Run the complete commands in the buffer and return the index after
+        # the last one.
+        index = 0
+        length = len(commands)
+        while index < length:
+            command = commands[index]
+            if command & 0xC0 == 0 and command & 0x30:
+                needed = self._clock_data_length(commands, index)
+                if needed is None or index + needed > length:
+                    break
+                self._clock_data(command, commands, index)
+                index += needed
+            elif command in (0x80, 0x82):
+                if index + 3 > length:
+                    break
+                self._set_gpio(command == 0x82, commands[index+1], commands[index+2])
+                index += 3
+            elif command in (0x81, 0x83):
+                shift = 8 if command == 0x83 else 0
+                self._respond(bytearray(((self.pins() >> shift) & 0xFF,)))
+                index += 1
+            elif command == 0x87:
+                self._send()
+                index += 1
+            elif command in _SETTINGS_COMMANDS:
+                needed = 1 + _SETTINGS_COMMANDS[command]
+                if index + needed > length:
+                    break
+                self._setting(command, commands[index+1:index+needed])
+                index += needed
+            else:
+                # Bad command, respond with 0xFA and the command.
+                self._respond(bytearray((0xFA, command)))
+                index += 1
+        return index
+
+    def _setting(self, command, args):
+        if command == 0x86:
+            self.divisor = args[0] | (args[1] << 8)
+        elif command in (0x8A, 0x8B):
+            self.divide_by_5 = command == 0x8B
+        elif command in (0x8C, 0x8D):
+            self.three_phase = command == 0x8C
+        elif command in (0x96, 0x97):
+            self.adaptive = command == 0x96
+        elif command == 0x9E:
+            self.drive_zero = args[0] | (args[1] << 8)
+
+    def _set_gpio(self, high, value, direction):
+        old = self.pins()
+        shift = 8 if high else 0
+        mask = 0xFF << shift
+        self.level = (self.level & ~mask) | (value << shift)
+        self.direction = (self.direction & ~mask) | (direction << shift)
+        self._pins_changed(old, self.pins())
+
+    def _line(self, pins, pin):
+        # Return the level of a pin as seen on the bus, an input or a
+        # drive-zero output set high is released and pulled up.
+        bit = 1 << pin
+        if not self.direction & bit:
+            return 1
+        return 1 if pins & bit else 0
+
+    def _pins_changed(self, old, new):
+        # Update chip selects and look for I2C start and stop conditions.
+        for device, cs in self._spi:
+            if cs is None:
+                continue
+            selected = self._line(new, cs) == 0
+            if selected and not device.selected:
+                device.select()
+            elif not selected and device.selected:
+                device.deselect()
+        scl = self._line(new, 0)
+        sda = self._line(new, 1)
+        if self._i2c.models and scl and self._line(old, 0):
+            if self._sda and not sda:
+                self._i2c.start()
+            elif not self._sda and sda:
+                self._i2c.stop()
+        self._sda = sda
+
+    def _clock_data_length(self, commands, index):
+        # Return the total length of a data clocking command, or None if its
+        # length bytes haven't been written yet.
+        command = commands[index]
+        write = command & 0x10
+        if command & 0x02:
+            # Bit mode, one length byte and one data byte when writing.
+            return 3 if write else 2
+        if index + 3 > len(commands):
+            return None
+        count = commands[index+1] | (commands[index+2] << 8)
+        return 3 + (count + 1 if write else 0)
+
+    def _clock_data(self, command, commands, index):
+        write = command & 0x10
+        read = command & 0x20
+        lsb_first = command & 0x08
+        if command & 0x02:
+            bits = commands[index+1] + 1
+            out = commands[index+2] if write else None
+            result = self._clock_bits(out, bits, lsb_first)
+            self._account(bits)
+            if read:
+                self._respond(bytearray((result,)))
+            return
+        count = (commands[index+1] | (commands[index+2] << 8)) + 1
+        if write:
+            out = commands[index+3:index+3+count]
+        else:
+            # Not writing, DO stays at its current level.
+            out = bytearray((0xFF if self._sda else 0x00,)) * count
+        self._account(count * 8)
+        spi = [device for device, cs in self._spi if device.selected]
+        if spi:
+            result = bytearray(count)
+            for i, byte in enumerate(out):
+                response = 0xFF
+                for device in spi:
+                    response &= device.exchange(byte)
+                result[i] = response
+        elif self._i2c.state != self._i2c.IDLE:
+            result = bytearray(self._clock_bits(byte, 8, lsb_first) for byte in out)
+        else:
+            # Nothing is listening, read the level of DI.
+            result = bytearray((0xFF if self._line(self.pins(), 2) else 0x00,)) * count
+        if write:
+            self._sda = out[-1] >> 7 if not lsb_first else out[-1] & 0x01
+        if read:
+            self._respond(result)
+
+    def _clock_bits(self, out, bits, lsb_first):
+        # Clock bits out of (and into) the I2C bus one at a time and return
+        # the bits read, shifted in from the opposite end to the one they're
+        # sent from like the real chip.
+        result = 0
+        for i in range(bits):
+            if out is None:
+                bit = self._sda
+            elif lsb_first:
+                bit = (out >> i) & 1
+            else:
+                bit = (out >> (7 - i)) & 1
+            if out is not None:
+                self._sda = bit
+            level = self._i2c.clock(bit)
+            if lsb_first:
+                result = (result >> 1) | (level << 7)
+            else:
+                result = ((result << 1) | level) & 0xFF
+        return result
+
+    def _account(self, bits):
+        self.clocked_bits += bits
+        seconds = bits / self.clock_hz
+        if self.three_phase:
+            seconds *= 1.5
+        self.clock_time += seconds
+
+
+# Simulated chips which can be opened, see add_device.
+devices = []
+
+def add_device(serial=None, **kwargs):
+    """Create a simulated FT232H chip which can be opened by the FT232H class,
+    and return it.  A unique serial number is picked if none is specified.
+    """
+    if serial is None:
+        serial = 'FTSIM{0}'.format(len(devices))
+    chip = Chip(serial, **kwargs)
+    devices.append(chip)
+    return chip
+
+def remove_devices():
+    """Remove all the simulated chips."""
+    del devices[:]
+
+def install():
+    """Make this module stand in for the ftdi1 binding, including in
+    Adafruit_GPIO.FT232H if it was already imported."""
+    module = sys.modules[__name__]
+    sys.modules['ftdi1'] = module
+    ft232h = sys.modules.get('Adafruit_GPIO.FT232H')
+    if ft232h is not None:
+        ft232h.ftdi = module
+
+
+# Functions below match the ftdi1 binding.
+
+class _Context(object):
+    def __init__(self):
+        self.chip = None
+        self.error = 'all fine'
+
+
+class _DeviceList(object):
+    def __init__(self, dev, next):
+        self.dev = dev
+        self.next = next
+
+
+def _fail(ctx, ret, error):
+    ctx.error = error
+    return ret
+
+def _open(ctx, chip):
+    if chip is None:
+        return _fail(ctx, _ERROR_NOT_FOUND, 'device not found')
+    chip.is_open = True
+    chip.reset()
+    ctx.chip = chip
+    return 0
+
+def new():
+    return _Context()
+
+def free(ctx):
+    if ctx.chip is not None:
+        ctx.chip.is_open = False
+        ctx.chip = None
+
+def get_error_string(ctx):
+    return ctx.error
+
+def usb_find_all(ctx, vid, pid):
+    found = [chip for chip in devices if chip.vid == vid and chip.pid == pid]
+    device_list = None
+    for chip in reversed(found):
+        device_list = _DeviceList(chip, device_list)
+    return (len(found), device_list)
+
+def usb_get_strings(ctx, dev, manufacturer_len, description_len, serial_len):
+    return (0, dev.manufacturer, dev.description, dev.serial)
+
+def list_free(device_list):
+    pass
+
+def usb_open(ctx, vid, pid):
+    for chip in devices:
+        if chip.vid == vid and chip.pid == pid and not chip.is_open:
+            return _open(ctx, chip)
+    return _open(ctx, None)
+
+def usb_open_string(ctx, description):
+    # Only the s:vid:pid:serial form is supported.
+    fields = description.split(':')
+    if len(fields) != 4 or fields[0] != 's':
+        return _fail(ctx, -11, 'illegal description format')
+    for chip in devices:
+        if str(chip.vid) == fields[1] and str(chip.pid) == fields[2] and \
+           chip.serial == fields[3] and not chip.is_open:
+            return _open(ctx, chip)
+    return _open(ctx, None)
+
+def _with_chip(function):
+    # Wrap a function of the chip to return the unavailable error when the
+    # context isn't open.
+    def wrapper(ctx, *args):
+        if ctx.chip is None:
+            return _fail(ctx, _ERROR_UNAVAILABLE, 'USB device unavailable')
+        return function(ctx.chip, *args)
+    wrapper.__name__ = function.__name__
+    return wrapper
+
+@_with_chip
+def usb_reset(chip):
+    chip.purge()
+    return 0
+
+@_with_chip
+def usb_purge_buffers(chip):
+    chip.purge()
+    return 0
+
+@_with_chip
+def read_data_set_chunksize(chip, size):
+    return 0
+
+@_with_chip
+def write_data_set_chunksize(chip, size):
+    return 0
+
+@_with_chip
+def set_latency_timer(chip, latency):
+    chip.latency_timer = latency
+    return 0
+
+@_with_chip
+def set_bitmode(chip, mask, mode):
+    chip.mpsse = mode == 2
+    chip._commands = bytearray()
+    return 0
+
+@_with_chip
+def write_data(chip, data, size):
+    chip.write(data[:size])
+    return size
+
+def read_data(ctx, size):
+    if ctx.chip is None:
+        return (_fail(ctx, _ERROR_UNAVAILABLE, 'USB device unavailable'), b'')
+    data = ctx.chip.read(size)
+    return (len(data), data)
@@ -0,0 +1,441 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import collections
+import errno
+import struct
+import threading
+
+import Adafruit_GPIO.Clock as Clock
+
+
+# Clock for conversion timing.
+_clock = Clock.monotonic
+
+
+class Bus(object):
+    """Simulated I2C bus which can be passed as the i2c parameter of drivers
+    like BMP085, MCP230xx and PCF8574 in place of the Adafruit_GPIO.I2C module,
+    so they can run without smbus or hardware.  Attach a register model for
+    each device on the bus with attach.  Every transaction is counted, by
+    operation in the counts attribute and in total in the transactions
+    attribute, and the time it would take on a real bus at the specified clock
+    speed is added up in the bus_time attribute (in seconds).
+    """
+
+    def __init__(self, busnum=1, clock_hz=100000):
+        self.busnum = busnum
+        self.clock_hz = clock_hz
+        self.lock = threading.RLock()
+        self._models = {}
+        self.reset_counts()
+
+    def attach(self, address, model):
+        """Attach the specified register model to the bus at the specified
+        address and return the model."""
+        self._models[address] = model
+        return model
+
+    def reset_counts(self):
+        """Reset the transaction counts and bus time to zero."""
+        self.transactions = 0
+        self.counts = collections.defaultdict(int)
+        self.bus_time = 0.0
+
+    def get_default_bus(self):
+        """Return the bus number of this bus."""
+        return self.busnum
+
+    def get_i2c_device(self, address, busnum=None, **kwargs):
+        """Return a device for the specified address on this bus.  Like a real
+        bus the device can be created without anything at the address, but
+        its transactions will then fail with an IOError."""
+        return Device(self, address)
+
+    def _transaction(self, address, operation, length):
+        # Count a transaction which moves length bytes after the address byte
+        # and return the model at the address.
+        model = self._models.get(address)
+        if model is None:
+            raise IOError(errno.EREMOTEIO, 'No simulated device at address {0:#04x}'.format(address))
+        self.transactions += 1
+        self.counts[operation] += 1
+        # Each byte is 8 bits plus an ACK, with a start and stop condition.
+        self.bus_time += ((length + 1) * 9 + 2) / float(self.clock_hz)
+        return model
+
+
+class Device(object):
+    """Device on a simulated bus, with the same functions as the
+    Adafruit_GPIO.I2C Device class."""
+
+    def __init__(self, bus, address):
+        self._bus = bus
+        self._address = address
+        self.lock = bus.lock
+
+    def close(self):
+        """Stop using the device, does nothing on a simulated bus."""
+        pass
+
+    def writeRaw8(self, value):
+        """Write an 8-bit value on the bus (without register)."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'writeRaw8', 1)
+            model.write_raw(value & 0xFF)
+
+    def write8(self, register, value):
+        """Write an 8-bit value to the specified register."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'write8', 2)
+            model.write(register, [value & 0xFF])
+
+    def write16(self, register, value):
+        """Write a 16-bit value to the specified register."""
+        value = value & 0xFFFF
+        with self.lock:
+            model = self._bus._transaction(self._address, 'write16', 3)
+            model.write(register, [value & 0xFF, value >> 8])
+
+    def writeList(self, register, data):
+        """Write bytes to the specified register."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'writeList', len(data) + 1)
+            model.write(register, [value & 0xFF for value in data])
+
+    def readList(self, register, length):
+        """Read a length number of bytes from the specified register.  Results
+        will be returned as a bytearray."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'readList', length + 2)
+            return bytearray(model.read(register, length))
+
+    def read_struct(self, register, fmt):
+        """Read the registers starting at the specified register in one
+        transaction and decode them with the specified struct module format
+        string.  Returns a tuple of the decoded values."""
+        length = struct.calcsize(fmt)
+        with self.lock:
+            model = self._bus._transaction(self._address, 'read_struct', length + 2)
+            return struct.unpack(fmt, bytes(bytearray(model.read(register, length))))
+
+    def readRaw8(self):
+        """Read an 8-bit value on the bus (without register)."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'readRaw8', 1)
+            return model.read_raw()
+
+    def readU8(self, register):
+        """Read an unsigned byte from the specified register."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'readU8', 3)
+            return model.read(register, 1)[0]
+
+    def readS8(self, register):
+        """Read a signed byte from the specified register."""
+        result = self.readU8(register)
+        if result > 127:
+            result -= 256
+        return result
+
+    def readU16(self, register, little_endian=True):
+        """Read an unsigned 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        with self.lock:
+            model = self._bus._transaction(self._address, 'readU16', 4)
+            low, high = model.read(register, 2)
+        if not little_endian:
+            low, high = high, low
+        return (high << 8) | low
+
+    def readS16(self, register, little_endian=True):
+        """Read a signed 16-bit value from the specified register, with the
+        specified endianness (default little endian, or least significant byte
+        first)."""
+        result = self.readU16(register, little_endian)
+        if result > 32767:
+            result -= 65536
+        return result
+
+    def readU16LE(self, register):
+        """Read an unsigned 16-bit value from the specified register, in little
+        endian byte order."""
+        return self.readU16(register, little_endian=True)
+
+    def readU16BE(self, register):
+        """Read an unsigned 16-bit value from the specified register, in big
+        endian byte order."""
+        return self.readU16(register, little_endian=False)
+
+    def readS16LE(self, register):
+        """Read a signed 16-bit value from the specified register, in little
+        endian byte order."""
+        return self.readS16(register, little_endian=True)
+
+    def readS16BE(self, register):
+        """Read a signed 16-bit value from the specified register, in big
+        endian byte order."""
+        return self.readS16(register, little_endian=False)
+
+
+class RegisterModel(object):
+    """Model of a device with a map of 8-bit registers whose address
+    auto-increments during block reads and writes.  Subclasses override
+    read_register and write_register to add behavior to registers.
+    """
+
+    def __init__(self, size=256):
+        self.registers = bytearray(size)
+        # Register address used by reads and writes without a register.
+        self.pointer = 0
+
+    def read_register(self, register):
+        """Return the value of the specified register."""
+        return self.registers[register]
+
+    def write_register(self, register, value):
+        """Set the value of the specified register."""
+        self.registers[register] = value
+
+    def read(self, register, length):
+        """Return a list of length register values from the specified register."""
+        values = [self.read_register((register + i) % len(self.registers))
+                  for i in range(length)]
+        self.pointer = (register + length) % len(self.registers)
+        return values
+
+    def write(self, register, values):
+        """Write a list of values to the registers starting at the specified
+        register."""
+        for i, value in enumerate(values):
+            self.write_register((register + i) % len(self.registers), value)
+        self.pointer = (register + len(values)) % len(self.registers)
+
+    def read_raw(self):
+        """Read one byte without a register, from the register pointer."""
+        return self.read(self.pointer, 1)[0]
+
+    def write_raw(self, value):
+        """Write one byte without a register, which sets the register pointer."""
+        self.pointer = value % len(self.registers)
+
+
+class BMP085Model(RegisterModel):
+    """Model of a BMP085 pressure sensor with the datasheet example
+    calibration.  The raw temperature and pressure the sensor measures are set
+    with the ut and up attributes (by default the datasheet example values,
+    with up given for the ultra low power mode and scaled for the other
+    modes).  Conversions take the datasheet's maximum conversion time and the
+    result registers keep the previous result until a conversion finishes.
+    """
+
+    # Datasheet example calibration values, AC1 to MD.
+    CALIBRATION = (408, -72, -14383, 32741, 32757, 23153, 6190, 4, -32767, -8711, 2868)
+    CHIP_ID = 0x55
+    # Maximum conversion time in seconds for the temperature and each pressure
+    # oversampling mode.
+    TEMPERATURE_TIME = 0.0045
+    PRESSURE_TIME = (0.0045, 0.0075, 0.0135, 0.0255)
+
+    def __init__(self, ut=27898, up=23843):
+        super(BMP085Model, self).__init__()
+        self.ut = ut
+        self.up = up
+        self.conversions = 0
+        self.registers[0xAA:0xC0] = struct.pack('>hhhHHHhhhhh', *self.CALIBRATION)
+        self.registers[0xD0] = self.CHIP_ID
+        # Pending conversion as a tuple of (ready time, result bytes).
+        self._pending = None
+
+    def _finish_conversion(self):
+        if self._pending is not None and _clock() >= self._pending[0]:
+            self.registers[0xF6:0xF9] = self._pending[1]
+            self._pending = None
+
+    def read_register(self, register):
+        self._finish_conversion()
+        return self.registers[register]
+
+    def write_register(self, register, value):
+        if register != 0xF4:
+            self.registers[register] = value
+            return
+        if value == 0x2E:
+            result = bytearray(struct.pack('>H', self.ut & 0xFFFF)) + bytearray(1)
+            delay = self.TEMPERATURE_TIME
+        elif value & 0x3F == 0x34:
+            mode = value >> 6
+            # The sensor returns a 16 to 19 bit result (depending on the
+            # mode) left aligned in the 24 bit result registers.
+            raw = (self.up << mode) << (8 - mode)
+            result = bytearray(struct.pack('>I', raw & 0xFFFFFF)[1:])
+            delay = self.PRESSURE_TIME[mode]
+        else:
+            return
+        self.conversions += 1
+        self._pending = (_clock() + delay, result)
+
+
+class MCP230xxModel(RegisterModel):
+    """Model of an MCP23008 or MCP23017 GPIO extender's direction, pull-up,
+    GPIO and output latch registers (IOCON.BANK = 0 layout).  Set the levels
+    driven onto input pins with the inputs attribute, a bit mask of pins.
+    Reading GPIO returns the latch for output pins and inputs for input pins.
+
+    Interrupt-on-change is modelled too: when inputs changes, input pins
+    enabled in GPINTEN which differ from their previous level (or from DEFVAL
+    when their INTCON bit is set) set INTF and capture the port in INTCAP,
+    unless the port already has an interrupt pending.  Reading the port's
+    GPIO or INTCAP register clears its interrupt.  The INT outputs are
+    modelled as one line (like with IOCON.MIRROR set), which is asserted while
+    any port has an interrupt pending, in the interrupt attribute.  When it's
+    asserted the on_interrupt function, if set, is called, so it can stand in
+    for the host GPIO edge.
+    """
+
+    def __init__(self, num_gpio, iodir, gppu, gpio, olat, gpinten, defval,
+                 intcon, intf, intcap):
+        super(MCP230xxModel, self).__init__(size=0x16 if num_gpio > 8 else 0x0B)
+        self.num_gpio = num_gpio
+        self._ports = 2 if num_gpio > 8 else 1
+        self._iodir = iodir
+        self._gppu = gppu
+        self._gpio = gpio
+        self._olat = olat
+        self._gpinten = gpinten
+        self._defval = defval
+        self._intcon = intcon
+        self._intf = intf
+        self._intcap = intcap
+        self._inputs = 0
+        self.interrupt = False
+        self.on_interrupt = None
+        # All pins are inputs at power on.
+        for port in range(self._ports):
+            self.registers[iodir + port] = 0xFF
+
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, value):
+        previous = self._inputs
+        self._inputs = value
+        self._check_interrupts(previous)
+
+    def _check_interrupts(self, previous):
+        # Flag the enabled input pins which changed on ports with no interrupt
+        # pending, and assert INT if it wasn't already.
+        for port in range(self._ports):
+            if self.registers[self._intf + port]:
+                continue
+            value = (self._inputs >> (8 * port)) & 0xFF
+            intcon = self.registers[self._intcon + port]
+            changed = (value ^ (previous >> (8 * port))) & ~intcon
+            changed |= (value ^ self.registers[self._defval + port]) & intcon
+            changed &= self.registers[self._gpinten + port] & self.registers[self._iodir + port]
+            if changed:
+                self.registers[self._intf + port] = changed
+                self.registers[self._intcap + port] = self._port_levels(port)
+        pending = any(self.registers[self._intf + port] for port in range(self._ports))
+        if pending and not self.interrupt:
+            self.interrupt = True
+            if self.on_interrupt is not None:
+                self.on_interrupt()
+
+    def _port_value(self, base, port):
+        return self.registers[base + port] << (8 * port)
+
+    def _port_levels(self, port):
+        iodir = self.registers[self._iodir + port]
+        olat = self.registers[self._olat + port]
+        inputs = (self._inputs >> (8 * port)) & 0xFF
+        return (olat & ~iodir & 0xFF) | (inputs & iodir)
+
+    def _clear_interrupt(self, port):
+        self.registers[self._intf + port] = 0
+        self.interrupt = any(self.registers[self._intf + p] for p in range(self._ports))
+
+    def read_register(self, register):
+        port = register - self._gpio
+        if 0 <= port < self._ports:
+            self._clear_interrupt(port)
+            return self._port_levels(port)
+        port = register - self._intcap
+        if 0 <= port < self._ports:
+            value = self.registers[register]
+            self._clear_interrupt(port)
+            return value
+        return self.registers[register]
+
+    def write_register(self, register, value):
+        port = register - self._gpio
+        if 0 <= port < self._ports:
+            # Writing GPIO writes the output latch.
+            register = self._olat + port
+        self.registers[register] = value
+
+    def outputs(self):
+        """Return a bit mask of the levels of the output latch."""
+        return sum(self._port_value(self._olat, port) for port in range(self._ports))
+
+
+class MCP23008Model(MCP230xxModel):
+    """Model of an MCP23008 8 pin GPIO extender."""
+
+    def __init__(self):
+        super(MCP23008Model, self).__init__(8, iodir=0x00, gppu=0x06, gpio=0x09, olat=0x0A,
+                                            gpinten=0x02, defval=0x03, intcon=0x04,
+                                            intf=0x07, intcap=0x08)
+
+
+class MCP23017Model(MCP230xxModel):
+    """Model of an MCP23017 16 pin GPIO extender."""
+
+    def __init__(self):
+        super(MCP23017Model, self).__init__(16, iodir=0x00, gppu=0x0C, gpio=0x12, olat=0x14,
+                                            gpinten=0x04, defval=0x06, intcon=0x08,
+                                            intf=0x0E, intcap=0x10)
+
+
+class PCF8574Model(object):
+    """Model of a PCF8574 quasi-bidirectional GPIO extender.  Writing a byte
+    sets the output latch, and reading returns the latch ANDed with the levels
+    driven onto the pins, set with the inputs attribute (all high by default),
+    because a pin written high is only weakly pulled up.
+    """
+
+    def __init__(self):
+        self.latch = 0xFF
+        self.inputs = 0xFF
+
+    def read_raw(self):
+        return self.latch & self.inputs
+
+    def write_raw(self, value):
+        self.latch = value
+
+    def read(self, register, length):
+        raise IOError(errno.EIO, 'PCF8574 has no registers.')
+
+    def write(self, register, values):
+        raise IOError(errno.EIO, 'PCF8574 has no registers.')
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# Measure the throughput of the bit bang SPI class and the number of GPIO calls
+# it makes per byte, using mock GPIO classes so no hardware is required.  The
+# mock MISO pin reads back the level of MOSI, so transfers return the data sent.
+# The bulk mock has an output_pins method which sets several pins in one call
+# like the FT232H, MCP230xx and PCF8574 classes.
+import timeit
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.SPI as SPI
+
+
+SCLK = 1
+MOSI = 2
+MISO = 3
+SS   = 4
+
+BYTES = 1024
+RUNS  = 5
+
+
+class MockGPIO(GPIO.BaseGPIO):
+    # GPIO which keeps pin levels in a dict and counts calls.
+    def __init__(self):
+        self.levels = {}
+        self.calls = 0
+
+    def setup(self, pin, mode):
+        pass
+
+    def output(self, pin, value):
+        self.calls += 1
+        self.levels[pin] = value
+
+    def input(self, pin):
+        self.calls += 1
+        return self.levels.get(MOSI, GPIO.LOW)
+
+
+class BulkMockGPIO(MockGPIO):
+    # Mock GPIO which can set several pins in one call.
+    def output_pins(self, pins):
+        self.calls += 1
+        self.levels.update(pins)
+
+
+data = bytearray(range(256)) * (BYTES // 256)
+
+print('{0:26} {1:>14} {2:>14} {3:>14}'.format('', 'write', 'read', 'transfer'))
+for name, gpio_class in (('Single pin GPIO', MockGPIO), ('Bulk output GPIO', BulkMockGPIO)):
+    for mode in (0, 1):
+        gpio = gpio_class()
+        spi = SPI.BitBang(gpio, SCLK, MOSI, MISO, SS)
+        spi.set_mode(mode)
+        if spi.transfer(data) != data:
+            raise RuntimeError('Transfer did not read back the data written!')
+        rates = []
+        calls = []
+        for operation in (lambda: spi.write(data), lambda: spi.read(BYTES),
+                          lambda: spi.transfer(data)):
+            gpio.calls = 0
+            seconds = min(timeit.repeat(operation, number=1, repeat=RUNS))
+            rates.append('{0:.1f} kbit/s'.format(BYTES * 8 / seconds / 1000))
+            calls.append('{0:.1f} calls'.format(gpio.calls / float(BYTES * RUNS)))
+        print('{0:26} {1:>14} {2:>14} {3:>14}'.format('{0}, mode {1}'.format(name, mode), *rates))
+        print('{0:26} {1:>14} {2:>14} {3:>14}'.format('  per byte', *calls))
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# Measure what the FT232H code sends over USB for common I2C and SPI
+# operations: USB writes, bytes each way and round trips (reads which had to
+# wait for a response) per operation, and the time spent on the bus at the
+# configured clock.  Also times how long building the MPSSE command buffer for
+# one readU16 takes with the precomputed command templates and with the
+# original per-byte I2C primitives.  Runs against the simulated libftdi so no
+# FT232H or ftdi1 binding is required.
+import timeit
+
+import Adafruit_GPIO.SimulatedFTDI as SimulatedFTDI
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+
+chip = SimulatedFTDI.add_device()
+chip.attach_i2c(0x77, SimulatedI2C.BMP085Model())
+chip.attach_spi(SimulatedFTDI.LoopbackSPIDevice(), cs=8)
+SimulatedFTDI.install()
+
+import Adafruit_GPIO.FT232H as FT232H
+
+
+READS = 10000
+
+ft232h = FT232H.FT232H()
+
+def report(operations):
+    for name, operation in operations:
+        chip.reset_counts()
+        operation()
+        print('{0:32} {1:6} {2:8} {3:8} {4:6} {5:9.0f}'.format(
+              name, chip.writes, chip.bytes_written, chip.bytes_read,
+              chip.round_trips, chip.clock_time * 1e6))
+
+print('{0:32} {1:>6} {2:>8} {3:>8} {4:>6} {5:>9}'.format(
+      'Operation', 'Writes', 'Out', 'In', 'Trips', 'Bus us'))
+
+device = FT232H.I2CDevice(ft232h, 0x77)
+
+def read_calibration():
+    for register in range(0xAA, 0xC0, 2):
+        device.readS16BE(register)
+
+def read_calibration_batch():
+    with device.batch() as batch:
+        for register in range(0xAA, 0xC0, 2):
+            batch.readS16BE(register)
+
+report((
+    ('I2C readU8',                      lambda: device.readU8(0xD0)),
+    ('I2C readU16BE',                   lambda: device.readU16BE(0xF6)),
+    ('I2C write8',                      lambda: device.write8(0xF4, 0x2E)),
+    ('I2C 11 calibration reads',        read_calibration),
+    ('I2C 11 calibration reads, batch', read_calibration_batch),
+))
+
+# SPI uses the same pins so it's set up after the I2C measurements.
+spi = FT232H.SPI(ft232h, cs=8, max_speed_hz=30000000)
+
+report((
+    ('SPI write 4K',                    lambda: spi.write(bytearray(4096))),
+    ('SPI read 4K',                     lambda: spi.read(4096)),
+    ('SPI transfer 4K',                 lambda: spi.transfer(bytearray(4096))),
+))
+
+def build_template():
+    device._build([FT232H._read_op(0xF6, 2, FT232H._decode_U16BE)])
+
+def build_primitives():
+    device._transaction_start()
+    device._i2c_start()
+    device._i2c_write_bytes([device._address_byte(False), 0xF6])
+    device._i2c_stop()
+    device._i2c_idle()
+    device._i2c_start()
+    device._i2c_write_bytes([device._address_byte(True)])
+    device._i2c_read_bytes(2)
+    device._i2c_stop()
+    ''.join(device._command)
+
+print('')
+for name, build in (('templates', build_template), ('primitives', build_primitives)):
+    seconds = timeit.timeit(build, number=READS)
+    print('readU16 command build with {0}: {1:.1f} us'.format(name, seconds / READS * 1e6))
@@ -0,0 +1,53 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import sys
+import unittest
+
+from mock import patch
+
+import Adafruit_GPIO.Clock as Clock
+
+
+class TestClock(unittest.TestCase):
+
+    def test_monotonic_never_goes_backwards(self):
+        previous = Clock.monotonic()
+        for i in range(1000):
+            now = Clock.monotonic()
+            self.assertGreaterEqual(now, previous)
+            previous = now
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'clock_gettime is only used on Linux')
+    def test_clock_gettime_matches_monotonic(self):
+        clock_gettime = Clock._load_clock_gettime()
+        self.assertIsNotNone(clock_gettime)
+        with patch.object(Clock, '_clock_gettime', clock_gettime, create=True):
+            before = Clock.monotonic()
+            now = Clock._clock_gettime_monotonic()
+            after = Clock.monotonic()
+        self.assertTrue(Clock.is_monotonic())
+        self.assertLessEqual(before, now)
+        self.assertLessEqual(now, after)
+
+    def test_clock_gettime_error_raises(self):
+        with patch.object(Clock, '_clock_gettime', lambda clock, now: -1, create=True):
+            self.assertRaises(OSError, Clock._clock_gettime_monotonic)
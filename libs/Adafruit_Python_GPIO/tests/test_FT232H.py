@@ -0,0 +1,233 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import sys
+import unittest
+
+from mock import patch
+
+import Adafruit_GPIO.SPI as SPI
+import Adafruit_GPIO.SimulatedFTDI as SimulatedFTDI
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+
+
+def import_FT232H():
+    # Import the FT232H module with the simulated libftdi standing in for the
+    # ftdi1 binding.
+    with patch.dict('sys.modules', {'ftdi1': SimulatedFTDI}):
+        import Adafruit_GPIO.FT232H as FT232H
+    return FT232H
+
+
+class TestChip(unittest.TestCase):
+
+    def setUp(self):
+        SimulatedFTDI.remove_devices()
+        self.chip = SimulatedFTDI.add_device()
+        self.ctx = SimulatedFTDI.new()
+        self.assertEqual(SimulatedFTDI.usb_open(self.ctx, SimulatedFTDI.FT232H_VID,
+                                                SimulatedFTDI.FT232H_PID), 0)
+        SimulatedFTDI.set_bitmode(self.ctx, 0, 2)
+
+    def tearDown(self):
+        SimulatedFTDI.free(self.ctx)
+
+    def command(self, data):
+        SimulatedFTDI.write_data(self.ctx, data, len(data))
+        return SimulatedFTDI.read_data(self.ctx, 1024)[1]
+
+    def test_bad_command_response_sent_immediately(self):
+        self.assertEqual(self.command(b'\xAB\x87'), b'\xFA\xAB')
+
+    def test_response_waits_for_latency_timer(self):
+        self.assertEqual(self.command(b'\xAB'), b'')
+        self.chip.latency_timer = 0
+        self.assertEqual(SimulatedFTDI.read_data(self.ctx, 1024), (2, b'\xFA\xAB'))
+
+    def test_gpio_read_and_write(self):
+        self.chip.inputs = 0x0204
+        self.assertEqual(self.command(b'\x80\x01\x03\x82\x80\x80\x81\x83\x87'), b'\x05\x82')
+        self.assertEqual(self.chip.level, 0x8001)
+        self.assertEqual(self.chip.direction, 0x8003)
+
+    def test_commands_split_across_writes(self):
+        self.chip.attach_spi(SimulatedFTDI.LoopbackSPIDevice())
+        self.assertEqual(self.command(b'\x31\x01'), b'')
+        self.assertEqual(self.command(b'\x00\x12'), b'')
+        self.assertEqual(self.command(b'\x34\x87'), b'\x12\x34')
+
+    def test_counts_round_trips(self):
+        self.chip.reset_counts()
+        self.command(b'\x81\x87')
+        self.command(b'\x81\x83\x87')
+        self.assertEqual(self.chip.writes, 2)
+        self.assertEqual(self.chip.bytes_written, 5)
+        self.assertEqual(self.chip.bytes_read, 3)
+        self.assertEqual(self.chip.round_trips, 2)
+
+
+@unittest.skipIf(sys.version_info[0] >= 3, 'FT232H module requires Python 2.')
+class TestFT232H(unittest.TestCase):
+
+    def setUp(self):
+        SimulatedFTDI.remove_devices()
+        self.chip = SimulatedFTDI.add_device()
+        self.FT232H = import_FT232H()
+        self.ft232h = self.FT232H.FT232H()
+
+    def tearDown(self):
+        self.ft232h.close()
+
+    def test_open_syncs_mpsse(self):
+        self.assertTrue(self.chip.mpsse)
+        self.assertTrue(self.chip.is_open)
+        self.assertEqual(self.chip.latency_timer, 1)
+
+    def test_poll_read_spins_backs_off_and_times_out(self):
+        # Each poll takes 0.5ms of the fake clock and sleeps advance it.
+        now = [0.0]
+        sleeps = []
+        def clock():
+            now[0] += 0.0005
+            return now[0]
+        def sleep(delay):
+            sleeps.append(delay)
+            now[0] += delay
+        self.chip.reset_counts()
+        with patch.object(self.FT232H, '_clock', clock), \
+             patch.object(self.FT232H.time, 'sleep', sleep):
+            self.assertRaises(RuntimeError, self.ft232h._poll_read, 2, timeout_s=0.05)
+        # Polls spin for 2ms before the first sleep, then the sleeps double up
+        # to the 10ms maximum until the deadline passes.
+        self.assertEqual(self.chip.reads - len(sleeps), 4)
+        self.assertEqual([round(delay, 6) for delay in sleeps],
+                         [0.0001, 0.0002, 0.0004, 0.0008, 0.0016, 0.0032, 0.0064] + [0.01] * 4)
+        self.assertTrue(0.05 < now[0] < 0.05 + 0.01 + 0.002)
+
+    def test_enumerate_and_open_by_serial(self):
+        second = SimulatedFTDI.add_device()
+        self.assertEqual(self.FT232H.enumerate_device_serials(), ['FTSIM0', 'FTSIM1'])
+        ft232h = self.FT232H.FT232H(serial='FTSIM1')
+        self.assertTrue(second.is_open)
+        ft232h.close()
+        self.assertFalse(second.is_open)
+
+    def test_gpio(self):
+        self.ft232h.setup(3, self.FT232H.GPIO.OUT)
+        self.ft232h.output(3, True)
+        self.assertEqual(self.chip.pins() & 0x0008, 0x0008)
+        self.chip.inputs = 0x0200
+        self.assertTrue(self.ft232h.input(9))
+        self.assertFalse(self.ft232h.input(10))
+
+    def test_batch_is_one_write(self):
+        self.ft232h.setup(3, self.FT232H.GPIO.OUT)
+        self.chip.reset_counts()
+        with self.ft232h.batch():
+            for i in range(10):
+                self.ft232h.output(3, i % 2)
+        self.assertEqual(self.chip.writes, 1)
+
+    def test_bitbang_spi_read_sends_clock_with_each_sample(self):
+        spi = SPI.BitBang(self.ft232h, 0, 1, 2, 3)
+        self.chip.inputs = 0x0004
+        self.chip.reset_counts()
+        self.assertEqual(spi.read(1), bytearray((0xFF,)))
+        # One write for each bit's clock change and sample, and one for the
+        # last clock change and chip select.
+        self.assertEqual(self.chip.writes, 9)
+
+    def test_i2c_read_and_write(self):
+        model = self.chip.attach_i2c(0x20, SimulatedI2C.RegisterModel())
+        device = self.ft232h.get_i2c_device(0x20)
+        device.write8(0x01, 0xAB)
+        device.writeList(0x02, [0xCD, 0xEF])
+        self.assertEqual(model.registers[1:4], bytearray([0xAB, 0xCD, 0xEF]))
+        self.assertEqual(device.readU8(0x01), 0xAB)
+        self.assertEqual(device.readU16BE(0x02), 0xCDEF)
+        self.assertEqual(list(device.readList(0x01, 3)), [0xAB, 0xCD, 0xEF])
+        self.assertEqual(self.chip.i2c_transactions, 8)
+
+    def test_i2c_readList_writes_register_then_reads(self):
+        self.chip.attach_i2c(0x20, SimulatedI2C.RegisterModel())
+        device = self.ft232h.get_i2c_device(0x20)
+        log = self.chip.log_i2c()
+        device.readList(0x01, 3)
+        device.readU8(0x01)
+        # Like readU8, the register is written with the write address and the
+        # bytes are read in a new transaction with the read address.
+        self.assertEqual(log, ['S', 0x40, 0x01, 'P', 'S', 0x41, 'P'] * 2)
+
+    def test_i2c_batch_is_one_round_trip(self):
+        self.chip.attach_i2c(0x77, SimulatedI2C.BMP085Model())
+        device = self.ft232h.get_i2c_device(0x77)
+        self.chip.reset_counts()
+        with device.batch() as batch:
+            batch.readU8(0xD0)
+            batch.readS16BE(0xAA)
+            batch.readU16BE(0xB0)
+        self.assertEqual(batch.results, [0x55, 408, 32741])
+        self.assertEqual(self.chip.writes, 1)
+        self.assertEqual(self.chip.round_trips, 1)
+
+    def test_i2c_ping(self):
+        self.chip.attach_i2c(0x20, SimulatedI2C.RegisterModel())
+        self.assertTrue(self.ft232h.get_i2c_device(0x20).ping())
+        self.assertFalse(self.ft232h.get_i2c_device(0x21).ping())
+        self.assertRaises(RuntimeError, self.ft232h.get_i2c_device(0x21).readU8, 0x00)
+
+    def test_spi_transfer(self):
+        device = self.chip.attach_spi(SimulatedFTDI.LoopbackSPIDevice(), cs=8)
+        spi = self.FT232H.SPI(self.ft232h, cs=8)
+        self.assertFalse(device.selected)
+        self.assertEqual(spi.transfer(b'\x01\x02\x03'), bytearray(b'\x01\x02\x03'))
+        self.assertFalse(device.selected)
+        spi.write([0x04, 0x05])
+        self.assertEqual(device.received, bytearray(b'\x01\x02\x03\x04\x05'))
+
+    def test_spi_large_transfers(self):
+        device = self.chip.attach_spi(SimulatedFTDI.SPIDevice(bytearray(range(256)) * 300), cs=8)
+        spi = self.FT232H.SPI(self.ft232h, cs=8)
+        self.chip.reset_counts()
+        buf = bytearray(70000)
+        self.assertEqual(len(spi.readinto(memoryview(buf))), 70000)
+        self.assertEqual(buf[65535:65537], bytearray((255, 0)))
+        self.assertEqual(self.chip.writes, 1)
+        # Large chunks are written directly instead of being copied into the
+        # batch with the chip select and header commands.
+        self.chip.reset_counts()
+        spi.write(bytearray(70000))
+        self.assertEqual(self.chip.writes, 5)
+        self.assertEqual(len(device.received), 140000)
+        self.chip.reset_counts()
+        spi.write(bytearray(100))
+        self.assertEqual(self.chip.writes, 1)
+
+    def test_spi_transfer_in_fifo_sized_chunks(self):
+        device = self.chip.attach_spi(SimulatedFTDI.LoopbackSPIDevice(), cs=8)
+        spi = self.FT232H.SPI(self.ft232h, cs=8)
+        data = bytearray(range(256)) * 12
+        self.chip.reset_counts()
+        self.assertEqual(spi.transfer(data), data)
+        # Each 1024 byte chunk is written and read back before the next.
+        self.assertEqual(self.chip.writes, 3)
+        self.assertEqual(self.chip.round_trips, 3)
+        self.assertFalse(device.selected)
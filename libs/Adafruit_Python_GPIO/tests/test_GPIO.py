@@ -19,6 +19,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import mmap
+import struct
 import unittest
 
 from mock import Mock, patch
@@ -50,6 +52,15 @@ class TestBaseGPIO(unittest.TestCase):
         gpio.output_pins({0: True, 1: False, 7: True})
         self.assertDictEqual(gpio.pin_written, {0: [1], 1: [0], 7: [1]})
 
+    def test_batch_writes_in_order(self):
+        gpio = MockGPIO()
+        with gpio.batch() as batch:
+            self.assertIs(batch, gpio)
+            gpio.set_high(1)
+            with gpio.batch():
+                gpio.set_low(1)
+        self.assertDictEqual(gpio.pin_written, {1: [1, 0]})
+
 
 class TestRPiGPIOAdapter(unittest.TestCase):
     def test_setup(self):
@@ -132,6 +143,44 @@ class TestRPiGPIOAdapter(unittest.TestCase):
         rpi_gpio.cleanup.assert_called_with(1)
 
 
+class TestRPiMMIOAdapter(unittest.TestCase):
+    def setUp(self):
+        # Anonymous memory standing in for the GPIO registers.
+        self.mmio = mmap.mmap(-1, GPIO.RPI_GPIO_LENGTH)
+        self.rpi_gpio = Mock()
+        self.adapter = GPIO.RPiMMIOAdapter(self.rpi_gpio, mmio=self.mmio)
+
+    def register(self, word):
+        return struct.unpack_from('<I', self.mmio, word * 4)[0]
+
+    def test_requires_bcm_numbering(self):
+        self.assertRaises(ValueError, GPIO.RPiMMIOAdapter, self.rpi_gpio,
+                          mode=self.rpi_gpio.BOARD, mmio=self.mmio)
+
+    def test_setup_uses_rpi_gpio(self):
+        self.adapter.setup(4, GPIO.IN, GPIO.PUD_UP)
+        self.rpi_gpio.setup.assert_called_with(4, self.rpi_gpio.IN, pull_up_down=self.rpi_gpio.PUD_UP)
+
+    def test_input_pins_reads_levels(self):
+        struct.pack_into('<II', self.mmio, GPIO.RPI_GPLEV0 * 4, 0x00000011, 0x00000002)
+        self.assertEqual(self.adapter.input_pins([0, 1, 4, 33]), [True, False, True, True])
+        self.assertTrue(self.adapter.input(4))
+        self.assertFalse(self.adapter.input(32))
+        self.assertEqual(self.adapter.read_bank(), 0x200000011)
+        self.assertFalse(self.rpi_gpio.input.called)
+        self.assertRaises(ValueError, self.adapter.input, 54)
+
+    def test_output_pins_writes_set_and_clear(self):
+        self.adapter.output_pins({2: True, 3: False, 35: True, 5: True})
+        self.assertEqual(self.register(GPIO.RPI_GPSET0), 0x24)
+        self.assertEqual(self.register(GPIO.RPI_GPSET0 + 1), 0x08)
+        self.assertEqual(self.register(GPIO.RPI_GPCLR0), 0x08)
+        self.assertEqual(self.register(GPIO.RPI_GPCLR0 + 1), 0x00)
+        self.adapter.output(40, False)
+        self.assertEqual(self.register(GPIO.RPI_GPCLR0 + 1), 0x100)
+        self.assertFalse(self.rpi_gpio.output.called)
+
+
 class TestAdafruitBBIOAdapter(unittest.TestCase):
     def test_setup(self):
         bbio_gpio = Mock()
@@ -217,6 +266,13 @@ class TestGetPlatformGPIO(unittest.TestCase):
         gpio = GPIO.get_platform_gpio()
         self.assertIsInstance(gpio, GPIO.RPiGPIOAdapter)
 
+    @patch.dict('sys.modules', {'RPi': Mock(), 'RPi.GPIO': Mock()})
+    @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.RASPBERRY_PI))
+    @patch('Adafruit_GPIO.GPIO.map_rpi_gpio', Mock(return_value=mmap.mmap(-1, 4096)))
+    def test_raspberrypi_mmio(self):
+        gpio = GPIO.get_platform_gpio(mmio=True)
+        self.assertIsInstance(gpio, GPIO.RPiMMIOAdapter)
+
     @patch.dict('sys.modules', {'Adafruit_BBIO': Mock(), 'Adafruit_BBIO.GPIO': Mock()})
     @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.BEAGLEBONE_BLACK))
     def test_beagleboneblack(self):
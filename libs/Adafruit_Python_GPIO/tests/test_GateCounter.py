@@ -0,0 +1,127 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import unittest
+
+from mock import patch
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.Clock as Clock
+import Adafruit_GPIO.GateCounter as GateCounter
+
+
+class EventMockGPIO(GPIO.BaseGPIO):
+    # Mock GPIO which keeps event callbacks so edges can be triggered.
+    def __init__(self):
+        self.pin_mode = {}
+        self.edges = {}
+        self.callbacks = {}
+
+    def setup(self, pin, mode, pull_up_down=GPIO.PUD_OFF):
+        self.pin_mode[pin] = (mode, pull_up_down)
+
+    def add_event_detect(self, pin, edge):
+        self.edges[pin] = edge
+
+    def remove_event_detect(self, pin):
+        del self.edges[pin]
+        self.callbacks.pop(pin, None)
+
+    def add_event_callback(self, pin, callback):
+        assert pin in self.edges
+        self.callbacks.setdefault(pin, []).append(callback)
+
+    def trigger(self, pin):
+        for callback in self.callbacks[pin]:
+            callback(pin)
+
+
+class TestGateCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch.object(GateCounter, '_clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gpio = EventMockGPIO()
+
+    def edges(self, *edges):
+        # Trigger (pin, time) edges.
+        for pin, when in edges:
+            self.now = when
+            self.gpio.trigger(pin)
+
+    def test_start_and_stop(self):
+        counter = GateCounter.GateCounter(self.gpio, [(1, 2), (3, 4)])
+        counter.start()
+        self.assertEqual(self.gpio.pin_mode[3], (GPIO.IN, GPIO.PUD_UP))
+        self.assertEqual(sorted(self.gpio.edges), [1, 2, 3, 4])
+        self.assertEqual(self.gpio.edges[1], GPIO.FALLING)
+        counter.stop()
+        self.assertEqual(self.gpio.edges, {})
+
+    def test_direction_from_gate_order(self):
+        counter = GateCounter.GateCounter(self.gpio, [(1, 2), (3, 4)], max_gap=0.5)
+        counter.start()
+        self.edges((1, 100.0), (2, 100.1),   # Gate 0 in.
+                   (4, 100.2), (3, 100.3),   # Gate 1 out.
+                   (3, 100.4), (2, 100.45),  # Different gates, not paired.
+                   (4, 100.5))               # Gate 1 in.
+        self.assertEqual(counter.read(), {'in': 2, 'out': 1, 'unpaired': 0, 'dropped': 0})
+        # The break on gate 0's inner beam times out.
+        self.now = 101.0
+        self.assertEqual(counter.read(), {'in': 0, 'out': 0, 'unpaired': 1, 'dropped': 0})
+        self.assertEqual(counter.totals, {'in': 2, 'out': 1, 'unpaired': 1, 'dropped': 0})
+
+    def test_holdoff_and_unpaired_breaks(self):
+        counter = GateCounter.GateCounter(self.gpio, [(1, 2)], max_gap=0.5, holdoff=0.02)
+        counter.start()
+        self.edges((1, 100.0), (1, 100.01),  # Bounce is ignored.
+                   (1, 100.2),               # Second outer break, first is unpaired.
+                   (2, 100.9),               # Too late to pair with the outer break.
+                   (1, 101.0))
+        self.assertEqual(counter.read(), {'in': 0, 'out': 1, 'unpaired': 2, 'dropped': 0})
+
+    def test_overwritten_edges_are_dropped(self):
+        counter = GateCounter.GateCounter(self.gpio, [(1, 2)], holdoff=0, capacity=4)
+        counter.start()
+        self.edges(*[(1 + i % 2, 100.0 + i * 0.1) for i in range(10)])
+        # Only the last 4 edges (2 crossings in) were kept.
+        self.assertEqual(counter.read(), {'in': 2, 'out': 0, 'unpaired': 0, 'dropped': 6})
+        self.edges((1, 102.0), (2, 102.1))
+        self.assertEqual(counter.read(), {'in': 1, 'out': 0, 'unpaired': 0, 'dropped': 0})
+
+
+class TestGateCounterClock(unittest.TestCase):
+
+    def test_edges_use_monotonic_clock(self):
+        self.assertIs(GateCounter._clock, Clock.monotonic)
+
+    def test_edge_times_come_from_monotonic_clock(self):
+        gpio = EventMockGPIO()
+        counter = GateCounter.GateCounter(gpio, [(1, 2)], holdoff=0)
+        counter.start()
+        before = Clock.monotonic()
+        gpio.trigger(1)
+        gpio.trigger(2)
+        after = Clock.monotonic()
+        self.assertTrue(before <= counter._times[0] <= counter._times[1] <= after)
+        self.assertEqual(counter.read(), {'in': 1, 'out': 0, 'unpaired': 0, 'dropped': 0})
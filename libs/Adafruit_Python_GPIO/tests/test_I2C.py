@@ -20,6 +20,7 @@
 # THE SOFTWARE.
 
 import logging
+import os
 import unittest
 
 from mock import Mock, patch
@@ -41,6 +42,10 @@ class MockSMBus(object):
         # an array of all written values (in sequential write order).
         self._written = {}
         self._read = {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
 
     def _write_register(self, address, register, value):
         self._written.setdefault(address, {}).setdefault(register, []).append(value)
@@ -67,8 +72,8 @@ class MockSMBus(object):
         low = self._read_register(address, register+1)
         return (high << 8) | low
 
-    def read_i2c_block_data(self, address, length):
-        return [self._read_register(address+i) for i in range(length)]
+    def read_i2c_block_data(self, address, register, length):
+        return [self._read_register(address, register+i) for i in range(length)]
 
 
 def create_device(address, busnum):
@@ -154,7 +159,192 @@ class TestI2CDevice(unittest.TestCase):
         self.assertEqual(value, -4863)
 
 
+    def test_readList(self):
+        device, smbus, mockbus = create_device(0x1F, 1)
+        mockbus._read[0x1F] = { 0x10: [0xFE], 0x11: [0xED] }
+        value = device.readList(0x10, 2)
+        self.assertEqual(list(value), [0xFE, 0xED])
+
+    def test_read_struct(self):
+        device, smbus, mockbus = create_device(0x1F, 1)
+        mockbus._read[0x1F] = { 0x10: [0xED], 0x11: [0x01], 0x12: [0x80] }
+        value = device.read_struct(0x10, '>hB')
+        self.assertEqual(value, (-4863, 0x80))
+
+    def test_read_struct_splits_smbus_block_reads(self):
+        device, smbus, mockbus = create_device(0x1F, 1)
+        mockbus._read[0x1F] = dict((0x80+i, [i]) for i in range(40))
+        reads = []
+        def read_i2c_block_data(address, register, length):
+            reads.append((register, length))
+            return MockSMBus.read_i2c_block_data(mockbus, address, register, length)
+        mockbus.read_i2c_block_data = read_i2c_block_data
+        value = device.read_struct(0x80, '40B')
+        self.assertEqual(value, tuple(range(40)))
+        self.assertEqual(reads, [(0x80, 32), (0xA0, 8)])
+
+    def test_devices_share_bus(self):
+        smbus = Mock()
+        mockbus = MockSMBus()
+        smbus.SMBus.return_value = mockbus
+        with patch.dict('sys.modules', {'smbus': smbus}):
+            import Adafruit_GPIO.I2C as I2C
+            device1 = I2C.Device(0x1F, 1)
+            device2 = I2C.Device(0x20, 1)
+        smbus.SMBus.assert_called_once_with(1)
+        self.assertEqual(device1._bus, device2._bus)
+        self.assertEqual(device1.lock, device2.lock)
+
+    def test_bus_closed_after_last_device_closed(self):
+        smbus = Mock()
+        mockbus = MockSMBus()
+        smbus.SMBus.return_value = mockbus
+        with patch.dict('sys.modules', {'smbus': smbus}):
+            import Adafruit_GPIO.I2C as I2C
+            device1 = I2C.Device(0x1F, 1)
+            device2 = I2C.Device(0x20, 1)
+            device1.close()
+            device1.close()
+            self.assertFalse(mockbus.closed)
+            device2.close()
+            self.assertTrue(mockbus.closed)
+            I2C.Device(0x1F, 1)
+        self.assertEqual(smbus.SMBus.call_count, 2)
+
+
+class MockI2CDev(object):
+    # Mock the i2c-dev I2C_RDWR ioctl.  Records each transaction as a list of
+    # (address, flags, bytes written) tuples and answers reads from _read.
+    def __init__(self):
+        self.transactions = []
+        self._read = []
+
+    def ioctl(self, fd, request, data):
+        messages = []
+        for i in range(data.nmsgs):
+            msg = data.msgs[i]
+            if msg.flags & 0x0001:
+                values = self._read.pop(0)
+                for j in range(msg.len):
+                    msg.buf[j] = values[j]
+                messages.append((msg.addr, msg.flags, None))
+            else:
+                messages.append((msg.addr, msg.flags, [msg.buf[j] for j in range(msg.len)]))
+        self.transactions.append(messages)
+
+
+def create_rdwr_device(address, busnum):
+    # Import the I2C module with a mock smbus and create an RDWRDevice with
+    # os.open and fcntl.ioctl patched to use a MockI2CDev.
+    i2cdev = MockI2CDev()
+    with patch.dict('sys.modules', {'smbus': Mock()}):
+        import Adafruit_GPIO.I2C as I2C
+        with patch('os.open', Mock(return_value=42)) as mock_open:
+            device = I2C.RDWRDevice(address, busnum)
+    mock_open.assert_called_once_with('/dev/i2c-{0}'.format(busnum), os.O_RDWR)
+    patcher = patch.object(I2C.fcntl, 'ioctl', Mock(side_effect=i2cdev.ioctl))
+    return (device, i2cdev, patcher)
+
+
+class TestRDWRDevice(unittest.TestCase):
+
+    def test_write8(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        with patcher:
+            device.write8(0xFE, 0xBEEFED)
+        self.assertEqual(i2cdev.transactions, [[(0x1F, 0, [0xFE, 0xED])]])
+
+    def test_readList_is_one_combined_transaction(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        i2cdev._read.append(list(range(64)))
+        with patcher:
+            values = device.readList(0x10, 64)
+        self.assertEqual(values, bytearray(range(64)))
+        self.assertEqual(i2cdev.transactions, [[(0x1F, 0, [0x10]),
+                                                (0x1F, 1, None)]])
+
+    def test_readU16BE_and_readS16LE(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        i2cdev._read.extend([[0xED, 0x01], [0x01, 0xED]])
+        with patcher:
+            self.assertEqual(device.readU16BE(0xFE), 0xED01)
+            self.assertEqual(device.readS16LE(0xFE), -4863)
+
+    def test_read_struct_is_one_transaction(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        i2cdev._read.append(list(range(40)))
+        with patcher:
+            value = device.read_struct(0x80, '<20H')
+        self.assertEqual(value[0], 0x0100)
+        self.assertEqual(len(i2cdev.transactions), 1)
+
+    def test_transfer_rejects_oversized_transactions(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        with patcher:
+            self.assertRaises(ValueError, device.transfer, [8193])
+            self.assertRaises(ValueError, device.transfer, [bytearray(8193)])
+            self.assertRaises(ValueError, device.transfer, [[0x00]] * 43)
+            i2cdev._read.append([0] * 8192)
+            device.transfer([[0x00]] * 41 + [8192])
+        self.assertEqual(len(i2cdev.transactions), 1)
+
+    def test_close_closes_file(self):
+        device, i2cdev, patcher = create_rdwr_device(0x1F, 1)
+        with patch('os.close') as mock_close:
+            device.close()
+        mock_close.assert_called_once_with(42)
+
+
+class TestTrace(unittest.TestCase):
+
+    def test_trace_off_by_default(self):
+        device, smbus, mockbus = create_device(0x1F, 1)
+        device.write8(0xFE, 0xED)
+        I2C = safe_import_i2c()
+        self.assertEqual(I2C.get_trace(), [])
+
+    def test_trace_keeps_last_transactions(self):
+        smbus = Mock()
+        mockbus = MockSMBus()
+        smbus.SMBus.return_value = mockbus
+        with patch.dict('sys.modules', {'smbus': smbus}):
+            import Adafruit_GPIO.I2C as I2C
+            I2C.enable_trace(2)
+            device = I2C.Device(0x1F, 1)
+            mockbus._read[0x1F] = { 0x10: [0xAB] }
+            device.write8(0xFE, 0xED)
+            device.write8(0xFF, 0xEE)
+            device.readU8(0x10)
+            trace = I2C.get_trace()
+            I2C.disable_trace()
+        self.assertEqual([entry[1:] for entry in trace],
+                         [(1, 0x1F, 'write8', 0xFF, 0xEE),
+                          (1, 0x1F, 'readU8', 0x10, 0xAB)])
+
+    def test_trace_enabled_by_environment(self):
+        with patch.dict('os.environ', {'ADAFRUIT_I2C_TRACE': '16'}):
+            I2C = safe_import_i2c()
+        self.assertEqual(I2C._trace.maxlen, 16)
+
+
+class TestReverseByteOrder(unittest.TestCase):
+
+    def test_reverse_byte_order(self):
+        I2C = safe_import_i2c()
+        self.assertEqual(I2C.reverseByteOrder(0x0), 0x0)
+        self.assertEqual(I2C.reverseByteOrder(0xAB), 0xAB)
+        self.assertEqual(I2C.reverseByteOrder(0x1234), 0x3412)
+        self.assertEqual(I2C.reverseByteOrder(0x123), 0x2301)
+        self.assertEqual(I2C.reverseByteOrder(0x12345678), 0x78563412)
+
+
 class TestGetDefaultBus(unittest.TestCase):
+    def setUp(self):
+        Platform.clear_board_cache()
+
+    def tearDown(self):
+        Platform.clear_board_cache()
+
     @patch('Adafruit_GPIO.Platform.pi_revision', Mock(return_value=1))
     @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.RASPBERRY_PI))
     def test_raspberry_pi_rev1(self):
@@ -0,0 +1,146 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import io
+import struct
+import unittest
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.I2CRecorder as I2CRecorder
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+from Adafruit_GPIO.MCP230xx import MCP23008
+
+
+def record_mcp23008(log):
+    # Run an MCP23008 on a simulated bus while recording its transactions.
+    bus = SimulatedI2C.Bus()
+    model = bus.attach(0x20, SimulatedI2C.MCP23008Model())
+    recorder = I2CRecorder.Recorder(log, i2c=bus)
+    mcp = MCP23008(i2c=recorder)
+    mcp.setup(0, GPIO.OUT)
+    mcp.setup(1, GPIO.IN)
+    mcp.output(0, GPIO.HIGH)
+    model.inputs = 0x02
+    values = mcp.input_pins([0, 1])
+    recorder.close()
+    return values
+
+
+class StructDevice(object):
+    # Device with only read_struct, which answers with incrementing bytes and
+    # records its calls.
+    def __init__(self):
+        self.calls = []
+
+    def read_struct(self, register, fmt):
+        self.calls.append((register, fmt))
+        data = bytearray(range(struct.calcsize(fmt)))
+        return struct.unpack(fmt, bytes(data))
+
+
+class TestRecorder(unittest.TestCase):
+
+    def test_records_transactions(self):
+        log = io.BytesIO()
+        record_mcp23008(log)
+        log.seek(0)
+        records = I2CRecorder.read_log(log)
+        self.assertEqual([record.operation for record in records],
+                         ['writeList', 'writeList', 'writeList', 'writeList',
+                          'writeList', 'readList'])
+        self.assertEqual(records[-1].address, 0x20)
+        self.assertEqual(records[-1].register, 0x09)
+        self.assertEqual(records[-1].data, bytearray((0x03,)))
+        self.assertTrue(all(record.duration >= 0 for record in records))
+
+    def test_records_failures(self):
+        log = io.BytesIO()
+        recorder = I2CRecorder.Recorder(log, i2c=SimulatedI2C.Bus())
+        device = recorder.get_i2c_device(0x40)
+        self.assertRaises(IOError, device.readU8, 0x00)
+        log.seek(0)
+        record = I2CRecorder.read_log(log)[0]
+        self.assertEqual(record.operation, 'readU8')
+        self.assertNotEqual(record.status, 0)
+
+    def test_read_struct_uses_wrapped_read_struct(self):
+        log = io.BytesIO()
+        wrapped = StructDevice()
+        device = I2CRecorder.Recorder(log, i2c=SimulatedI2C.Bus()).wrap(wrapped, 0x77, 1)
+        values = device.read_struct(0xAA, '>20hxx')
+        self.assertEqual(values, wrapped.read_struct(0xAA, '>20hxx'))
+        self.assertEqual(wrapped.calls[0], (0xAA, '>20hxx'))
+        log.seek(0)
+        record = I2CRecorder.read_log(log)[0]
+        self.assertEqual(record.operation, 'read_struct')
+        self.assertEqual(record.data, bytearray(range(40)) + bytearray(2))
+
+    def test_latency_stats(self):
+        log = io.BytesIO()
+        record_mcp23008(log)
+        log.seek(0)
+        stats = I2CRecorder.latency_stats(I2CRecorder.read_log(log))
+        self.assertEqual(stats['writeList']['count'], 5)
+        self.assertEqual(stats['readList']['count'], 1)
+        self.assertLessEqual(stats['writeList']['min'], stats['writeList']['max'])
+
+
+class TestReplayer(unittest.TestCase):
+
+    def test_replays_recorded_reads(self):
+        log = io.BytesIO()
+        recorded = record_mcp23008(log)
+        log.seek(0)
+        replayer = I2CRecorder.Replayer(log)
+        mcp = MCP23008(i2c=replayer)
+        mcp.setup(0, GPIO.OUT)
+        mcp.setup(1, GPIO.IN)
+        mcp.output(0, GPIO.HIGH)
+        self.assertEqual(mcp.input_pins([0, 1]), recorded)
+        self.assertEqual(replayer.remaining(), 0)
+
+    def test_mismatched_transaction_raises(self):
+        log = io.BytesIO()
+        record_mcp23008(log)
+        log.seek(0)
+        mcp = MCP23008(i2c=I2CRecorder.Replayer(log))
+        self.assertRaises(RuntimeError, mcp.input, 1)
+
+    def test_replays_failures(self):
+        log = io.BytesIO()
+        recorder = I2CRecorder.Recorder(log, i2c=SimulatedI2C.Bus())
+        device = recorder.get_i2c_device(0x40)
+        self.assertRaises(IOError, device.readU16BE, 0x00)
+        log.seek(0)
+        device = I2CRecorder.Replayer(log).get_i2c_device(0x40)
+        self.assertRaises(IOError, device.readU16BE, 0x00)
+
+    def test_replayed_length_must_match(self):
+        log = io.BytesIO()
+        recorder = I2CRecorder.Recorder(log, i2c=SimulatedI2C.Bus())
+        device = recorder.wrap(StructDevice(), 0x77, 1)
+        device.read_struct(0xAA, '>3h')
+        device.read_struct(0xAA, '>3h')
+        log.seek(0)
+        device = I2CRecorder.Replayer(log).get_i2c_device(0x77, 1)
+        self.assertEqual(device.read_struct(0xAA, '>3h'), (0x0001, 0x0203, 0x0405))
+        self.assertRaises(RuntimeError, device.read_struct, 0xAA, '>4h')
@@ -0,0 +1,141 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import unittest
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+from Adafruit_GPIO.MCP230xx import MCP23008, MCP23017
+
+
+class HostGPIO(GPIO.BaseGPIO):
+    # Host GPIO with the extender's INT output wired to a pin, which calls the
+    # event callbacks for the pin when the simulated INT is asserted.
+    def __init__(self, model, pin):
+        self.pin_mode = {}
+        self.edges = {}
+        self.callbacks = []
+        self._pin = pin
+        model.on_interrupt = self._interrupt
+
+    def setup(self, pin, mode, pull_up_down=GPIO.PUD_OFF):
+        self.pin_mode[pin] = (mode, pull_up_down)
+
+    def add_event_detect(self, pin, edge):
+        self.edges[pin] = edge
+
+    def remove_event_detect(self, pin):
+        del self.edges[pin]
+        self.callbacks = []
+
+    def add_event_callback(self, pin, callback):
+        self.callbacks.append(callback)
+
+    def _interrupt(self):
+        if self.edges.get(self._pin) == GPIO.FALLING:
+            for callback in self.callbacks:
+                callback(self._pin)
+
+
+class TestMCP230xx(unittest.TestCase):
+
+    def test_setup_and_pullup_pins_write_once(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23017Model())
+        mcp = MCP23017(i2c=bus)
+        bus.reset_counts()
+        mcp.setup_pins({0: GPIO.OUT, 9: GPIO.OUT, 10: GPIO.IN})
+        mcp.pullup_pins({10: True, 11: True, 3: False})
+        self.assertEqual(bus.transactions, 2)
+        self.assertEqual(model.registers[0x00:0x02], bytearray((0x00, 0x04)))
+        self.assertEqual(model.registers[0x0C:0x0E], bytearray((0x00, 0x0C)))
+        self.assertRaises(ValueError, mcp.setup_pins, {1: 5})
+
+    def test_interrupts_cache_inputs(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23017Model())
+        host = HostGPIO(model, 17)
+        mcp = MCP23017(i2c=bus)
+        changes = []
+        mcp.setup_pins({1: GPIO.IN, 2: GPIO.IN, 8: GPIO.IN})
+        model.inputs = 0x0100
+        mcp.start_interrupts([1, 8], host, 17, callback=changes.append)
+        self.assertEqual(host.pin_mode[17], (GPIO.IN, GPIO.PUD_UP))
+        self.assertEqual(model.registers[0x0A], 0x40)
+        self.assertEqual(model.registers[0x04:0x06], bytearray((0x02, 0x01)))
+        bus.reset_counts()
+        # Reads of interrupt pins don't touch the bus until they change.
+        self.assertEqual(mcp.input_pins([1, 8]), [False, True])
+        self.assertEqual(bus.transactions, 0)
+        model.inputs = 0x0002
+        self.assertEqual(changes, [{1: True, 8: False}])
+        self.assertEqual(bus.transactions, 1)
+        self.assertFalse(model.interrupt)
+        self.assertEqual(mcp.input_pins([1, 8]), [True, False])
+        self.assertTrue(mcp.input(1))
+        self.assertEqual(bus.transactions, 1)
+        # Pins without interrupts are still read from the bus.
+        self.assertFalse(mcp.input(2))
+        self.assertEqual(bus.transactions, 2)
+        # Changes on pins without interrupts don't interrupt.
+        model.inputs = 0x0006
+        self.assertEqual(mcp.interrupts, 1)
+
+    def test_read_of_other_pins_reports_pending_change(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23008Model())
+        host = HostGPIO(model, 4)
+        mcp = MCP23008(i2c=bus)
+        changes = []
+        mcp.setup_pins({0: GPIO.IN, 1: GPIO.IN})
+        mcp.start_interrupts([0], host, 4, callback=changes.append)
+        # Pin 0 changes but the host hasn't handled the edge yet when pin 1 is
+        # read, which clears the interrupt.
+        model.on_interrupt = None
+        model.inputs = 0x01
+        self.assertFalse(mcp.input(1))
+        self.assertFalse(model.interrupt)
+        self.assertEqual(changes, [{0: True}])
+        # The late edge doesn't report the change again.
+        mcp._handle_interrupt(4)
+        self.assertEqual(changes, [{0: True}])
+        self.assertTrue(mcp.input(0))
+
+    def test_stop_interrupts(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23008Model())
+        host = HostGPIO(model, 4)
+        mcp = MCP23008(i2c=bus)
+        mcp.setup(0, GPIO.IN)
+        model.registers[0x04] = 0x80
+        model.registers[0x05] = 0x24
+        mcp.start_interrupts([0], host, 4)
+        self.assertEqual(model.registers[0x04:0x06], bytearray((0x00, 0x00)))
+        mcp.stop_interrupts()
+        self.assertEqual(host.edges, {})
+        self.assertEqual(model.registers[0x02], 0x00)
+        # INTCON and IOCON are restored.
+        self.assertEqual(model.registers[0x04:0x06], bytearray((0x80, 0x24)))
+        bus.reset_counts()
+        model.inputs = 0x01
+        self.assertTrue(mcp.input(0))
+        self.assertEqual(bus.transactions, 1)
+        self.assertEqual(mcp.interrupts, 0)
@@ -0,0 +1,154 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import unittest
+
+import numpy as np
+
+import Adafruit_GPIO.MCP3xxx as MCP3xxx
+
+
+class MockADCSPI(object):
+    # Mock SPI bus with an MCP3008 (or MCP3208 when bits is 12) on it.  Each
+    # 3 byte transfer is decoded as a conversion and answered with the value
+    # from values for its channel (added to for each conversion when step is
+    # set).  Differential conversions are recorded as channel + 8.
+    def __init__(self, bits=10, values=None, step=0):
+        self.bits = bits
+        self.values = list(values or range(8))
+        self.step = step
+        self.conversions = []
+        self.transfers = 0
+
+    def set_clock_hz(self, hz):
+        pass
+
+    def set_mode(self, mode):
+        pass
+
+    def set_bit_order(self, order):
+        pass
+
+    def _convert(self, command):
+        if self.bits == 10:
+            assert command[0] == 0x01
+            code = command[1] >> 4
+        else:
+            assert command[0] & 0xF8 == 0
+            assert command[0] & 0x04
+            code = ((command[0] & 0x03) << 2) | (command[1] >> 6)
+        channel = code & 0x07
+        self.conversions.append(channel if code & 0x08 else channel + 8)
+        value = self.values[channel]
+        self.values[channel] = (value + self.step) & ((1 << self.bits) - 1)
+        return bytearray((0xFF, 0xF0 | (value >> 8), value & 0xFF))
+
+    def transfer(self, data):
+        self.transfers += 1
+        assert len(data) == 3
+        return self._convert(bytearray(data))
+
+
+class MockADCSpiDev(MockADCSPI):
+    # Mock hardware SPI which converts blocks in one call like SpiDev.
+    def transfer_blocks(self, data, size, buf):
+        self.transfers += 1
+        for start in range(0, len(data), size):
+            buf[start:start + size] = self._convert(data[start:start + size])
+        return buf
+
+
+class TestMCP3xxx(unittest.TestCase):
+
+    def test_mcp3008_read_adc(self):
+        spi = MockADCSPI(values=[0, 1023, 512, 3, 4, 5, 6, 7])
+        adc = MCP3xxx.MCP3008(spi=spi)
+        self.assertEqual(adc.read_adc(1), 1023)
+        self.assertEqual(adc.read_adc(2), 512)
+        self.assertEqual(adc.read_adc_difference(3), 3)
+        self.assertEqual(spi.conversions, [1, 2, 11])
+        self.assertRaises(ValueError, adc.read_adc, 8)
+
+    def test_mcp3208_read_adc(self):
+        spi = MockADCSPI(bits=12, values=[0, 4095, 2048, 3, 4, 5, 6, 7])
+        adc = MCP3xxx.MCP3208(spi=spi)
+        self.assertEqual(adc.read_adc(1), 4095)
+        self.assertEqual(adc.read_adc(6), 6)
+        self.assertEqual(adc.read_adc_difference(5), 5)
+        self.assertEqual(spi.conversions, [1, 6, 13])
+
+    def test_read_scans_with_transfer_blocks(self):
+        spi = MockADCSpiDev(step=1)
+        adc = MCP3xxx.MCP3008(spi=spi)
+        values = adc.read_scans([0, 3], 4)
+        self.assertEqual(values.shape, (4, 2))
+        self.assertEqual(values.tolist(), [[0, 3], [1, 4], [2, 5], [3, 6]])
+        self.assertEqual(spi.transfers, 1)
+
+    def test_read_scans_into_buffer_one_transfer_each(self):
+        spi = MockADCSPI(bits=12, values=[100] * 8)
+        adc = MCP3xxx.MCP3208(spi=spi)
+        out = np.zeros((5, 3), dtype=np.uint16)
+        self.assertIs(adc.read_scans([0, 1, 2], 3, out=out[1:4]).base, out)
+        self.assertEqual(out.tolist(), [[0, 0, 0]] + [[100, 100, 100]] * 3 + [[0, 0, 0]])
+        self.assertEqual(spi.transfers, 9)
+
+
+class TestSampler(unittest.TestCase):
+
+    def test_stats_in_units(self):
+        # Channel 0 reads 0 and then 1023 and channel 1 is a constant 512, read
+        # as amps from a sensor centered on half of vref.
+        spi = MockADCSpiDev(values=[0, 512])
+        adc = MCP3xxx.MCP3008(spi=spi)
+        sampler = MCP3xxx.Sampler(adc, [0, 1], rate=100, block=1, vref=1.024,
+                                  offset=[0.0, 0.512], scale=[1.0, 10.0])
+        self.assertIsNone(sampler.stats())
+        self.assertTrue(sampler.sample_block())
+        spi.values[0] = 1023
+        self.assertTrue(sampler.sample_block())
+        stats = sampler.stats()
+        self.assertEqual(stats['count'], 2)
+        np.testing.assert_allclose(stats['mean'], [0.5115, 0.0])
+        np.testing.assert_allclose(stats['rms'], [np.sqrt(1.023 ** 2 / 2), 0.0])
+        np.testing.assert_allclose(stats['min'], [0.0, 0.0])
+        np.testing.assert_allclose(stats['max'], [1.023, 0.0])
+
+    def test_window_wraps_around_ring_buffer(self):
+        adc = MCP3xxx.MCP3008(spi=MockADCSpiDev(values=[0], step=1))
+        sampler = MCP3xxx.Sampler(adc, [0], rate=10, seconds=1.0, block=4, vref=1024)
+        for i in range(7):
+            sampler.sample_block()
+        # 16 scans are kept (rounded up to whole blocks, plus the block being
+        # read) and windows cover at most the last 12.
+        self.assertEqual(sampler.window().ravel().tolist(), list(range(16, 28)))
+        self.assertEqual(sampler.window(0.3).ravel().tolist(), [25, 26, 27])
+
+    def test_start_and_stop(self):
+        adc = MCP3xxx.MCP3008(spi=MockADCSpiDev())
+        sampler = MCP3xxx.Sampler(adc, [0, 1, 2], rate=1000)
+        sampler.start()
+        deadline = time.time() + 5.0
+        while sampler.stats() is None and time.time() < deadline:
+            time.sleep(0.01)
+        sampler.stop()
+        self.assertEqual(sampler.window().shape[1], 3)
@@ -68,3 +68,50 @@ class TestPiRevision(unittest.TestCase):
             handle.__iter__.return_value = iter(['foobar'])
             self.assertRaises(RuntimeError, Platform.pi_revision)
 
+
+
+class TestBoard(unittest.TestCase):
+    def setUp(self):
+        Platform.clear_board_cache()
+
+    def tearDown(self):
+        Platform.clear_board_cache()
+
+    @patch('Adafruit_GPIO.Platform.pi_revision', Mock(return_value=2))
+    @patch('Adafruit_GPIO.Platform.pi_version', Mock(return_value=2))
+    @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.RASPBERRY_PI))
+    def test_raspberry_pi(self):
+        board = Platform.board()
+        self.assertEqual(board, Platform.Board(Platform.RASPBERRY_PI, 2, 2))
+
+    @patch('Adafruit_GPIO.Platform.pi_revision', Mock(side_effect=RuntimeError))
+    @patch('Adafruit_GPIO.Platform.pi_version', Mock(return_value=2))
+    @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.RASPBERRY_PI))
+    def test_raspberry_pi_without_revision(self):
+        board = Platform.board()
+        self.assertEqual(board, Platform.Board(Platform.RASPBERRY_PI, 2, None))
+
+    @patch('Adafruit_GPIO.Platform.platform_detect', Mock(return_value=Platform.BEAGLEBONE_BLACK))
+    def test_beaglebone_black(self):
+        board = Platform.board()
+        self.assertEqual(board, Platform.Board(Platform.BEAGLEBONE_BLACK, None, None))
+
+    def test_detected_once(self):
+        detect = Mock(return_value=Platform.UNKNOWN)
+        with patch('Adafruit_GPIO.Platform.platform_detect', detect):
+            Platform.board()
+            Platform.board()
+        self.assertEqual(detect.call_count, 1)
+
+    @patch.dict('os.environ', {'ADAFRUIT_PLATFORM': 'raspberry_pi,1,1'})
+    def test_environment_override(self):
+        detect = Mock(return_value=Platform.UNKNOWN)
+        with patch('Adafruit_GPIO.Platform.platform_detect', detect):
+            board = Platform.board()
+        self.assertEqual(board, Platform.Board(Platform.RASPBERRY_PI, 1, 1))
+        self.assertFalse(detect.called)
+
+    def test_parse_board(self):
+        self.assertEqual(Platform.parse_board('BEAGLEBONE_BLACK'),
+                         Platform.Board(Platform.BEAGLEBONE_BLACK, None, None))
+        self.assertRaises(ValueError, Platform.parse_board, 'ARDUINO')
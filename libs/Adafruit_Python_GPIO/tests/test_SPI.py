@@ -19,14 +19,27 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import ctypes
 import unittest
 
+from mock import Mock, patch
+
 import Adafruit_GPIO as GPIO
 import Adafruit_GPIO.SPI as SPI
 
 from MockGPIO import MockGPIO
 
 
+class BulkMockGPIO(MockGPIO):
+    # Mock GPIO which records calls to set several pins at once.
+    def __init__(self):
+        super(BulkMockGPIO, self).__init__()
+        self.pins_written = []
+
+    def output_pins(self, pins):
+        self.pins_written.append(dict(pins))
+
+
 class TestBitBangSPI(unittest.TestCase):
     def test_pin_modes_set_correctly(self):
         gpio = MockGPIO()
@@ -187,6 +200,135 @@ class TestBitBangSPI(unittest.TestCase):
         # Verify result
         self.assertEqual(result, bytearray([0x1F, 0xF8, 0x1F]))
 
+    def test_bulk_mode_0_write(self):
+        gpio = BulkMockGPIO()
+        device = SPI.BitBang(gpio, 1, 2, 3, 4)
+        device.write([0x1F])
+        # MOSI changes with the trailing clock edge, then the clock returns to
+        # base after the last bit.
+        expected = []
+        for bit in [0, 0, 0, 1, 1, 1, 1, 1]:
+            expected.extend([{1: 0, 2: bit}, {1: 1}])
+        expected.append({1: 0})
+        self.assertListEqual(gpio.pins_written, expected)
+        # Verify SS
+        self.assertListEqual(gpio.pin_written[4], [1, 0, 1])
+
+    def test_bulk_mode_1_transfer(self):
+        gpio = BulkMockGPIO()
+        device = SPI.BitBang(gpio, 1, 2, 3, 4)
+        device.set_mode(1)
+        gpio.pin_read[3] = [0, 0, 0, 1, 1, 1, 1, 1]
+        result = device.transfer([0xF8])
+        # MOSI changes with the leading clock edge.
+        expected = []
+        for bit in [1, 1, 1, 1, 1, 0, 0, 0]:
+            expected.extend([{1: 1, 2: bit}, {1: 0}])
+        self.assertListEqual(gpio.pins_written, expected)
+        self.assertEqual(result, bytearray([0x1F]))
+
     #TODO: Test mode 1, 2, 3
 
     #TODO: Test null MOSI, MISO, SS
+
+
+class MockSpiDevIoctl(object):
+    # Mock the spidev SPI_IOC_MESSAGE(n) ioctl.  Records each transfer as a
+    # tuple of (length, cs_change, bytes written or None) and answers reads
+    # with the bytes written, or a count from 0 when only reading.  The number
+    # of transfers in each message is recorded in messages.
+    def __init__(self):
+        self.transfers = []
+        self.messages = []
+        self._count = 0
+
+    def ioctl(self, fd, request, transfers):
+        if isinstance(transfers, SPI._spi_ioc_transfer):
+            transfers = [transfers]
+        count = (request >> 16 & 0x3FFF) // 32
+        assert request == SPI._spi_ioc_message(count)
+        assert count <= len(transfers)
+        self.messages.append(count)
+        for transfer in transfers[:count]:
+            self._transfer(transfer)
+
+    def _transfer(self, transfer):
+        written = None
+        if transfer.tx_buf:
+            written = bytearray(ctypes.string_at(transfer.tx_buf, transfer.len))
+        self.transfers.append((transfer.len, transfer.cs_change, written))
+        if transfer.rx_buf:
+            if written is None:
+                response = bytearray((self._count + i) & 0xFF for i in range(transfer.len))
+                self._count += transfer.len
+            else:
+                response = written
+            ctypes.memmove(transfer.rx_buf, bytes(response), transfer.len)
+
+
+def create_spidev(bufsiz=4096):
+    # Create a SpiDev with a mock spidev module and os.open, and return it
+    # with a MockSpiDevIoctl and a patcher which makes fcntl.ioctl use it.
+    spidev_ioctl = MockSpiDevIoctl()
+    with patch.dict('sys.modules', {'spidev': Mock()}):
+        with patch('os.open', Mock(return_value=42)):
+            device = SPI.SpiDev(0, 0, bufsiz=bufsiz)
+    patcher = patch.object(device._fcntl, 'ioctl', Mock(side_effect=spidev_ioctl.ioctl))
+    return (device, spidev_ioctl, patcher)
+
+
+class TestSpiDev(unittest.TestCase):
+
+    def test_long_write_is_chunked_holding_cs(self):
+        device, spidev_ioctl, patcher = create_spidev()
+        data = bytearray(range(256)) * 40
+        with patcher:
+            device.write(data)
+        self.assertEqual([(length, cs_change) for length, cs_change, written in spidev_ioctl.transfers],
+                         [(4096, 1), (4096, 1), (2048, 0)])
+        self.assertEqual(bytearray().join(written for length, cs_change, written in spidev_ioctl.transfers),
+                         data)
+
+    def test_write_without_holding_cs(self):
+        device, spidev_ioctl, patcher = create_spidev(bufsiz=2)
+        with patcher:
+            device.write([1, 2, 3], hold_cs=False)
+        self.assertEqual(spidev_ioctl.transfers, [(2, 0, bytearray([1, 2])),
+                                                  (1, 0, bytearray([3]))])
+
+    def test_readinto_fills_buffer(self):
+        device, spidev_ioctl, patcher = create_spidev(bufsiz=4)
+        buf = bytearray(10)
+        with patcher:
+            self.assertIs(device.readinto(buf), buf)
+        self.assertEqual(buf, bytearray(range(10)))
+        self.assertEqual(len(spidev_ioctl.transfers), 3)
+
+    def test_transfer(self):
+        device, spidev_ioctl, patcher = create_spidev(bufsiz=4)
+        buf = bytearray(8)
+        with patcher:
+            self.assertEqual(device.transfer(b'\x01\x02\x03'), bytearray(b'\x01\x02\x03'))
+            self.assertIs(device.transfer(bytearray(range(8)), buf), buf)
+            self.assertRaises(ValueError, device.transfer, [1, 2, 3], bytearray(2))
+        self.assertEqual(buf, bytearray(range(8)))
+
+    def test_transfer_blocks_releases_cs_between_blocks(self):
+        device, spidev_ioctl, patcher = create_spidev(bufsiz=7)
+        data = bytearray(range(9))
+        buf = bytearray(9)
+        with patcher:
+            self.assertIs(device.transfer_blocks(data, 3, buf), buf)
+            self.assertRaises(ValueError, device.transfer_blocks, data, 2)
+        self.assertEqual(buf, data)
+        self.assertEqual(spidev_ioctl.messages, [2, 1])
+        self.assertEqual([(length, cs_change) for length, cs_change, written in spidev_ioctl.transfers],
+                         [(3, 1), (3, 0), (3, 0)])
+
+    def test_transfer_blocks_larger_than_bufsiz(self):
+        device, spidev_ioctl, patcher = create_spidev(bufsiz=4)
+        with patcher:
+            with self.assertRaises(ValueError) as context:
+                device.transfer_blocks(bytearray(10), 5)
+        self.assertIn('bufsiz', str(context.exception))
+        self.assertEqual(spidev_ioctl.transfers, [])
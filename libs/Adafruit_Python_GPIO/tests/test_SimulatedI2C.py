@@ -0,0 +1,145 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+import unittest
+
+import Adafruit_GPIO as GPIO
+import Adafruit_GPIO.SimulatedI2C as SimulatedI2C
+from Adafruit_GPIO.MCP230xx import MCP23008, MCP23017
+from Adafruit_GPIO.PCF8574 import PCF8574
+
+
+class TestBus(unittest.TestCase):
+
+    def test_counts_transactions(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.RegisterModel())
+        device = bus.get_i2c_device(0x20)
+        device.write8(0x01, 0xAB)
+        device.writeList(0x02, [0xCD, 0xEF])
+        self.assertEqual(list(device.readList(0x01, 3)), [0xAB, 0xCD, 0xEF])
+        self.assertEqual(device.readU16BE(0x02), 0xCDEF)
+        self.assertEqual(model.registers[0x01:0x04], bytearray((0xAB, 0xCD, 0xEF)))
+        self.assertEqual(bus.transactions, 4)
+        self.assertEqual(bus.counts['write8'], 1)
+        self.assertEqual(bus.counts['readList'], 1)
+        self.assertGreater(bus.bus_time, 0.0)
+        bus.reset_counts()
+        self.assertEqual(bus.transactions, 0)
+
+    def test_missing_device_raises_ioerror(self):
+        bus = SimulatedI2C.Bus()
+        device = bus.get_i2c_device(0x20)
+        self.assertRaises(IOError, device.readU8, 0x00)
+
+    def test_read_struct(self):
+        bus = SimulatedI2C.Bus()
+        bus.attach(0x77, SimulatedI2C.BMP085Model())
+        device = bus.get_i2c_device(0x77)
+        cal = device.read_struct(0xAA, '>hhhHHHhhhhh')
+        self.assertEqual(cal, SimulatedI2C.BMP085Model.CALIBRATION)
+        self.assertEqual(bus.transactions, 1)
+
+
+class TestBMP085Model(unittest.TestCase):
+
+    def test_temperature_conversion(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x77, SimulatedI2C.BMP085Model(ut=27898))
+        device = bus.get_i2c_device(0x77)
+        device.write8(0xF4, 0x2E)
+        # Result isn't ready until the conversion time passes.
+        self.assertEqual(device.readU16BE(0xF6), 0)
+        time.sleep(model.TEMPERATURE_TIME)
+        self.assertEqual(device.readU16BE(0xF6), 27898)
+
+    def test_pressure_conversion(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x77, SimulatedI2C.BMP085Model(up=23843))
+        device = bus.get_i2c_device(0x77)
+        for mode in range(4):
+            device.write8(0xF4, 0x34 + (mode << 6))
+            time.sleep(model.PRESSURE_TIME[mode])
+            msb, lsb, xlsb = device.readList(0xF6, 3)
+            raw = ((msb << 16) + (lsb << 8) + xlsb) >> (8 - mode)
+            self.assertEqual(raw, 23843 << mode)
+        self.assertEqual(model.conversions, 4)
+
+
+class TestMCP230xxModel(unittest.TestCase):
+
+    def test_mcp23008_outputs_and_inputs(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23008Model())
+        mcp = MCP23008(i2c=bus)
+        mcp.setup(0, GPIO.OUT)
+        mcp.setup(1, GPIO.IN)
+        mcp.output(0, GPIO.HIGH)
+        self.assertEqual(model.outputs() & 0x01, 0x01)
+        model.inputs = 0x02
+        self.assertEqual(mcp.input_pins([0, 1]), [True, True])
+        model.inputs = 0x00
+        self.assertFalse(mcp.input(1))
+
+    def test_mcp23017_second_port(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23017Model())
+        mcp = MCP23017(i2c=bus)
+        mcp.setup(9, GPIO.OUT)
+        mcp.setup(15, GPIO.IN)
+        mcp.output(9, GPIO.HIGH)
+        self.assertEqual(model.outputs(), 0x0200)
+        model.inputs = 0x8000
+        self.assertTrue(mcp.input(15))
+
+    def test_interrupt_on_change(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x20, SimulatedI2C.MCP23008Model())
+        asserted = []
+        model.on_interrupt = lambda: asserted.append(model.inputs)
+        device = bus.get_i2c_device(0x20)
+        # Pin 0 interrupts on change, pin 1 when it differs from DEFVAL (low).
+        device.writeList(0x02, [0x03, 0x00, 0x02])
+        model.inputs = 0x01
+        model.inputs = 0x00
+        self.assertTrue(model.interrupt)
+        self.assertEqual(asserted, [0x01])
+        # INTF and INTCAP hold the first change until INTCAP is read.
+        self.assertEqual(list(device.readList(0x07, 2)), [0x01, 0x01])
+        self.assertFalse(model.interrupt)
+        model.inputs = 0x02
+        self.assertTrue(model.interrupt)
+        self.assertEqual(device.readU8(0x07), 0x02)
+        self.assertEqual(asserted, [0x01, 0x02])
+
+
+class TestPCF8574Model(unittest.TestCase):
+
+    def test_outputs_and_inputs(self):
+        bus = SimulatedI2C.Bus()
+        model = bus.attach(0x27, SimulatedI2C.PCF8574Model())
+        pcf = PCF8574(i2c=bus)
+        pcf.setup(0, GPIO.OUT)
+        pcf.output(0, GPIO.LOW)
+        self.assertEqual(model.latch & 0x01, 0x00)
+        model.inputs = 0xFF & ~0x04
+        self.assertEqual(pcf.input_pins([2, 3]), [False, True])